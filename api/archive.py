@@ -0,0 +1,220 @@
+import hashlib
+import logging
+import os
+import uuid
+from datetime import timedelta
+
+import orjson
+import zstandard
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Min, Sum
+from django.utils import timezone
+
+from .models import RawPage
+from .records import IssueRecord, parse_issue_page
+from .shared_issues import matches_labels
+
+logger = logging.getLogger(__name__)
+
+ZSTD_LEVEL = 3
+REPLAY_PAGE_SIZE = 100
+
+
+def parse_raw_page(kind, content):
+    """Proyecta una página archivada a `IssueRecord` con el parser actual."""
+    if kind == RawPage.KIND_ISSUES_REST:
+        return parse_issue_page(content)
+    payload = orjson.loads(content)
+    repository_data = (payload.get("data") or {}).get("repository")
+    if payload.get("errors") or not repository_data:
+        return []
+    return [IssueRecord.from_graphql(node) for node in repository_data["issues"]["nodes"]]
+
+
+class ArchiveCapture:
+    """Las páginas crudas de una corrida de ingesta, en el orden en que se trajeron."""
+
+    def __init__(self, archive, kind, owner, name, labels=None, label_mode=None, since=None):
+        self.archive = archive
+        self.id = uuid.uuid4()
+        self.kind = kind
+        self.owner = owner
+        self.name = name
+        self.labels = list(labels or [])
+        self.label_mode = label_mode
+        self.since = since
+        self.sequence = 0
+
+    def add(self, content):
+        digest, size = self.archive.put(content)
+        RawPage.objects.create(
+            capture=self.id,
+            sequence=self.sequence,
+            kind=self.kind,
+            owner=self.owner,
+            name=self.name,
+            labels=self.labels,
+            label_mode=self.label_mode,
+            since=self.since,
+            digest=digest,
+            size=size,
+        )
+        self.sequence += 1
+
+    def finish(self):
+        """Marca la corrida como completa: se trajeron todas sus páginas."""
+        RawPage.objects.filter(capture=self.id).update(complete=True)
+
+
+class RawPageArchive:
+    """Archivo de las respuestas crudas de GitHub.
+
+    Cada página se guarda comprimida con zstd en `root/<ab>/<sha256>.zst`,
+    donde el nombre es el hash del contenido sin comprimir: una página que no
+    cambió entre dos sincronizaciones ocupa lugar una sola vez. La tabla
+    `raw_page` registra de qué corrida, repositorio y filtro salió cada una,
+    para poder re-procesar una corrida (`iter_records`) sin pedir nada a
+    GitHub cuando cambia el parser o el clasificador.
+
+    `prune` borra lo más viejo que `retention` y, si se pasa `max_bytes`, las
+    corridas más antiguas hasta entrar en ese tamaño.
+    """
+
+    def __init__(self, root, retention=timedelta(days=30), max_bytes=0):
+        self.root = root
+        self.retention = retention
+        self.max_bytes = max_bytes
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    @classmethod
+    def from_settings(cls):
+        """El archivo configurado en `GITHUB_ARCHIVE_DIR`, o None si está deshabilitado."""
+        if not settings.GITHUB_ARCHIVE_DIR:
+            return None
+        return cls(
+            settings.GITHUB_ARCHIVE_DIR,
+            retention=timedelta(days=settings.GITHUB_ARCHIVE_RETENTION_DAYS),
+            max_bytes=settings.GITHUB_ARCHIVE_MAX_BYTES
+        )
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], f"{digest}.zst")
+
+    def put(self, content):
+        """Guarda el contenido si no estaba y devuelve `(digest, tamaño comprimido)`."""
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._path(digest)
+        if os.path.exists(path):
+            return digest, os.path.getsize(path)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        compressed = self._compressor.compress(content)
+        # Escritura atómica: otro proceso puede estar guardando la misma página
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as tmp:
+            tmp.write(compressed)
+        os.replace(tmp_path, path)
+        return digest, len(compressed)
+
+    def get(self, digest):
+        with open(self._path(digest), 'rb') as blob:
+            return self._decompressor.decompress(blob.read())
+
+    def capture(self, kind, owner, name, labels=None, label_mode=None, since=None):
+        return ArchiveCapture(self, kind, owner, name, labels, label_mode, since)
+
+    def captures(self, owner, name):
+        """Resumen de las corridas archivadas de un repositorio, de la más nueva a la más vieja."""
+        return list(
+            RawPage.objects
+            .filter(owner=owner, name=name)
+            .values('capture', 'kind', 'labels', 'label_mode', 'since', 'complete')
+            .annotate(pages=Count('id'), bytes=Sum('size'), fetched_at=Min('fetched_at'))
+            .order_by('-fetched_at')
+        )
+
+    def latest_capture(self, owner, name):
+        """
+        La última corrida del repositorio sin `since` ni filtro de labels que
+        terminó de traer todas sus páginas.
+        """
+        return (
+            RawPage.objects
+            .filter(owner=owner, name=name, since__isnull=True, labels=[], complete=True)
+            .order_by('-fetched_at')
+            .values_list('capture', flat=True)
+            .first()
+        )
+
+    def capture_fetched_at(self, capture):
+        """Cuándo se trajo la primera página de la corrida, o None si no existe."""
+        return RawPage.objects.filter(capture=capture).aggregate(fetched_at=Min('fetched_at'))['fetched_at']
+
+    def iter_records(self, capture):
+        """
+        Páginas de `IssueRecord` de una corrida, re-parseadas desde el archivo.
+        Los issues repetidos (p. ej. en varias pasadas por label) se entregan
+        una sola vez.
+        """
+        seen = set()
+        pending = []
+        for page in RawPage.objects.filter(capture=capture).order_by('sequence'):
+            try:
+                content = self.get(page.digest)
+            except FileNotFoundError:
+                logger.warning("Falta en el archivo la página %s (%s)", page, page.digest)
+                continue
+
+            for record in parse_raw_page(page.kind, content):
+                if record.git_id in seen or not matches_labels(record, page.labels, page.label_mode):
+                    continue
+                seen.add(record.git_id)
+                pending.append(record)
+                if len(pending) == REPLAY_PAGE_SIZE:
+                    yield pending
+                    pending = []
+        if pending:
+            yield pending
+
+    def _delete(self, pages):
+        """Borra las filas y los archivos que ya no usa ninguna otra; devuelve los bytes liberados."""
+        digests = set(pages.values_list('digest', flat=True))
+        pages.delete()
+        still_used = set(RawPage.objects.filter(digest__in=digests).values_list('digest', flat=True))
+        freed = 0
+        for digest in digests - still_used:
+            path = self._path(digest)
+            try:
+                freed += os.path.getsize(path)
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return freed
+
+    def _total_bytes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT digest, size FROM raw_page) AS blobs")
+            return cursor.fetchone()[0]
+
+    def prune(self):
+        expired = RawPage.objects.filter(fetched_at__lt=timezone.now() - self.retention)
+        freed = self._delete(expired)
+
+        if self.max_bytes:
+            total = self._total_bytes()
+            oldest_first = (
+                RawPage.objects
+                .values('capture')
+                .annotate(fetched_at=Min('fetched_at'))
+                .order_by('fetched_at')
+                .values_list('capture', flat=True)
+            )
+            for capture in oldest_first:
+                if total <= self.max_bytes:
+                    break
+                capture_freed = self._delete(RawPage.objects.filter(capture=capture))
+                total -= capture_freed
+                freed += capture_freed
+        return freed
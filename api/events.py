@@ -0,0 +1,103 @@
+import asyncio
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from .models import SyncEvent
+
+# Cada cuánto se consultan eventos nuevos y cada cuánto se manda un comentario para mantener viva la conexión
+POLL_INTERVAL = 1
+KEEPALIVE_INTERVAL = 15
+MAX_EVENTS_PER_POLL = 200
+
+
+def _authenticate(request):
+    """
+    Acepta el JWT en el header `Authorization: Bearer` o en `?token=`, porque
+    `EventSource` del navegador no permite mandar headers.
+    """
+    auth = JWTAuthentication()
+    raw = request.GET.get('token')
+    if raw is None:
+        header = auth.get_header(request)
+        raw = auth.get_raw_token(header) if header else None
+    if raw is None:
+        return None
+    try:
+        return auth.get_user(auth.get_validated_token(raw))
+    except (InvalidToken, TokenError):
+        return None
+
+
+def _fetch_events(user_id, last_id):
+    return list(
+        SyncEvent.objects
+        .filter(user_id=user_id, id__gt=last_id)
+        .order_by('id')
+        .values('id', 'kind', 'data', 'created_at')[:MAX_EVENTS_PER_POLL]
+    )
+
+
+def _last_event_id(user_id):
+    return SyncEvent.objects.filter(user_id=user_id).order_by('-id').values_list('id', flat=True).first() or 0
+
+
+def _format(event):
+    data = orjson.dumps({**event['data'], "createdAt": event['created_at']})
+    return f"id: {event['id']}\nevent: {event['kind']}\ndata: {data.decode()}\n\n"
+
+
+async def sync_events(request):
+    """
+    Stream SSE con los eventos de ingesta del usuario: `job_started`,
+    `page_fetched`, `issues_upserted`, `predictions_written`, `job_done` y
+    `job_failed`.
+
+    Es una vista asíncrona que consulta la tabla `sync_event`, así que bajo
+    ASGI una conexión abierta no ocupa un thread ni un worker. Con el header
+    `Last-Event-ID` (el navegador lo manda al reconectar) se retoma desde el
+    último evento recibido; sin él solo se envían los eventos nuevos.
+    """
+    # `require_GET` no admite vistas asíncronas en Django 4.2
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return JsonResponse({"error": "Token inválido o ausente"}, status=401)
+
+    last_id = request.headers.get('Last-Event-ID')
+    if last_id and last_id.isdigit():
+        last_id = int(last_id)
+    else:
+        last_id = await sync_to_async(_last_event_id)(user.id)
+
+    async def stream():
+        nonlocal last_id
+        idle = 0
+        yield f"retry: {POLL_INTERVAL * 1000 * 3}\n\n"
+        while True:
+            events = await sync_to_async(_fetch_events)(user.id, last_id)
+            for event in events:
+                last_id = event['id']
+                yield _format(event)
+
+            if events:
+                idle = 0
+                if len(events) == MAX_EVENTS_PER_POLL:
+                    continue
+            else:
+                idle += POLL_INTERVAL
+                if idle >= KEEPALIVE_INTERVAL:
+                    idle = 0
+                    yield ": keepalive\n\n"
+            await asyncio.sleep(POLL_INTERVAL)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Evita que nginx acumule la respuesta en buffer
+    response['X-Accel-Buffering'] = 'no'
+    return response
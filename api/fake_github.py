@@ -0,0 +1,543 @@
+"""
+Servidor local que imita la API de GitHub, para probar y medir la ingesta sin red.
+
+Genera repositorios sintéticos de tamaño configurable y responde los endpoints
+que usa `GitService`: issues y labels por REST (con headers `Link`, `ETag` y de
+rate limit) y GraphQL para `repository.issues`, `nodes(ids:)`, la detección de cambios
+con alias y `projectV2` (uno o varios proyectos por consulta). Se puede inyectar
+latencia y fallas. Se levanta con `manage.py fake_github` o, en proceso, con
+`FakeGitHub(...).start()`.
+"""
+import base64
+import hashlib
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import orjson
+
+LABEL_POOL = ['bug', 'enhancement', 'documentation', 'UX BUG', 'UX ISSUE', 'FEATURE REQUEST']
+PROJECT_STATUSES = ['Todo', 'In Progress', 'Done']
+EPOCH = datetime(2024, 1, 1)
+RATE_LIMIT_WINDOW = 3600
+
+
+def _timestamp(value):
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ') if value else None
+
+
+def _cursor(offset):
+    return base64.b64encode(f"cursor:{offset}".encode()).decode()
+
+
+def _offset(cursor):
+    if not cursor:
+        return 0
+    return int(base64.b64decode(cursor).decode().split(':')[1])
+
+
+@dataclass
+class FakeGitHubConfig:
+    # Issues de los repositorios no listados en `repos`
+    default_issues: int = 100
+    # Tamaño por repositorio: {"owner/name": cantidad}
+    repos: dict = field(default_factory=dict)
+    # Logins que son organizaciones; el resto se trata como usuarios
+    orgs: tuple = ()
+    project_items: int = 250
+    latency: float = 0.0
+    failure_rate: float = 0.0
+    rate_limit: int = 5000
+    seed: int = 0
+
+
+class FakeRepo:
+    def __init__(self, owner, name, repo_id, size):
+        self.owner = owner
+        self.name = name
+        self.id = repo_id
+        self.labels = {name: {"name": name, "color": "ededed", "description": ""} for name in LABEL_POOL}
+        self.issues = [self._make_issue(number) for number in range(1, size + 1)]
+        self.version = 0
+
+    @property
+    def full_name(self):
+        return f"{self.owner}/{self.name}"
+
+    def _make_issue(self, number):
+        issue_id = self.id * 1_000_000 + number
+        labels = [LABEL_POOL[number % len(LABEL_POOL)]]
+        if number % 3 == 0:
+            labels.append(LABEL_POOL[(number * 7 + 1) % len(LABEL_POOL)])
+        created = EPOCH + timedelta(minutes=number)
+        closed = number % 4 == 0
+        return {
+            "id": issue_id,
+            "node_id": f"I_fake{issue_id}",
+            "number": number,
+            "html_url": f"https://github.com/{self.full_name}/issues/{number}",
+            "title": f"Issue {number} de {self.name}",
+            "body": f"Descripción sintética del issue {number}. " * (1 + number % 5),
+            "state": "closed" if closed else "open",
+            "labels": [{"name": label} for label in dict.fromkeys(labels)],
+            "closed_at": _timestamp(created + timedelta(days=1)) if closed else None,
+            "created_at": _timestamp(created),
+            "updated_at": _timestamp(created + timedelta(hours=number % 48)),
+            "user": {"login": "octocat"},
+        }
+
+    def as_rest(self):
+        return {
+            "id": self.id,
+            "node_id": f"R_fake{self.id}",
+            "name": self.name,
+            "full_name": self.full_name,
+            "owner": {"login": self.owner},
+            "html_url": f"https://github.com/{self.full_name}",
+            "description": f"Repositorio sintético con {len(self.issues)} issues",
+            "private": False,
+            "open_issues_count": sum(1 for issue in self.issues if issue["state"] == "open"),
+        }
+
+    def touch(self, issue):
+        issue["updated_at"] = _timestamp(datetime.utcnow())
+        self.version += 1
+
+
+def issue_node(issue):
+    """Forma GraphQL de un issue, como la devuelve `repository.issues` o el contenido de un item."""
+    return {
+        "id": issue["node_id"],
+        "databaseId": issue["id"],
+        "number": issue["number"],
+        "url": issue["html_url"],
+        "title": issue["title"],
+        "body": issue["body"],
+        "state": issue["state"].upper(),
+        "closedAt": issue["closed_at"],
+        "updatedAt": issue["updated_at"],
+        "labels": {"nodes": [{"name": label["name"]} for label in issue["labels"]]},
+    }
+
+
+class FakeGitHub:
+    """Estado del GitHub falso y despacho de requests, independiente del transporte HTTP."""
+
+    def __init__(self, config=None):
+        self.config = config or FakeGitHubConfig()
+        self.repos = {}
+        self.calls = Counter()
+        self._random = random.Random(self.config.seed)
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._server = None
+        for full_name in self.config.repos:
+            owner, name = full_name.split('/')
+            self.repo(owner, name)
+
+    # --- estado ---
+
+    def repo(self, owner, name):
+        key = f"{owner}/{name}".lower()
+        with self._lock:
+            if key not in self.repos:
+                size = self.config.repos.get(f"{owner}/{name}", self.config.default_issues)
+                self.repos[key] = FakeRepo(owner, name, len(self.repos) + 1, size)
+            return self.repos[key]
+
+    def _consume(self, token, resource):
+        """Descuenta una request de la cuota del token; devuelve el bucket o None si se agotó."""
+        with self._lock:
+            bucket = self._buckets.setdefault((token, resource), {
+                "remaining": self.config.rate_limit,
+                "reset": int(time.time()) + RATE_LIMIT_WINDOW,
+            })
+            if bucket["reset"] <= time.time():
+                bucket["remaining"] = self.config.rate_limit
+                bucket["reset"] = int(time.time()) + RATE_LIMIT_WINDOW
+            if bucket["remaining"] <= 0:
+                return None
+            bucket["remaining"] -= 1
+            return bucket
+
+    def _bucket(self, token, resource):
+        return self._buckets.get((token, resource)) or {
+            "remaining": self.config.rate_limit,
+            "reset": int(time.time()) + RATE_LIMIT_WINDOW,
+        }
+
+    def stats(self):
+        return {"calls": dict(self.calls), "total": sum(self.calls.values())}
+
+    def reset_stats(self):
+        self.calls.clear()
+
+    # --- despacho ---
+
+    def handle(self, method, url, headers, body=b''):
+        """Devuelve `(status, headers, body)` para una request."""
+        parsed = urlparse(url)
+        path = parsed.path.rstrip('/') or '/'
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        token = (headers.get('Authorization') or '').split(' ')[-1]
+
+        if path.startswith('/_fake/'):
+            if path == '/_fake/reset':
+                self.reset_stats()
+            return self._json(200, self.stats())
+
+        if self.config.latency:
+            time.sleep(self.config.latency)
+
+        route, handler, params = self._route(method, path)
+        self.calls[f"{method} {route}"] += 1
+        if handler is None:
+            return self._json(404, {"message": "Not Found"})
+
+        if self.config.failure_rate and self._random.random() < self.config.failure_rate:
+            return self._json(502, {"message": "Server Error (falla inyectada)"})
+
+        if route == '/rate_limit':
+            return handler(token)
+
+        resource = 'graphql' if route == '/graphql' else 'core'
+        bucket = self._consume(token, resource)
+        rate_headers = self._rate_headers(token, resource)
+        if bucket is None:
+            return self._json(403, {"message": "API rate limit exceeded"}, rate_headers)
+
+        payload = orjson.loads(body) if body else {}
+        status, response_headers, content = handler(query=query, payload=payload, token=token, **params)
+        response_headers = {**rate_headers, **response_headers}
+
+        if method == 'GET' and status == 200:
+            etag = '"' + hashlib.sha1(content).hexdigest() + '"'
+            response_headers['ETag'] = etag
+            if headers.get('If-None-Match') == etag:
+                # Como en GitHub, un 304 no consume cuota
+                with self._lock:
+                    self._buckets[(token, resource)]["remaining"] += 1
+                return 304, self._rate_headers(token, resource), b''
+        return status, response_headers, content
+
+    ROUTES = [
+        ('GET', r'/rate_limit', '_rate_limit'),
+        ('POST', r'/graphql', '_graphql'),
+        ('GET', r'/repos/(?P<owner>[^/]+)/(?P<name>[^/]+)', '_get_repo'),
+        ('GET', r'/repos/(?P<owner>[^/]+)/(?P<name>[^/]+)/issues', '_list_issues'),
+        ('GET', r'/repos/(?P<owner>[^/]+)/(?P<name>[^/]+)/labels', '_list_labels'),
+        ('POST', r'/repos/(?P<owner>[^/]+)/(?P<name>[^/]+)/labels', '_create_label'),
+        ('POST', r'/repos/(?P<owner>[^/]+)/(?P<name>[^/]+)/issues/(?P<number>\d+)/labels', '_add_issue_labels'),
+        ('GET', r'/(?P<kind>users|orgs)/(?P<owner>[^/]+)/repos', '_list_owner_repos'),
+    ]
+
+    def _route(self, method, path):
+        for route_method, pattern, handler in self.ROUTES:
+            match = re.fullmatch(pattern, path)
+            if match and route_method == method:
+                # Nombre legible para las estadísticas: /repos/{owner}/{name}/issues
+                route = re.sub(r'\(\?P<(\w+)>[^)]*\)', r'{\1}', pattern)
+                return route, getattr(self, handler), match.groupdict()
+        return path, None, {}
+
+    # --- respuestas ---
+
+    def _json(self, status, data, headers=None):
+        return status, {"Content-Type": "application/json; charset=utf-8", **(headers or {})}, orjson.dumps(data)
+
+    def _rate_headers(self, token, resource):
+        bucket = self._bucket(token, resource)
+        return {
+            "X-RateLimit-Limit": str(self.config.rate_limit),
+            "X-RateLimit-Remaining": str(bucket["remaining"]),
+            "X-RateLimit-Reset": str(bucket["reset"]),
+            "X-RateLimit-Resource": resource,
+        }
+
+    def _paginate(self, items, query, base_path):
+        per_page = min(int(query.get('per_page', 30)), 100)
+        page = max(int(query.get('page', 1)), 1)
+        last_page = max(1, -(-len(items) // per_page))
+        page_items = items[(page - 1) * per_page:page * per_page]
+
+        def link(number, rel):
+            params = urlencode({**query, 'page': number, 'per_page': per_page})
+            return f'<{self.base_url}{base_path}?{params}>; rel="{rel}"'
+
+        links = []
+        if page < last_page:
+            links += [link(page + 1, 'next'), link(last_page, 'last')]
+        if page > 1:
+            links += [link(1, 'first'), link(page - 1, 'prev')]
+        return page_items, ({"Link": ", ".join(links)} if links else {})
+
+    def _rate_limit(self, token):
+        resources = {}
+        for resource in ('core', 'graphql'):
+            bucket = self._bucket(token, resource)
+            resources[resource] = {
+                "limit": self.config.rate_limit,
+                "remaining": bucket["remaining"],
+                "used": self.config.rate_limit - bucket["remaining"],
+                "reset": bucket["reset"],
+            }
+        return self._json(200, {"resources": resources, "rate": resources["core"]})
+
+    def _get_repo(self, owner, name, query, payload, token):
+        return self._json(200, self.repo(owner, name).as_rest())
+
+    def _filter_issues(self, repo, query):
+        state = query.get('state', 'open')
+        labels = [label for label in query.get('labels', '').split(',') if label]
+        since = query.get('since')
+        issues = repo.issues
+        if state != 'all':
+            issues = [issue for issue in issues if issue["state"] == state]
+        if labels:
+            # Como en GitHub, varios labels se combinan con AND
+            issues = [
+                issue for issue in issues
+                if set(labels).issubset(label["name"] for label in issue["labels"])
+            ]
+        if since:
+            issues = [issue for issue in issues if issue["updated_at"] >= since]
+        return issues
+
+    def _list_issues(self, owner, name, query, payload, token):
+        repo = self.repo(owner, name)
+        page_items, headers = self._paginate(
+            self._filter_issues(repo, query), query, f"/repos/{owner}/{name}/issues"
+        )
+        return self._json(200, page_items, headers)
+
+    def _list_labels(self, owner, name, query, payload, token):
+        repo = self.repo(owner, name)
+        page_items, headers = self._paginate(list(repo.labels.values()), query, f"/repos/{owner}/{name}/labels")
+        return self._json(200, page_items, headers)
+
+    def _create_label(self, owner, name, query, payload, token):
+        repo = self.repo(owner, name)
+        label_name = payload.get("name")
+        if not label_name or label_name in repo.labels:
+            return self._json(422, {"message": "Validation Failed", "errors": [{"code": "already_exists"}]})
+        repo.labels[label_name] = {
+            "name": label_name,
+            "color": payload.get("color", "ededed"),
+            "description": payload.get("description", ""),
+        }
+        return self._json(201, repo.labels[label_name])
+
+    def _add_issue_labels(self, owner, name, number, query, payload, token):
+        repo = self.repo(owner, name)
+        number = int(number)
+        if not 1 <= number <= len(repo.issues):
+            return self._json(404, {"message": "Not Found"})
+        issue = repo.issues[number - 1]
+        current = [label["name"] for label in issue["labels"]]
+        for label_name in payload.get("labels", []):
+            if label_name not in current:
+                current.append(label_name)
+                repo.labels.setdefault(label_name, {"name": label_name, "color": "ededed", "description": ""})
+        issue["labels"] = [{"name": label_name} for label_name in current]
+        repo.touch(issue)
+        return self._json(200, issue["labels"])
+
+    def _list_owner_repos(self, kind, owner, query, payload, token):
+        repos = [repo.as_rest() for repo in self.repos.values() if repo.owner.lower() == owner.lower()]
+        page_items, headers = self._paginate(repos, query, f"/{kind}/{owner}/repos")
+        return self._json(200, page_items, headers)
+
+    # --- GraphQL ---
+
+    def _graphql(self, query, payload, token):
+        document = payload.get("query", "")
+        variables = payload.get("variables") or {}
+        match = re.search(r'query\s+(\w+)', document)
+        operation = match.group(1) if match else None
+
+        handler = getattr(self, f"_gql_{operation}", None)
+        if handler is None:
+            return self._json(200, {"errors": [{"message": f"Operación no soportada por el servidor falso: {operation}"}]})
+        return self._json(200, handler(document, variables, token))
+
+    def _owner_kind(self, login):
+        return 'organization' if login in self.config.orgs else 'user'
+
+    def _project(self, login, number):
+        # Cada proyecto agrupa los issues de un repositorio sintético propio
+        repo = self.repo(login, f"project-{number}")
+        while len(repo.issues) < self.config.project_items:
+            repo.issues.append(repo._make_issue(len(repo.issues) + 1))
+        return repo
+
+    def _project_data(self, login, number, cursor):
+        repo = self._project(login, number)
+        items = repo.issues[:self.config.project_items]
+        offset = _offset(cursor)
+        page = items[offset:offset + 100]
+        return {
+            "id": f"PVT_fake{repo.id}",
+            "title": f"Proyecto {number} de {login}",
+            "url": f"https://github.com/{'orgs' if self._owner_kind(login) == 'organization' else 'users'}/{login}/projects/{number}",
+            "items": {
+                "pageInfo": {
+                    "hasNextPage": offset + 100 < len(items),
+                    "endCursor": _cursor(offset + len(page)),
+                },
+                "nodes": [
+                    {
+                        "id": f"PVTI_fake{issue['id']}",
+                        "updatedAt": issue["updated_at"],
+                        "content": issue_node(issue),
+                        "fieldValues": {"nodes": [{
+                            "name": PROJECT_STATUSES[issue["number"] % len(PROJECT_STATUSES)],
+                            "field": {"name": "Status"},
+                        }]},
+                    }
+                    for issue in page
+                ],
+            },
+        }
+
+    def _gql_ProjectItems(self, document, variables, token):
+        login = variables["login"]
+        kind = self._owner_kind(login)
+        project = self._project_data(login, variables["projectNumber"], variables.get("cursor"))
+
+        if 'repositoryOwner(' in document:
+            typename = 'Organization' if kind == 'organization' else 'User'
+            return {"data": {"repositoryOwner": {"__typename": typename, "projectV2": project}}}
+
+        selection = 'organization' if 'organization(' in document else 'user'
+        if selection != kind:
+            return {
+                "data": {selection: None},
+                "errors": [{"type": "NOT_FOUND", "message": f"Could not resolve to a {selection} with the login of '{login}'."}],
+            }
+        return {"data": {selection: {"projectV2": project}}}
+
+    def _gql_ProjectsItems(self, document, variables, token):
+        # Un alias `p{i}` por cada par de variables `login{i}`/`projectNumber{i}`
+        data = {}
+        errors = []
+        index = 0
+        while f"login{index}" in variables:
+            login = variables[f"login{index}"]
+            kind = self._owner_kind(login)
+            project = self._project_data(login, variables[f"projectNumber{index}"], None)
+            selection = re.search(rf'p{index}: (\w+)\(', document).group(1)
+            if selection == 'repositoryOwner':
+                typename = 'Organization' if kind == 'organization' else 'User'
+                data[f"p{index}"] = {"__typename": typename, "projectV2": project}
+            elif selection != kind:
+                data[f"p{index}"] = None
+                errors.append({"type": "NOT_FOUND", "path": [f"p{index}"], "message": f"Could not resolve to a {selection} with the login of '{login}'."})
+            else:
+                data[f"p{index}"] = {"projectV2": project}
+            index += 1
+        return {"data": data, "errors": errors} if errors else {"data": data}
+
+    def _gql_RepositoryIssues(self, document, variables, token):
+        repo = self.repo(variables["owner"], variables["name"])
+        issues = repo.issues
+        labels = variables.get("labels")
+        if labels:
+            # En GraphQL el filtro de labels es OR
+            issues = [issue for issue in issues if any(label["name"] in labels for label in issue["labels"])]
+        if variables.get("since"):
+            issues = [issue for issue in issues if issue["updated_at"] >= variables["since"]]
+
+        offset = _offset(variables.get("cursor"))
+        page = issues[offset:offset + 100]
+        bucket = self._bucket(token, 'graphql')
+        return {"data": {
+            "rateLimit": {"cost": 1, "remaining": bucket["remaining"]},
+            "repository": {"issues": {
+                "pageInfo": {"hasNextPage": offset + 100 < len(issues), "endCursor": _cursor(offset + len(page))},
+                "nodes": [issue_node(issue) for issue in page],
+            }},
+        }}
+
+    def _gql_IssueNodes(self, document, variables, token):
+        issues = {issue["node_id"]: issue for repo in self.repos.values() for issue in repo.issues}
+        nodes = []
+        errors = []
+        for node_id in variables["ids"]:
+            issue = issues.get(node_id)
+            nodes.append(issue_node(issue) if issue else None)
+            if issue is None:
+                errors.append({"type": "NOT_FOUND", "message": f"Could not resolve to a node with the global id of '{node_id}'"})
+        bucket = self._bucket(token, 'graphql')
+        result = {"data": {"rateLimit": {"cost": 1, "remaining": bucket["remaining"]}, "nodes": nodes}}
+        if errors:
+            result["errors"] = errors
+        return result
+
+    def _gql_RepositoryChanges(self, document, variables, token):
+        # Un alias `r{i}` por cada par de variables `owner{i}`/`name{i}`
+        data = {}
+        index = 0
+        while f"owner{index}" in variables:
+            repo = self.repo(variables[f"owner{index}"], variables[f"name{index}"])
+            latest = max(repo.issues, key=lambda issue: issue["updated_at"], default=None)
+            data[f"r{index}"] = {"issues": {
+                "totalCount": len(repo.issues),
+                "nodes": [{"updatedAt": latest["updated_at"]}] if latest else [],
+            }}
+            index += 1
+        bucket = self._bucket(token, 'graphql')
+        data["rateLimit"] = {"cost": 1, "remaining": bucket["remaining"]}
+        return {"data": data}
+
+    # --- servidor HTTP ---
+
+    @property
+    def base_url(self):
+        if self._server is None:
+            return ''
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def make_server(self, host='127.0.0.1', port=0):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _dispatch(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                status, headers, content = fake.handle(self.command, self.path, self.headers, body)
+                self.send_response(status)
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.send_header('Content-Length', str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            do_GET = do_POST = _dispatch
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        return self._server
+
+    def start(self, host='127.0.0.1', port=0):
+        """Levanta el servidor en un thread y devuelve su URL base."""
+        server = self.make_server(host, port)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return self.base_url
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
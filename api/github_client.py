@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+
+import httpx
+from asgiref.sync import async_to_sync
+
+# Respuestas transitorias de GitHub que vale la pena reintentar
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+
+def rate_limit_wait(response):
+    """
+    Segundos a esperar si la respuesta indica que se alcanzó el rate limit de
+    GitHub (primario o secundario), o None si no es un rate limit.
+    """
+    retry_after = response.headers.get('Retry-After')
+    if retry_after and response.status_code in (403, 429):
+        return float(retry_after)
+    if response.status_code in (403, 429) and response.headers.get('X-RateLimit-Remaining') == '0':
+        reset = int(response.headers.get('X-RateLimit-Reset', 0))
+        return max(0.0, reset - time.time())
+    return None
+
+
+class AsyncGitHubClient:
+    """Cliente asíncrono de la API de GitHub para operaciones en paralelo.
+
+    Las requests se limitan con un semáforo (`max_concurrency`). Los errores de
+    red y 5xx se reintentan con backoff exponencial; ante un rate limit se
+    espera hasta el reset si es menor a `max_rate_limit_wait`, y si no se
+    devuelve la respuesta para que decida quien llama.
+    """
+
+    def __init__(self, token, base_url='https://api.github.com', max_concurrency=8,
+                 max_retries=3, backoff=0.5, max_rate_limit_wait=60, transport=None):
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_rate_limit_wait = max_rate_limit_wait
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(
+            headers={
+                "Accept": "application/vnd.github+json",
+                "Authorization": f"Bearer {token}",
+                "X-GitHub-Api-Version": "2022-11-28"
+            },
+            timeout=30,
+            transport=transport
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+
+    def _url(self, url):
+        return url if url.startswith('http') else f"{self.base_url}{url}"
+
+    async def request(self, method, url, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                async with self._semaphore:
+                    response = await self._client.request(method, self._url(url), **kwargs)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                wait = rate_limit_wait(response)
+                if wait is not None:
+                    if wait > self.max_rate_limit_wait or attempt >= self.max_retries:
+                        return response
+                    await asyncio.sleep(wait)
+                    attempt += 1
+                    continue
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+            attempt += 1
+
+    async def get(self, url, **kwargs):
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request('POST', url, **kwargs)
+
+    async def gather(self, coroutines):
+        return await asyncio.gather(*coroutines)
+
+
+def run_with_client(token, fn, **client_kwargs):
+    """
+    Envoltorio sincrónico: abre un `AsyncGitHubClient`, ejecuta `await fn(client)`
+    y devuelve su resultado. Permite usar el cliente desde `GitService` y las
+    vistas sincrónicas.
+    """
+    async def main():
+        async with AsyncGitHubClient(token, **client_kwargs) as client:
+            return await fn(client)
+
+    return async_to_sync(main)()
+
+
+class GitHubClientSession:
+    """Un `AsyncGitHubClient` abierto durante toda una operación sincrónica.
+
+    `run_with_client` abre un cliente y un event loop por llamada; cuando el
+    código sincrónico pide varias tandas (p. ej. las ventanas de páginas de
+    una sincronización), esta sesión mantiene el loop en un thread propio y
+    reutiliza el mismo cliente y sus conexiones en cada `run`.
+    """
+
+    def __init__(self, token, **client_kwargs):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+
+        async def open_client():
+            # El cliente se crea dentro del loop que lo va a usar
+            return AsyncGitHubClient(token, **client_kwargs)
+
+        self.client = self._submit(open_client())
+
+    def _submit(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def run(self, fn):
+        """Ejecuta `await fn(client)` en el loop de la sesión y devuelve su resultado."""
+        return self._submit(fn(self.client))
+
+    def close(self):
+        try:
+            self._submit(self.client.__aexit__(None, None, None))
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,570 @@
+import logging
+
+from django.db import IntegrityError, OperationalError, transaction
+from django.db.models import F
+
+from .models import Issue, Repository, Tag, IssueTag, IssueTagPredicted, ProjectIssue
+from .predictor import predict_tag
+
+# Columnas de Issue que se sincronizan desde GitHub
+SYNCED_FIELDS = ['node_id', 'html_url', 'title', 'body', 'status', 'labels', 'closed_at', 'content_hash', 'predicted_hash']
+
+# Owner del repositorio ficticio que agrupa los issues de GitHub Projects
+PROJECT_REPOSITORY_OWNER = "__project__"
+
+# Errores que suelen resolverse reintentando la página: deadlocks, conflictos de
+# serialización o un insert concurrente del mismo issue (webhook y sincronización)
+RETRYABLE_ERRORS = (OperationalError, IntegrityError)
+PAGE_RETRIES = 2
+
+logger = logging.getLogger(__name__)
+
+
+def write_page(write):
+    """
+    Ejecuta `write(attempt)` en una transacción (un savepoint si ya hay una
+    abierta), así cada página se confirma entera o no se confirma. Ante un
+    error transitorio se reintenta hasta `PAGE_RETRIES` veces; las páginas ya
+    confirmadas no se tocan. Si se agotan los reintentos se propaga el error.
+    """
+    for attempt in range(PAGE_RETRIES + 1):
+        try:
+            with transaction.atomic():
+                return write(attempt)
+        except RETRYABLE_ERRORS as error:
+            if attempt == PAGE_RETRIES:
+                raise
+            logger.warning("Error al guardar la página, reintento %s: %s", attempt + 1, error)
+
+
+def prediction_text(title, body):
+    return f"{title}. {body or ''}"
+
+
+class PredictionWriter:
+    """Predice los tags de un lote de issues y los guarda con dos upserts.
+
+    `predict` corre el modelo antes de abrir la transacción de la página y
+    guarda el resultado hasta `clear`, así la transacción no queda abierta
+    mientras dura la inferencia y un reintento no vuelve a predecir.
+    """
+
+    def __init__(self):
+        self._tags = {}
+        self._cache = {}
+
+    def _tag(self, name):
+        tag = self._tags.get(name)
+        if tag is None:
+            tag, _ = Tag.objects.get_or_create(name=name)
+            self._tags[name] = tag
+        return tag
+
+    def _predict(self, issue):
+        text = prediction_text(issue.title, issue.body)
+        if text not in self._cache:
+            self._cache[text] = predict_tag(text)
+        return self._cache[text]
+
+    def predict(self, issues):
+        for issue in issues:
+            self._predict(issue)
+
+    def seed(self, issue, preds):
+        """Usa una predicción ya calculada (p. ej. la de la copia compartida) en lugar de correr el modelo."""
+        self._cache[prediction_text(issue.title, issue.body)] = preds
+
+    def cached(self, issue):
+        return self._cache.get(prediction_text(issue.title, issue.body))
+
+    def clear(self):
+        self._cache.clear()
+
+    def forget_tags(self):
+        # Tras un rollback un tag creado en esa transacción ya no existe
+        self._tags.clear()
+
+    def save(self, issues):
+        predicted = []
+        manual = []
+        for issue in issues:
+            #predicción de tags
+            preds = self._predict(issue)
+            if not preds:
+                continue
+            tag1 = self._tag(preds["primary_label"])
+            tag2 = self._tag(preds["secondary_label"])
+            predicted.append(IssueTagPredicted(issue=issue, tag=tag1, confidence=preds["primary_score"], rank=1))
+            predicted.append(IssueTagPredicted(issue=issue, tag=tag2, confidence=preds["secondary_score"], rank=2))
+            manual.append(IssueTag(issue=issue, tag=tag1))
+
+        if predicted:
+            IssueTagPredicted.objects.bulk_create(
+                predicted,
+                update_conflicts=True,
+                unique_fields=['issue', 'tag'],
+                update_fields=['confidence', 'rank']
+            )
+        if manual:
+            IssueTag.objects.bulk_create(manual, ignore_conflicts=True)
+
+
+def predict_pending_issues(batch_size=100, repository=None):
+    """
+    Predice los issues cuyo contenido cambió desde la última predicción
+    (`predicted_hash` distinto de `content_hash`), por ejemplo los que
+    actualizó un webhook. Con `repository` solo los de ese repositorio.
+    Devuelve cuántos issues se procesaron.
+    """
+    pending = Issue.objects.filter(content_hash__isnull=False).exclude(predicted_hash=F('content_hash'))
+    if repository is not None:
+        pending = pending.filter(repository=repository)
+    issues = list(pending.order_by('issue_id')[:batch_size])
+    if not issues:
+        return 0
+
+    writer = PredictionWriter()
+    writer.predict(issues)
+    for issue in issues:
+        issue.predicted_hash = issue.content_hash
+    with transaction.atomic():
+        writer.save(issues)
+        Issue.objects.bulk_update(issues, ['predicted_hash'])
+    return len(issues)
+
+
+class IssueIngestor:
+    """Upsert por página de `IssueRecord` sobre un `Repository`.
+
+    Cada página cuesta una consulta para cargar los issues existentes, un
+    `bulk_create`, un `bulk_update` y dos upserts de predicciones, en lugar de
+    varias consultas por issue. Los issues cuyo `content_hash` no cambió no se
+    escriben ni se vuelven a predecir.
+
+    Las escrituras de cada página van en una sola transacción (ver
+    `write_page`). Una página que falla aun tras los reintentos se cuenta en
+    `stats["failed_pages"]` y se sigue con la siguiente.
+
+    Con `predict=False` la predicción queda pendiente para
+    `predict_pending_issues` en lugar de hacerse en línea.
+
+    Con `shared` (un `SharedIssueStore`) se reutilizan las predicciones de
+    la copia compartida del repositorio y, si `store_shared` es verdadero, la
+    página se guarda también en ella, en la misma transacción.
+    """
+
+    def __init__(self, repository, predict=True, shared=None, store_shared=True):
+        self.repository = repository
+        self.predict = predict
+        self.shared = shared
+        self.store_shared = store_shared
+        self.stats = {"new": 0, "changed": 0, "unchanged": 0, "failed_pages": 0}
+        self._predictions = PredictionWriter()
+
+    def ingest_page(self, records):
+        records = list({record.git_id: record for record in records}.values())
+        if not records:
+            return []
+
+        plan = self._plan(records)
+        known = self.shared.load(records) if self.shared else {}
+        if self.predict:
+            for issue, record in plan["pairs"]:
+                _, prediction, predicted_hash = known.get(record.git_id, (None, None, None))
+                if prediction is not None and predicted_hash == record.content_hash:
+                    self._predictions.seed(issue, prediction)
+            self._predictions.predict(issue for issue, _ in plan["pairs"])
+
+        def write(attempt):
+            nonlocal plan
+            if attempt:
+                # Lo que quedó en memoria del intento fallido (p. ej. pks asignados) no sirve: se vuelve a leer
+                plan = self._plan(records)
+                self._predictions.forget_tags()
+            self._write(plan)
+            if self.shared and self.store_shared:
+                predictions = {}
+                if self.predict:
+                    predictions = {record.git_id: self._predictions.cached(issue) for issue, record in plan["pairs"]}
+                self.shared.store(records, known, predictions)
+
+        try:
+            write_page(write)
+        except RETRYABLE_ERRORS:
+            logger.exception("No se pudo guardar una página de issues de %s", self.repository)
+            self.stats["failed_pages"] += 1
+            return []
+        finally:
+            self._predictions.clear()
+
+        for key in ("new", "changed", "unchanged"):
+            self.stats[key] += plan[key]
+        return plan["pairs"]
+
+    def _plan(self, records):
+        """Compara la página con los issues guardados y arma las escrituras, sin tocar la base."""
+        existing = {
+            issue.git_id: issue
+            for issue in Issue.objects.filter(
+                repository=self.repository,
+                git_id__in=[record.git_id for record in records]
+            )
+        }
+
+        plan = {"to_create": [], "to_update": [], "to_backfill": [], "pairs": [], "unchanged": 0}
+        for record in records:
+            content_hash = record.content_hash
+            issue = existing.get(record.git_id)
+            if issue is None:
+                issue = Issue(repository=self.repository, git_id=record.git_id)
+                plan["to_create"].append(issue)
+            elif issue.content_hash == content_hash:
+                plan["unchanged"] += 1
+                if record.node_id and issue.node_id != record.node_id:
+                    # El contenido no cambió: solo completo el node_id, sin re-predecir
+                    issue.node_id = record.node_id
+                    plan["to_backfill"].append(issue)
+                continue
+            else:
+                plan["to_update"].append(issue)
+            self._apply(issue, record)
+            issue.content_hash = content_hash
+            if self.predict:
+                issue.predicted_hash = content_hash
+            plan["pairs"].append((issue, record))
+
+        plan["new"] = len(plan["to_create"])
+        plan["changed"] = len(plan["to_update"])
+        return plan
+
+    def _write(self, plan):
+        if plan["to_create"]:
+            Issue.objects.bulk_create(plan["to_create"])
+        if plan["to_update"]:
+            Issue.objects.bulk_update(plan["to_update"], SYNCED_FIELDS)
+        if plan["to_backfill"]:
+            Issue.objects.bulk_update(plan["to_backfill"], ['node_id'])
+
+        if self.predict:
+            self._predictions.save([issue for issue, _ in plan["pairs"]])
+
+    def _apply(self, issue, record):
+        issue.node_id = record.node_id
+        issue.html_url = record.html_url
+        issue.title = record.title
+        issue.body = record.body
+        issue.status = record.is_open
+        issue.labels = record.labels_text
+        issue.closed_at = record.closed_at
+
+
+def get_project_repository(user):
+    """Repositorio contenedor de los issues importados desde GitHub Projects."""
+    repo, _ = Repository.objects.get_or_create(
+        user=user,
+        owner=PROJECT_REPOSITORY_OWNER,
+        name="github-projects",
+        defaults={
+            "git_id": -1000 - user.id,
+            "html_url": "",
+            "description": "Issues importados desde GitHub Projects",
+            "labels": []
+        }
+    )
+    return repo
+
+
+def item_updated_at(item):
+    """Última modificación de un item de proyecto: la del item (p. ej. su status) o la de su issue."""
+    content = item.get("content") or {}
+    return max(item.get("updatedAt") or "", content.get("updatedAt") or "") or None
+
+
+class ProjectItemIngestor:
+    """Procesa los items de un GitHub Project página por página.
+
+    `import_page` corresponde a la importación inicial y `refresh_page` a la
+    actualización de un proyecto ya importado; `refresh_entries` actualiza
+    items de varios proyectos a la vez. Cada página se guarda en una
+    transacción (ver `write_page`); una página que falla aun tras los
+    reintentos se cuenta en `failed_pages` y se sigue con la siguiente.
+    """
+
+    def __init__(self, git_service, project, project_repo):
+        self.git_service = git_service
+        # None al actualizar varios proyectos juntos (`refresh_entries`)
+        self.project = project
+        self.project_repo = project_repo
+        self.user = git_service.user
+        self.predicted = 0
+        self.failed_pages = 0
+        self.unchanged = 0
+        # `updatedAt` más reciente visto por proyecto, para su marca `items_updated_at`
+        self.latest_updates = {}
+        self._preds = {}
+
+    def _find_issue(self, content):
+        return (
+            Issue.objects
+            .filter(html_url=content["url"], repository__user=self.user)
+            .select_related("repository")
+            .first()
+        )
+
+    def _github_labels(self, content):
+        return ", ".join(
+            l["name"] for l in content.get("labels", {}).get("nodes", [])
+        )
+
+    def _status_value(self, item):
+        status_value = "TODO"
+        for field in item["fieldValues"]["nodes"]:
+            if field.get("field", {}).get("name") == "Status":
+                status_value = field["name"].upper()
+        return status_value
+
+    def _prediction(self, content):
+        text = prediction_text(content["title"], content.get("body"))
+        if text not in self._preds:
+            self._preds[text] = predict_tag(text)
+        return self._preds[text]
+
+    def _predict(self, issue, content, repo_owner, repo_name):
+        preds = self._prediction(content)
+        if not preds:
+            return
+        self.predicted += 1
+
+        predicted_label = preds["primary_label"]
+        if issue.labels:
+            issue.labels = f"{issue.labels}, {predicted_label}"
+        else:
+            issue.labels = predicted_label
+        issue.save(update_fields=["labels"])
+
+        tag1, _ = Tag.objects.get_or_create(name=preds["primary_label"])
+        IssueTagPredicted.objects.update_or_create(
+            issue=issue,
+            tag=tag1,
+            defaults={"confidence": preds["primary_score"], "rank": 1}
+        )
+        tag2, _ = Tag.objects.get_or_create(name=preds["secondary_label"])
+        IssueTagPredicted.objects.update_or_create(
+            issue=issue,
+            tag=tag2,
+            defaults={"confidence": preds["secondary_score"], "rank": 2}
+        )
+        IssueTag.objects.update_or_create(issue=issue, tag=tag1)
+
+        if repo_owner and repo_name:
+            issue_number = self.git_service.extract_issue_number(content["url"])
+            if issue_number:
+                self.git_service.enqueue_label_for_issue(
+                    owner=repo_owner,
+                    repo=repo_name,
+                    issue_number=issue_number,
+                    label_name=tag1.name
+                )
+
+    def _write_page(self, write, items):
+        predicted = self.predicted
+
+        def attempt_write(attempt):
+            # Un intento fallido no cuenta sus predicciones
+            self.predicted = predicted
+            write(items)
+
+        try:
+            write_page(attempt_write)
+        except RETRYABLE_ERRORS:
+            logger.exception("No se pudo guardar una página del proyecto %s", self.project or "(varios)")
+            self.predicted = predicted
+            self.failed_pages += 1
+        finally:
+            self._preds.clear()
+
+    def _track(self, project, item):
+        updated_at = item_updated_at(item)
+        latest = self.latest_updates.get(project.pk)
+        if updated_at and (latest is None or updated_at > latest):
+            self.latest_updates[project.pk] = updated_at
+        return updated_at
+
+    def _is_older(self, project, item):
+        # Con precisión de segundos, como `updatedAt`: lo del mismo segundo que la marca se vuelve a procesar
+        updated_at = self._track(project, item)
+        if not updated_at or project.items_updated_at is None or not item.get("content"):
+            return False
+        return updated_at < project.items_updated_at.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+    def _skip_unchanged(self, entries):
+        """
+        Quita los items anteriores al `items_updated_at` de su proyecto que ya
+        están guardados. Un item viejo cuyo `ProjectIssue` se borró localmente
+        se procesa igual, para volver a crearlo.
+        """
+        older = [(project, item) for project, item in entries if self._is_older(project, item)]
+        if not older:
+            return entries
+        stored = set(
+            ProjectIssue.objects
+            .filter(
+                project__in={project.pk for project, _ in older},
+                issue__html_url__in={item["content"]["url"] for _, item in older},
+                issue__repository__user=self.user
+            )
+            .values_list("project_id", "issue__html_url")
+        )
+        skipped = {
+            id(item) for project, item in older
+            if (project.pk, item["content"]["url"]) in stored
+        }
+        return [(project, item) for project, item in entries if id(item) not in skipped]
+
+    def import_page(self, items):
+        for item in items:
+            self._track(self.project, item)
+        # Los labels de GitHub y la inferencia se resuelven antes de abrir la transacción
+        for item in items:
+            content = item.get("content")
+            if not content:
+                continue
+            repo_owner, repo_name = self.git_service.extract_repo_from_issue_url(content["url"])
+            if repo_owner and repo_name:
+                self.git_service.ensure_repo_labels(repo_owner, repo_name)
+            self._prediction(content)
+
+        self._write_page(self._import_items, items)
+
+    def _import_items(self, items):
+        for item in items:
+            content = item.get("content")
+            if not content:
+                continue
+
+            issue = self._find_issue(content)
+            if not issue:
+                issue = Issue.objects.create(
+                    title=content["title"],
+                    body=content.get("body"),
+                    html_url=content["url"],
+                    labels=self._github_labels(content),
+                    status=content["state"] == "OPEN",
+                    repository=self.project_repo
+                )
+
+            repo_owner, repo_name = self.git_service.extract_repo_from_issue_url(content["url"])
+            self._predict(issue, content, repo_owner, repo_name)
+
+            ProjectIssue.objects.get_or_create(
+                project=self.project,
+                issue=issue,
+                defaults={"status": self._status_value(item)}
+            )
+
+    def refresh_page(self, items):
+        self.refresh_entries([(self.project, item) for item in items])
+
+    def refresh_entries(self, entries):
+        """
+        Actualiza items de uno o varios proyectos (pares `(project, item)`) en
+        una sola pasada: los issues se buscan con una consulta y se escriben
+        con `bulk_update`/`bulk_create`, y los `ProjectIssue` con un upsert.
+        Los items ya guardados y sin cambios desde el `items_updated_at` de su
+        proyecto no se tocan.
+        """
+        changed = self._skip_unchanged(entries)
+        self.unchanged += len(entries) - len(changed)
+        if not changed:
+            return
+        entries = changed
+
+        contents = self._refresh_contents(entries)
+        # Los issues nuevos se predicen: labels de GitHub e inferencia antes de abrir la transacción
+        existing = set(
+            Issue.objects
+            .filter(html_url__in=list(contents), repository__user=self.user)
+            .values_list("html_url", flat=True)
+        )
+        for url, content in contents.items():
+            if url in existing:
+                continue
+            repo_owner, repo_name = self.git_service.extract_repo_from_issue_url(url)
+            self.git_service.ensure_repo_labels(repo_owner, repo_name)
+            self._prediction(content)
+
+        self._write_page(self._refresh_items, entries)
+
+    def _refresh_contents(self, entries):
+        # Solo los items que son issues de un repositorio de GitHub; si un issue
+        # está en varios proyectos, su contenido es el mismo en todos
+        contents = {}
+        for _, item in entries:
+            content = item.get("content")
+            if not content:
+                continue
+            repo_owner, repo_name = self.git_service.extract_repo_from_issue_url(content["url"])
+            if repo_owner and repo_name:
+                contents[content["url"]] = content
+        return contents
+
+    def _refresh_items(self, entries):
+        contents = self._refresh_contents(entries)
+        if not contents:
+            return
+
+        issues = {}
+        for issue in (
+            Issue.objects
+            .filter(html_url__in=list(contents), repository__user=self.user)
+            .order_by("issue_id")
+        ):
+            issues.setdefault(issue.html_url, issue)
+
+        changed = []
+        for url, issue in issues.items():
+            content = contents[url]
+            values = {
+                "title": content["title"],
+                "body": content.get("body"),
+                "status": content["state"] == "OPEN",
+                "labels": self._github_labels(content),
+            }
+            if any(getattr(issue, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(issue, field, value)
+                changed.append(issue)
+        if changed:
+            Issue.objects.bulk_update(changed, ["title", "body", "status", "labels"])
+
+        created = Issue.objects.bulk_create([
+            Issue(
+                html_url=url,
+                title=content["title"],
+                body=content.get("body"),
+                status=content["state"] == "OPEN",
+                labels=self._github_labels(content),
+                repository=self.project_repo
+            )
+            for url, content in contents.items() if url not in issues
+        ])
+        issues.update((issue.html_url, issue) for issue in created)
+
+        project_issues = {}
+        for project, item in entries:
+            content = item.get("content")
+            if content and content["url"] in issues:
+                issue = issues[content["url"]]
+                project_issues[(project.pk, issue.pk)] = ProjectIssue(
+                    project=project, issue=issue, status=self._status_value(item)
+                )
+        ProjectIssue.objects.bulk_create(
+            list(project_issues.values()),
+            update_conflicts=True,
+            unique_fields=["project", "issue"],
+            update_fields=["status"]
+        )
+
+        for issue in created:
+            repo_owner, repo_name = self.git_service.extract_repo_from_issue_url(issue.html_url)
+            self._predict(issue, contents[issue.html_url], repo_owner, repo_name)
@@ -0,0 +1,372 @@
+import csv
+import hashlib
+import io
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import ExitStack
+from datetime import timedelta
+
+import orjson
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .locks import advisory_lock, project_sync_key, repository_sync_key
+from .models import Job, SyncEvent, Repository, Project, Issue, Tag, IssueTag
+from .serializers import ProjectSerializer
+from .services import GitService
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto el worker marca que sigue vivo, y a partir de cuánto silencio otro worker retoma el job
+HEARTBEAT_INTERVAL = 30
+STALE_AFTER = timedelta(minutes=5)
+# Un job retomado más veces que esto se da por fallido (probablemente mata al worker)
+MAX_ATTEMPTS = 3
+# Frecuencia máxima con la que se escribe el progreso en la base
+PROGRESS_INTERVAL = 2
+# Evento SSE que genera cada contador de progreso
+COUNTER_EVENTS = {
+    'pages': 'page_fetched',
+    'issues': 'issues_upserted',
+    'predictions': 'predictions_written',
+}
+# Los eventos ya entregados (o que nadie escuchó) se borran pasado este tiempo
+EVENT_RETENTION = timedelta(days=1)
+
+
+def dedupe_key(user, kind, params):
+    if "owner" in params and "name" in params:
+        # El mismo repositorio de GitHub aunque se haya escrito con otras mayúsculas
+        params = {**params, "owner": params["owner"].lower(), "name": params["name"].lower()}
+    digest = hashlib.sha1(orjson.dumps(params, option=orjson.OPT_SORT_KEYS)).hexdigest()
+    return f"{user.pk}:{kind}:{digest}"
+
+
+def enqueue_job(user, kind, params=None):
+    """
+    Encola un job. Si ya hay uno igual (mismo usuario, tipo y parámetros) en
+    cola o en ejecución, devuelve ese con `attached = True` en lugar de crear
+    otro: dos pestañas que piden la misma sincronización comparten el job.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Tipo de job desconocido: {kind}")
+    params = params or {}
+    key = dedupe_key(user, kind, params)
+
+    for _ in range(3):
+        existing = Job.objects.filter(
+            dedupe_key=key, status__in=[Job.STATUS_QUEUED, Job.STATUS_RUNNING]
+        ).first()
+        if existing:
+            existing.attached = True
+            return existing
+        try:
+            with transaction.atomic():
+                job = Job.objects.create(user=user, kind=kind, params=params, dedupe_key=key)
+        except IntegrityError:
+            # Otro request creó el mismo job entre la consulta y el insert
+            continue
+        job.attached = False
+        return job
+    raise RuntimeError("No se pudo encolar el job")
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobProgress:
+    """Acumula los contadores de avance de un job y los guarda cada `PROGRESS_INTERVAL` segundos.
+
+    Cada avance genera además eventos `SyncEvent` para el stream SSE del
+    usuario; `detail` se agrega a sus datos (p. ej. el repositorio y los ids
+    de los issues guardados).
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.counts = dict(job.progress or {})
+        self._saved_at = 0
+
+    def add(self, detail=None, **counts):
+        events = []
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+            if value and key in COUNTER_EVENTS:
+                events.append(self._event(COUNTER_EVENTS[key], count=value, total=self.counts[key], **(detail or {})))
+        if events:
+            SyncEvent.objects.bulk_create(events)
+        if time.monotonic() - self._saved_at >= PROGRESS_INTERVAL:
+            self.flush()
+
+    def _event(self, event, **data):
+        return SyncEvent(user_id=self.job.user_id, job_id=self.job.pk, kind=event, data={"jobId": self.job.pk, **data})
+
+    def emit(self, event, **data):
+        self._event(event, **data).save()
+
+    def flush(self):
+        self._saved_at = time.monotonic()
+        Job.objects.filter(pk=self.job.pk).update(progress=self.counts, heartbeat_at=timezone.now())
+
+
+def claim_job(worker):
+    """
+    Toma el job más antiguo en cola, o uno en ejecución cuyo worker dejó de
+    dar señales. `SKIP LOCKED` permite que varios workers, en cualquier nodo,
+    consuman la tabla sin tomar el mismo job.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status=Job.STATUS_QUEUED)
+                | Q(status=Job.STATUS_RUNNING, heartbeat_at__lt=now - STALE_AFTER)
+            )
+            .order_by('created_at')
+            .first()
+        )
+        if job is None:
+            return None
+
+        if job.attempts >= MAX_ATTEMPTS:
+            job.status = Job.STATUS_FAILED
+            job.error = "El job se interrumpió demasiadas veces"
+            job.finished_at = now
+            job.save(update_fields=['status', 'error', 'finished_at'])
+            return None
+
+        job.status = Job.STATUS_RUNNING
+        job.attempts += 1
+        job.worker = worker
+        job.started_at = now
+        job.heartbeat_at = now
+        job.save(update_fields=['status', 'attempts', 'worker', 'started_at', 'heartbeat_at'])
+    return job
+
+
+def _heartbeat(job_id, stop):
+    try:
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            Job.objects.filter(pk=job_id, status=Job.STATUS_RUNNING).update(heartbeat_at=timezone.now())
+    finally:
+        connection.close()
+
+
+def run_job(job):
+    progress = JobProgress(job)
+    progress.emit('job_started', kind=job.kind)
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(job.pk, stop), daemon=True)
+    heartbeat.start()
+
+    try:
+        result = JOB_HANDLERS[job.kind](job, progress)
+    except Exception as ex:
+        logger.exception("Error en el job %s", job)
+        result = {"is_success": False, "message": str(ex)}
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    job.progress = progress.counts
+    job.finished_at = timezone.now()
+    if result.get("is_success"):
+        job.status = Job.STATUS_SUCCEEDED
+        job.result = {key: value for key, value in result.items() if key != "is_success"}
+    else:
+        job.status = Job.STATUS_FAILED
+        job.error = result.get("message")
+        job.result = {"response_code": result.get("response_code")}
+        if "stats" in result:
+            # Lo que se llegó a hacer antes del error
+            job.result["stats"] = result["stats"]
+    job.save(update_fields=['progress', 'finished_at', 'status', 'result', 'error'])
+
+    progress.emit(
+        'job_done' if job.status == Job.STATUS_SUCCEEDED else 'job_failed',
+        kind=job.kind,
+        progress=job.progress,
+        error=job.error
+    )
+    SyncEvent.objects.filter(created_at__lt=timezone.now() - EVENT_RETENTION).delete()
+    return job
+
+
+def _summary(result):
+    # La lista de issues no se guarda en el job: se consulta con los endpoints de Issue
+    return {key: value for key, value in result.items() if key != "data"}
+
+
+# Las sincronizaciones de un mismo repositorio o proyecto se serializan con un
+# advisory lock: los pedidos de usuario esperan a que termine la que está en
+# curso, y los del scheduler se saltean. El de repositorio es por repositorio
+# de GitHub, así que también serializa a usuarios distintos: el que espera
+# encuentra la copia compartida recién sincronizada y no vuelve a pedirla.
+
+SYNC_IN_PROGRESS = {"is_success": True, "message": "Ya hay una sincronización en curso", "skipped": True}
+
+
+def _download_repository(job, progress):
+    params = job.params
+    with advisory_lock(repository_sync_key(params["owner"], params["name"])):
+        result = GitService(job.user, progress).download_new_repository(
+            params["owner"], params["name"], params["labels"], params["labelMode"], params["backend"]
+        )
+    return _summary(result)
+
+
+def _update_repository(job, progress):
+    params = job.params
+    repo = Repository.objects.filter(pk=params["repositoryId"], user=job.user).first()
+    if repo is None:
+        return {"is_success": False, "response_code": 404, "message": "Repository not found"}
+    with advisory_lock(repository_sync_key(repo.owner, repo.name)):
+        result = GitService(job.user, progress).update_repository(
+            params["repositoryId"], params.get("label"), params["backend"]
+        )
+    return _summary(result)
+
+
+def _sync_repository(job, progress):
+    repo = Repository.objects.get(pk=job.params["repositoryId"], user=job.user)
+    with advisory_lock(repository_sync_key(repo.owner, repo.name), wait=False) as acquired:
+        if not acquired:
+            return SYNC_IN_PROGRESS
+        return GitService(job.user, progress).sync_repository(
+            repo,
+            backend=job.params.get("backend", GitService.BACKEND_REST),
+            remote_issue_count=job.params.get("remoteIssueCount")
+        )
+
+
+def _import_project(job, progress):
+    params = job.params
+    with advisory_lock(project_sync_key(job.user_id, params["owner"], params["projectNumber"])):
+        result = GitService(job.user, progress).import_project(params["owner"], params["projectNumber"])
+    if result["is_success"]:
+        result["data"] = ProjectSerializer(result["data"]).data
+    return result
+
+
+def _refresh_project(job, progress):
+    project = Project.objects.get(pk=job.params["projectId"], user=job.user)
+    with advisory_lock(project_sync_key(job.user_id, project.owner, project.project_number)):
+        result = GitService(job.user, progress).refresh_project(project)
+    if result["is_success"]:
+        result["data"] = ProjectSerializer(result["data"]).data
+    return result
+
+
+def _refresh_projects(job, progress):
+    # Los locks se toman siempre en el mismo orden, para no trabarse con otro job que tome varios
+    projects = list(Project.objects.filter(user=job.user).order_by('project_id'))
+    with ExitStack() as stack:
+        for project in projects:
+            stack.enter_context(advisory_lock(project_sync_key(job.user_id, project.owner, project.project_number)))
+        result = GitService(job.user, progress).refresh_projects(projects)
+    if result["is_success"]:
+        result["data"] = ProjectSerializer(result["data"], many=True).data
+    return result
+
+
+def _refresh_issues(job, progress):
+    issues = list(
+        Issue.objects
+        .filter(pk__in=job.params["issueIds"], repository__user=job.user)
+        .select_related('repository')
+    )
+    return GitService(job.user, progress).refresh_issues(issues)
+
+
+def _import_issues(job, progress):
+    user = job.user
+    errores = 0
+    csv_reader = csv.reader(io.StringIO(job.params["csv"]))
+    for idx, row in enumerate(csv_reader):
+        try:
+            if (row[1]) == "title":
+                continue
+            title= row[1]
+            htmlUrl= row[11]
+            issue = Issue.objects.filter(html_url=htmlUrl, repository__user=user).first()
+            if issue: #actualizar datos del issue que ya existe
+                issue.status = row[2] == 'True'
+                issue.discarded = row[3] == 'True'
+                issue.observation = row[4]
+                issue.labels = row[8]
+                issue.body = row[12]
+                issue.save()
+            else:
+                #Mirar si existe el repo en la bd. Si existe entonces actualizo su repo. Si no existe entonces traerlo. En ambos casos luego actualizar el issue.
+                owner_name= htmlUrl.split('/')[3]
+                repo_name= htmlUrl.split('/')[4]
+                repo = Repository.objects.filter(owner=owner_name, name= repo_name,user=user).first()
+                git_service = GitService(user)
+                if repo:
+                    issue = Issue.objects.create(
+                        title=title,
+                        status=row[2] == 'True',
+                        discarded=row[3] == 'True',
+                        observation=row[4],
+                        labels=row[8],
+                        body=row[12],
+                        html_url=htmlUrl,
+                        repository= repo
+                    )
+                else:
+                    #analizo si es un issue manual o si tiene repo pero no esta en el sistema (entonces lo traigo)
+                    if htmlUrl:
+                        git_service.register_new_repository(owner_name, repo_name)
+                        repo = Repository.objects.filter(owner=owner_name, name= repo_name,user=user).first()
+                        issue = Issue.objects.create(
+                            title=title,
+                            status=row[2] == 'True',
+                            discarded=row[3] == 'True',
+                            observation=row[4],
+                            labels=row[8],
+                            body=row[12],
+                            html_url=htmlUrl,
+                            repository=repo
+                        )
+                    else:
+                        issue = Issue.objects.create(
+                            title=title,
+                            discarded=row[3] == 'True',
+                            observation=row[4],
+                            body=row[12]
+                        )
+            #Analisis del tag del issue: Existe en la base de datos local, no existe (crearlo entonces)
+            tag = Tag.objects.filter(name__iexact=row[10]).first()
+            if not tag:
+                tag = Tag.objects.create(name=row[10])
+            IssueTag.objects.get_or_create(issue=issue, tag=tag)
+            progress.add(issues=1)
+
+        except Exception as e:
+            logger.warning("Error en linea %s: %s", idx, e)
+            errores = errores + 1
+            progress.add(errors=1)
+            continue
+
+    if errores == 0:
+        return {"is_success": True, "message": "Archivo recibido y leído correctamente."}
+    return {"is_success": False, "response_code": 500, "message": "Hubo errores durante la importación de issues"}
+
+
+JOB_HANDLERS = {
+    'download_repository': _download_repository,
+    'update_repository': _update_repository,
+    'sync_repository': _sync_repository,
+    'import_project': _import_project,
+    'refresh_project': _refresh_project,
+    'refresh_projects': _refresh_projects,
+    'refresh_issues': _refresh_issues,
+    'import_issues': _import_issues,
+}
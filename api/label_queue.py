@@ -0,0 +1,146 @@
+import asyncio
+from collections import defaultdict
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from django.db import transaction
+from django.utils import timezone
+
+from .github_client import AsyncGitHubClient, rate_limit_wait
+from .models import PendingIssueLabel
+from .services import GitService
+
+MAX_ATTEMPTS = 6
+# Mientras un worker procesa un lote, las filas quedan reservadas este tiempo
+CLAIM_LEASE = timedelta(minutes=5)
+# Respuestas de GitHub que no se arreglan reintentando
+PERMANENT_ERRORS = (404, 410, 422)
+
+
+def _claim_batch(batch_size):
+    now = timezone.now()
+    with transaction.atomic():
+        rows = list(
+            PendingIssueLabel.objects
+            .select_related('user__github_token')
+            .select_for_update(skip_locked=True, of=('self',))
+            .filter(next_attempt_at__lte=now, attempts__lt=MAX_ATTEMPTS)
+            .order_by('next_attempt_at')[:batch_size]
+        )
+        if rows:
+            PendingIssueLabel.objects.filter(pk__in=[row.pk for row in rows]).update(
+                next_attempt_at=now + CLAIM_LEASE
+            )
+    return rows
+
+
+def _retry_at(response):
+    wait = rate_limit_wait(response)
+    if wait is None:
+        return None
+    return timezone.now() + timedelta(seconds=wait)
+
+
+def flush_pending_labels(batch_size=200, max_workers=4):
+    """
+    Aplica en GitHub los labels encolados. Los labels del mismo issue se
+    envían en un solo POST, con a lo sumo `max_workers` requests en paralelo
+    por token. Devuelve cuántos issues se etiquetaron y cuántos fallaron.
+    """
+    rows = _claim_batch(batch_size)
+    if not rows:
+        return {"applied": 0, "failed": 0}
+
+    groups = defaultdict(list)
+    tokens = {}
+    token_errors = {}
+    for row in rows:
+        groups[(row.user_id, row.owner, row.repo, row.issue_number)].append(row)
+        if row.user_id not in tokens and row.user_id not in token_errors:
+            try:
+                tokens[row.user_id] = GitService(row.user)._get_github_token()
+            except ValueError as ex:
+                token_errors[row.user_id] = str(ex)
+
+    failed = 0
+    keys_by_user = defaultdict(list)
+    for key, group_rows in list(groups.items()):
+        if key[0] in token_errors:
+            # Sin token no hay nada que reintentar: se da por fallido sin frenar al resto de los usuarios
+            PendingIssueLabel.objects.filter(pk__in=[row.pk for row in group_rows]).update(
+                attempts=MAX_ATTEMPTS,
+                last_error=token_errors[key[0]]
+            )
+            del groups[key]
+            failed += 1
+            continue
+        keys_by_user[key[0]].append(key)
+
+    # Usuarios que agotaron su rate limit en esta pasada, con la hora de reintento
+    paused_users = {}
+    outcomes = {}
+
+    async def send_user(user_id, keys):
+        async with AsyncGitHubClient(tokens[user_id], base_url=GitService.BASE_URL, max_concurrency=max_workers) as client:
+            async def send(key):
+                _, owner, repo, issue_number = key
+                if user_id in paused_users:
+                    return
+                labels = sorted({row.label for row in groups[key]})
+                try:
+                    response = await client.post(
+                        f"/repos/{owner}/{repo}/issues/{issue_number}/labels",
+                        json={"labels": labels}
+                    )
+                except Exception as ex:
+                    outcomes[key] = ex
+                    return
+                outcomes[key] = response
+                retry_at = _retry_at(response)
+                if retry_at:
+                    paused_users[user_id] = retry_at
+
+            await client.gather(send(key) for key in keys)
+
+    async def send_all():
+        await asyncio.gather(*(send_user(user_id, keys) for user_id, keys in keys_by_user.items()))
+
+    async_to_sync(send_all)()
+
+    applied = 0
+    for key, group_rows in groups.items():
+        pks = [row.pk for row in group_rows]
+        outcome = outcomes.get(key)
+
+        if outcome is not None and not isinstance(outcome, Exception) and outcome.status_code in (200, 201):
+            PendingIssueLabel.objects.filter(pk__in=pks).delete()
+            applied += 1
+            continue
+
+        if outcome is None:
+            # Usuario pausado por rate limit en esta pasada: no cuenta como intento
+            PendingIssueLabel.objects.filter(pk__in=pks).update(next_attempt_at=paused_users[key[0]])
+            continue
+
+        attempts = max(row.attempts for row in group_rows)
+        if isinstance(outcome, Exception):
+            error = str(outcome)
+            retry_at = None
+        else:
+            error = f"{outcome.status_code}: {outcome.text[:500]}"
+            retry_at = _retry_at(outcome)
+        if not retry_at:
+            # El rate limit no consume intentos; los errores permanentes agotan todos
+            attempts = MAX_ATTEMPTS if getattr(outcome, 'status_code', None) in PERMANENT_ERRORS else attempts + 1
+
+        if retry_at is None:
+            retry_at = timezone.now() + timedelta(minutes=2 ** attempts)
+
+        PendingIssueLabel.objects.filter(pk__in=pks).update(
+            attempts=attempts,
+            next_attempt_at=retry_at,
+            last_error=error
+        )
+        failed += 1
+
+    return {"applied": applied, "failed": failed}
@@ -0,0 +1,48 @@
+import hashlib
+from contextlib import contextmanager
+
+from django.db import connection
+
+
+def _lock_id(key):
+    # pg_advisory_lock recibe un bigint: se deriva uno estable de la clave
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+@contextmanager
+def advisory_lock(key, wait=True):
+    """
+    Lock de sesión de Postgres sobre `key`, válido entre procesos y nodos.
+    Con `wait=False` no bloquea: devuelve False si otro proceso lo tiene.
+    Es de sesión y no de transacción porque una sincronización hace varias
+    transacciones.
+    """
+    if connection.vendor != 'postgresql':
+        yield True
+        return
+
+    lock_id = _lock_id(key)
+    with connection.cursor() as cursor:
+        if wait:
+            cursor.execute("SELECT pg_advisory_lock(%s)", [lock_id])
+            acquired = True
+        else:
+            cursor.execute("SELECT pg_try_advisory_lock(%s)", [lock_id])
+            acquired = cursor.fetchone()[0]
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(%s)", [lock_id])
+
+
+def repository_sync_key(owner, name):
+    # Por repositorio de GitHub y no por usuario: los usuarios que lo siguen comparten sus
+    # `GitHubIssue`, y el segundo que lo sincroniza espera y lee la copia compartida
+    return f"sync:repository:{owner.lower()}/{name.lower()}"
+
+
+def project_sync_key(user_id, owner, project_number):
+    return f"sync:project:{user_id}:{owner.lower()}/{project_number}"
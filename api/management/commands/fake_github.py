@@ -0,0 +1,55 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.fake_github import FakeGitHub, FakeGitHubConfig
+
+
+class Command(BaseCommand):
+    help = (
+        "Levanta un GitHub falso local (REST de issues y labels, GraphQL de issues y projectV2) "
+        "con repositorios sintéticos, para probar y medir la ingesta sin red."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8001)
+        parser.add_argument('--issues', type=int, default=100, help='Issues de cada repositorio no listado en --repo.')
+        parser.add_argument(
+            '--repo', action='append', default=[], metavar='OWNER/NAME=N',
+            help='Tamaño de un repositorio puntual; se puede repetir.'
+        )
+        parser.add_argument('--org', action='append', default=[], help='Login que se trata como organización.')
+        parser.add_argument('--project-items', type=int, default=250)
+        parser.add_argument('--latency', type=float, default=0.0, help='Segundos de demora por request.')
+        parser.add_argument('--failure-rate', type=float, default=0.0, help='Fracción de requests que responden 502.')
+        parser.add_argument('--rate-limit', type=int, default=5000, help='Requests por hora y por token.')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        repos = {}
+        for spec in options['repo']:
+            full_name, _, size = spec.partition('=')
+            if full_name.count('/') != 1 or not size.isdigit():
+                raise CommandError(f"--repo debe tener la forma owner/name=N: {spec}")
+            repos[full_name] = int(size)
+
+        fake = FakeGitHub(FakeGitHubConfig(
+            default_issues=options['issues'],
+            repos=repos,
+            orgs=tuple(options['org']),
+            project_items=options['project_items'],
+            latency=options['latency'],
+            failure_rate=options['failure_rate'],
+            rate_limit=options['rate_limit'],
+            seed=options['seed'],
+        ))
+        server = fake.make_server(options['host'], options['port'])
+
+        self.stdout.write(f"GitHub falso escuchando en {fake.base_url}")
+        self.stdout.write(f"  export GITHUB_API_URL={fake.base_url}")
+        self.stdout.write(f"  Estadísticas de llamadas: {fake.base_url}/_fake/stats")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
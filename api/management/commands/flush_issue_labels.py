@@ -0,0 +1,33 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.label_queue import flush_pending_labels
+
+
+class Command(BaseCommand):
+    help = "Aplica en GitHub los labels predichos que quedaron encolados durante las importaciones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Procesa lo pendiente y termina.')
+        parser.add_argument('--interval', type=float, default=5, help='Segundos de espera cuando no hay pendientes.')
+        parser.add_argument('--workers', type=int, default=4, help='Requests concurrentes a GitHub por token.')
+        parser.add_argument('--batch-size', type=int, default=200)
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        while self.running:
+            result = flush_pending_labels(batch_size=options['batch_size'], max_workers=options['workers'])
+            if result['applied'] or result['failed']:
+                self.stdout.write(f"Labels aplicados: {result['applied']}, con error: {result['failed']}")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+    def _stop(self, signum, frame):
+        self.running = False
@@ -0,0 +1,68 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.archive import RawPageArchive
+from api.ingestion import predict_pending_issues
+from api.models import Repository, Issue
+from api.services import GitService
+
+
+class Command(BaseCommand):
+    help = (
+        "Administra el archivo de páginas crudas de GitHub (GITHUB_ARCHIVE_DIR): lista las corridas "
+        "de un repositorio, las re-procesa sin red o aplica la retención."
+    )
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='action', required=True)
+
+        list_parser = subparsers.add_parser('list', help='Corridas archivadas de un repositorio.')
+        list_parser.add_argument('repository_id', type=int)
+
+        replay = subparsers.add_parser('replay', help='Re-ingiere un repositorio desde el archivo, sin pedir nada a GitHub.')
+        replay.add_argument('repository_id', type=int)
+        replay.add_argument('--capture', default=None, help='Corrida a usar; por defecto la última completa.')
+        replay.add_argument(
+            '--repredict', action='store_true',
+            help='Vuelve a predecir todos los issues del repositorio (p. ej. tras cambiar el clasificador).'
+        )
+
+        subparsers.add_parser('prune', help='Borra lo que excede GITHUB_ARCHIVE_RETENTION_DAYS y GITHUB_ARCHIVE_MAX_BYTES.')
+
+    def handle(self, *args, **options):
+        archive = RawPageArchive.from_settings()
+        if archive is None:
+            raise CommandError("El archivo está deshabilitado: definir GITHUB_ARCHIVE_DIR")
+
+        if options['action'] == 'prune':
+            freed = archive.prune()
+            self.stdout.write(f"Liberados {freed} bytes")
+            return
+
+        repo = Repository.objects.select_related('user').filter(pk=options['repository_id']).first()
+        if repo is None:
+            raise CommandError(f"No existe el repositorio {options['repository_id']}")
+
+        if options['action'] == 'list':
+            for capture in archive.captures(repo.owner, repo.name):
+                self.stdout.write(
+                    f"{capture['capture']}  {capture['fetched_at']:%Y-%m-%d %H:%M}  {capture['kind']:<15} "
+                    f"páginas={capture['pages']} bytes={capture['bytes']} since={capture['since'] or '-'} "
+                    f"labels={','.join(capture['labels']) or '-'}{'' if capture['complete'] else '  (incompleta)'}"
+                )
+            return
+
+        result = GitService(repo.user).replay_repository(repo, options['capture'])
+        if not result['is_success']:
+            raise CommandError(result['message'])
+        self.stdout.write(f"Corrida {result['capture']}: {result['stats']}")
+
+        if options['repredict']:
+            # Con el hash de predicción vacío, `predict_pending_issues` los vuelve a procesar
+            Issue.objects.filter(repository=repo).update(predicted_hash=None)
+            total = 0
+            while True:
+                processed = predict_pending_issues(repository=repo)
+                if not processed:
+                    break
+                total += processed
+            self.stdout.write(f"Issues re-predichos: {total}")
@@ -0,0 +1,32 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.ingestion import predict_pending_issues
+
+
+class Command(BaseCommand):
+    help = "Predice los tags de los issues cuyo contenido cambió desde la última predicción (p. ej. por webhooks)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Procesa lo pendiente y termina.')
+        parser.add_argument('--interval', type=float, default=5, help='Segundos de espera cuando no hay pendientes.')
+        parser.add_argument('--batch-size', type=int, default=100)
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        while self.running:
+            processed = predict_pending_issues(batch_size=options['batch_size'])
+            if processed:
+                self.stdout.write(f"Issues predichos: {processed}")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+    def _stop(self, signum, frame):
+        self.running = False
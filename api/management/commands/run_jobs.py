@@ -0,0 +1,41 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.jobs import claim_job, run_job, worker_name
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la cola de jobs: ejecuta las descargas, sincronizaciones e importaciones "
+        "encoladas. Se pueden correr varios, en cualquier nodo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Ejecuta los jobs en cola y termina.')
+        parser.add_argument('--interval', type=float, default=2, help='Segundos de espera cuando la cola está vacía.')
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        worker = worker_name()
+        while self.running:
+            job = claim_job(worker)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+
+            self.stdout.write(f"Ejecutando {job}")
+            job = run_job(job)
+            self.stdout.write(f"{job} en {(job.finished_at - job.started_at).total_seconds():.1f}s")
+
+        self.stdout.write("Worker detenido")
+
+    def _stop(self, signum, frame):
+        # Se termina el job en curso y no se toman más: el resto queda en cola para otro worker
+        self.running = False
@@ -0,0 +1,44 @@
+import uuid
+from pathlib import Path
+
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.webhooks import sign_payload
+
+FIXTURES_DIR = Path(__file__).resolve().parent.parent.parent / 'fixtures' / 'webhooks'
+
+
+class Command(BaseCommand):
+    help = (
+        "Envía un payload de webhook de GitHub grabado, firmado con GITHUB_WEBHOOK_SECRET, "
+        "para probar localmente POST /api/Git/Webhook/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('payload', help=f'Archivo JSON o nombre de un payload de {FIXTURES_DIR} (p. ej. issues_opened).')
+        parser.add_argument('--event', help='Valor de X-GitHub-Event; por defecto el prefijo del nombre del archivo.')
+        parser.add_argument('--url', default='http://localhost:8000/api/Git/Webhook/')
+        parser.add_argument('--secret', default=None, help='Por defecto settings.GITHUB_WEBHOOK_SECRET.')
+
+    def handle(self, *args, **options):
+        path = Path(options['payload'])
+        if not path.exists():
+            path = FIXTURES_DIR / f"{options['payload']}.json"
+        if not path.exists():
+            raise CommandError(f"No existe el payload {options['payload']}")
+
+        secret = options['secret'] if options['secret'] is not None else settings.GITHUB_WEBHOOK_SECRET
+        if not secret:
+            raise CommandError("Falta el secreto: definir GITHUB_WEBHOOK_SECRET o usar --secret")
+
+        body = path.read_bytes()
+        event = options['event'] or path.stem.split('_')[0]
+        response = requests.post(options['url'], data=body, headers={
+            'Content-Type': 'application/json',
+            'X-GitHub-Event': event,
+            'X-GitHub-Delivery': str(uuid.uuid4()),
+            'X-Hub-Signature-256': sign_payload(secret, body),
+        })
+        self.stdout.write(f"{response.status_code} {response.text}")
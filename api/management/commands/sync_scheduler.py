@@ -0,0 +1,53 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.scheduler import SyncScheduler
+from api.services import GitService
+
+
+class Command(BaseCommand):
+    help = (
+        "Sincroniza periódicamente los repositorios y proyectos, priorizando los más "
+        "atrasados y activos, sin exceder el presupuesto de rate limit de cada token."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Hace una sola pasada y termina.')
+        parser.add_argument('--interval', type=float, default=60, help='Segundos entre pasadas.')
+        parser.add_argument('--backend', choices=GitService.BACKENDS, default=GitService.BACKEND_REST)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help=(
+                'Muestra qué targets están vencidos, sin llamar a GitHub ni encolar jobs: '
+                'no aplica el presupuesto de rate limit ni la detección de cambios.'
+            )
+        )
+
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        scheduler = SyncScheduler(
+            pass_interval=options['interval'],
+            backend=options['backend'],
+            dry_run=options['dry_run']
+        )
+        while self.running:
+            started = time.monotonic()
+            result = scheduler.run_pass()
+            if result["dispatched"] or result["deferred"] or result["unchanged"]:
+                self.stdout.write(
+                    f"Encolados: {result['dispatched']}, postergados: {result['deferred']}, "
+                    f"sin cambios: {result['unchanged']}"
+                )
+            if options['once']:
+                break
+            # Se espera en tramos cortos para cortar rápido ante SIGTERM
+            while self.running and time.monotonic() - started < options['interval']:
+                time.sleep(1)
+
+    def _stop(self, signum, frame):
+        self.running = False
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:01
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def _move_rows(model, kept, others, key):
+    # Pasa al issue conservado las filas de los repetidos que no tenga ya (según `key`)
+    seen = set(model.objects.filter(issue=kept).values_list(key, flat=True))
+    for row in model.objects.filter(issue__in=others).order_by('pk'):
+        value = getattr(row, key)
+        if value in seen:
+            continue
+        seen.add(value)
+        row.issue = kept
+        row.save(update_fields=['issue'])
+
+
+def merge_duplicate_issues(apps, schema_editor):
+    """
+    Une los issues repetidos de un repositorio en el más antiguo antes de
+    agregar la restricción. El estado que cargó el usuario en los repetidos
+    no se pierde: las observaciones se concatenan, el issue queda descartado
+    si alguno lo estaba, y los tags, tags predichos y proyectos pasan al que
+    se conserva.
+    """
+    Issue = apps.get_model('api', 'Issue')
+    IssueTag = apps.get_model('api', 'IssueTag')
+    IssueTagPredicted = apps.get_model('api', 'IssueTagPredicted')
+    ProjectIssue = apps.get_model('api', 'ProjectIssue')
+
+    duplicates = (
+        Issue.objects
+        .filter(git_id__isnull=False)
+        .values('repository_id', 'git_id')
+        .annotate(total=Count('issue_id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        issues = list(
+            Issue.objects
+            .filter(repository_id=duplicate['repository_id'], git_id=duplicate['git_id'])
+            .order_by('issue_id')
+        )
+        kept, others = issues[0], issues[1:]
+
+        observations = dict.fromkeys(issue.observation for issue in issues if issue.observation)
+        kept.observation = "\n".join(observations) or None
+        kept.discarded = any(issue.discarded for issue in issues)
+        kept.save(update_fields=['observation', 'discarded'])
+
+        _move_rows(IssueTag, kept, others, 'tag_id')
+        _move_rows(IssueTagPredicted, kept, others, 'tag_id')
+        _move_rows(ProjectIssue, kept, others, 'project_id')
+        Issue.objects.filter(issue_id__in=[issue.issue_id for issue in others]).delete()
+
+
+class Migration(migrations.Migration):
+    # La unión de repetidos va en su propia transacción: Postgres no permite alterar la
+    # tabla con los triggers de las claves foráneas pendientes de esas escrituras
+    atomic = False
+
+    dependencies = [
+        ('api', '0019_project_owner_project_project_number'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_issues, migrations.RunPython.noop, atomic=True),
+        migrations.AddConstraint(
+            model_name='issue',
+            constraint=models.UniqueConstraint(fields=('repository', 'git_id'), name='issue_repository_git_id_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_issue_repository_git_id_uniq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='content_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
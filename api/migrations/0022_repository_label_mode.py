@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_issue_content_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='repository',
+            name='label_mode',
+            field=models.CharField(choices=[('all', 'Issues con todos los labels'), ('any', 'Issues con cualquiera de los labels')], default='all', max_length=10),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_repository_label_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='node_id',
+            field=models.CharField(blank=True, max_length=100, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_issue_node_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='owner_type',
+            field=models.CharField(blank=True, choices=[('organization', 'Organización'), ('user', 'Usuario')], max_length=20, null=True),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_project_owner_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepositoryLabelProvision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=255)),
+                ('name', models.CharField(max_length=255)),
+                ('labels_ensured_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'repository_label_provision',
+                'unique_together': {('owner', 'name')},
+            },
+        ),
+    ]
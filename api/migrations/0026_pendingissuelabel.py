@@ -0,0 +1,36 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('api', '0025_repositorylabelprovision'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingIssueLabel',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('owner', models.CharField(max_length=255)),
+                ('repo', models.CharField(max_length=255)),
+                ('issue_number', models.PositiveIntegerField()),
+                ('label', models.CharField(max_length=100)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('next_attempt_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('last_error', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pending_issue_labels', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'pending_issue_label',
+                'unique_together': {('user', 'owner', 'repo', 'issue_number', 'label')},
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:09
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_predictions(apps, schema_editor):
+    # Los issues ya sincronizados tienen sus predicciones al día
+    Issue = apps.get_model('api', 'Issue')
+    Issue.objects.filter(content_hash__isnull=False).update(predicted_hash=F('content_hash'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_pendingissuelabel'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='issue',
+            name='predicted_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.RunPython(mark_existing_predictions, migrations.RunPython.noop),
+    ]
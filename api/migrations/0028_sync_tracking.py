@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0027_issue_predicted_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='last_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='repository',
+            name='last_activity_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='repository',
+            name='last_synced_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:30
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0031_job_dedupe_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GitHubRepository',
+            fields=[
+                ('git_id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('owner', models.CharField(max_length=255)),
+                ('name', models.CharField(max_length=255)),
+                ('synced_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'github_repository',
+            },
+        ),
+        migrations.CreateModel(
+            name='GitHubIssue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('git_id', models.BigIntegerField()),
+                ('node_id', models.CharField(blank=True, max_length=100, null=True)),
+                ('html_url', models.URLField()),
+                ('title', models.CharField(max_length=255)),
+                ('body', models.TextField(blank=True, null=True)),
+                ('is_open', models.BooleanField(default=True)),
+                ('is_pull_request', models.BooleanField(default=False)),
+                ('labels', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=100), blank=True, default=list, size=None)),
+                ('closed_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(blank=True, null=True)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('prediction', models.JSONField(blank=True, null=True)),
+                ('predicted_hash', models.CharField(blank=True, max_length=64, null=True)),
+                ('repository', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='issues', to='api.githubrepository')),
+            ],
+            options={
+                'db_table': 'github_issue',
+                'indexes': [models.Index(fields=['repository', 'updated_at'], name='github_issu_reposit_14fbb7_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='githubissue',
+            constraint=models.UniqueConstraint(fields=('repository', 'git_id'), name='github_issue_repository_git_id_uniq'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:34
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0032_github_shared_issues'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RawPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('capture', models.UUIDField(db_index=True)),
+                ('sequence', models.IntegerField()),
+                ('kind', models.CharField(max_length=30)),
+                ('owner', models.CharField(max_length=255)),
+                ('name', models.CharField(max_length=255)),
+                ('labels', django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=100), blank=True, default=list, size=None)),
+                ('label_mode', models.CharField(default='all', max_length=10)),
+                ('since', models.DateTimeField(blank=True, null=True)),
+                ('digest', models.CharField(db_index=True, max_length=64)),
+                ('size', models.IntegerField()),
+                ('fetched_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'db_table': 'raw_page',
+                'indexes': [models.Index(fields=['owner', 'name', 'fetched_at'], name='raw_page_owner_599668_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0033_raw_page'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='repository',
+            name='remote_issue_count',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-19 16:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0034_repository_remote_issue_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='items_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-19 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0035_project_items_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rawpage',
+            name='complete',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,8 +1,16 @@
 from django.db import models
 from django.contrib.postgres.fields import ArrayField
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 class Repository(models.Model):
+    LABEL_MODE_ALL = 'all'
+    LABEL_MODE_ANY = 'any'
+    LABEL_MODE_CHOICES = [
+        (LABEL_MODE_ALL, 'Issues con todos los labels'),
+        (LABEL_MODE_ANY, 'Issues con cualquiera de los labels'),
+    ]
+
     repository_id = models.AutoField(primary_key=True)
     owner = models.CharField(max_length=255)
     name = models.CharField(max_length=255)
@@ -14,6 +22,17 @@ class Repository(models.Model):
         blank=True,
         default=list
     )
+    label_mode = models.CharField(
+        max_length=10,
+        choices=LABEL_MODE_CHOICES,
+        default=LABEL_MODE_ALL
+    )
+    # Marca de la última sincronización (se usa como `since` en la siguiente) y
+    # último `updated_at` visto en sus issues, para priorizar los repos activos
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+    # Cantidad de issues en GitHub vista en la última detección de cambios
+    remote_issue_count = models.IntegerField(null=True, blank=True)
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -40,6 +59,7 @@ class Tag(models.Model):
 class Issue(models.Model):
     issue_id = models.AutoField(primary_key=True)
     git_id = models.BigIntegerField(null=True, blank=True)
+    node_id = models.CharField(max_length=100, null=True, blank=True)
     html_url = models.URLField(null=True, blank=True)
     status = models.BooleanField(default=True)
     title = models.CharField(max_length=255)
@@ -49,6 +69,9 @@ class Issue(models.Model):
     closed_at = models.DateTimeField(null=True, blank=True)
     observation = models.TextField(null=True, blank=True)
     body = models.TextField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64, null=True, blank=True)
+    # content_hash con el que se calcularon las predicciones; si difiere, la predicción está pendiente
+    predicted_hash = models.CharField(max_length=64, null=True, blank=True)
 
     repository = models.ForeignKey('Repository', on_delete=models.CASCADE, related_name='issues', null=True, blank=True)
     tags = models.ManyToManyField(Tag, through='IssueTag')
@@ -63,18 +86,30 @@ class Issue(models.Model):
 
     class Meta:
         db_table = 'issue'
+        constraints = [
+            models.UniqueConstraint(fields=['repository', 'git_id'], name='issue_repository_git_id_uniq'),
+        ]
 
     def __str__(self):
         return self.title
 
 class Project(models.Model):
+    OWNER_TYPE_CHOICES = [
+        ('organization', 'Organización'),
+        ('user', 'Usuario'),
+    ]
+
     project_id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=255)
     description = models.TextField(blank=True, null=True)
     owner = models.CharField(max_length=255)
+    owner_type = models.CharField(max_length=20, choices=OWNER_TYPE_CHOICES, null=True, blank=True)
     project_number = models.IntegerField()
     git_id = models.CharField(max_length=255, null=True, blank=True)
     html_url = models.URLField(null=True, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+    # `updatedAt` más reciente de los items en la última actualización completa; los anteriores se saltean
+    items_updated_at = models.DateTimeField(null=True, blank=True)
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='projects')
     created_at = models.DateTimeField(auto_now_add=True)
@@ -139,4 +174,175 @@ class GitHubToken(models.Model):
     description = models.TextField(null=True, blank=True)
     
     class Meta:
-        db_table = 'github_token'
\ No newline at end of file
+        db_table = 'github_token'
+
+
+class RepositoryLabelProvision(models.Model):
+    """Marca de que un repositorio de GitHub ya tiene los labels por defecto."""
+    owner = models.CharField(max_length=255)
+    name = models.CharField(max_length=255)
+    labels_ensured_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'repository_label_provision'
+        unique_together = (('owner', 'name'),)
+
+    def __str__(self):
+        return f"{self.owner}/{self.name}"
+
+
+class PendingIssueLabel(models.Model):
+    """Label a aplicar en un issue de GitHub, pendiente de que lo envíe el worker."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='pending_issue_labels')
+    owner = models.CharField(max_length=255)
+    repo = models.CharField(max_length=255)
+    issue_number = models.PositiveIntegerField()
+    label = models.CharField(max_length=100)
+
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now, db_index=True)
+    last_error = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'pending_issue_label'
+        unique_together = (('user', 'owner', 'repo', 'issue_number', 'label'),)
+
+    def __str__(self):
+        return f"{self.owner}/{self.repo}#{self.issue_number} <- {self.label}"
+
+
+class Job(models.Model):
+    """Operación larga (descarga, sincronización, importación) que ejecuta un worker fuera del request."""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'En cola'),
+        (STATUS_RUNNING, 'En ejecución'),
+        (STATUS_SUCCEEDED, 'Terminado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs')
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    # Contadores que el worker va actualizando: pages, issues, predictions
+    progress = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(null=True, blank=True)
+
+    # Identifica pedidos iguales: mientras un job está en cola o en ejecución, otro con la misma clave se une a él
+    dedupe_key = models.CharField(max_length=255, null=True, blank=True)
+
+    attempts = models.PositiveIntegerField(default=0)
+    worker = models.CharField(max_length=255, null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'job'
+        indexes = [models.Index(fields=['status', 'created_at'])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                condition=models.Q(status__in=['queued', 'running']),
+                name='job_active_dedupe_key_uniq'
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class SyncEvent(models.Model):
+    """Evento de ingesta para el stream SSE del usuario (página traída, issues guardados, job terminado...)."""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='sync_events')
+    job = models.ForeignKey(Job, on_delete=models.CASCADE, null=True, blank=True, related_name='events')
+    kind = models.CharField(max_length=50)
+    data = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        db_table = 'sync_event'
+        indexes = [models.Index(fields=['user', 'id'])]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk}"
+
+
+class GitHubRepository(models.Model):
+    """Repositorio de GitHub compartido entre los usuarios que lo siguen, por su id de GitHub."""
+    git_id = models.BigIntegerField(primary_key=True)
+    owner = models.CharField(max_length=255)
+    name = models.CharField(max_length=255)
+    # Momento hasta el que `issues` tiene todos los issues del repositorio: una descarga
+    # sin filtro de labels, o una incremental sobre una copia que ya estaba completa
+    synced_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'github_repository'
+
+    def __str__(self):
+        return f"{self.owner}/{self.name}"
+
+
+class GitHubIssue(models.Model):
+    """Contenido de un issue tal como se trajo de GitHub y su predicción, una sola vez para todos los usuarios."""
+    repository = models.ForeignKey(GitHubRepository, on_delete=models.CASCADE, related_name='issues')
+    git_id = models.BigIntegerField()
+    node_id = models.CharField(max_length=100, null=True, blank=True)
+    html_url = models.URLField()
+    title = models.CharField(max_length=255)
+    body = models.TextField(null=True, blank=True)
+    is_open = models.BooleanField(default=True)
+    is_pull_request = models.BooleanField(default=False)
+    labels = ArrayField(models.CharField(max_length=100), blank=True, default=list)
+    closed_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(null=True, blank=True)
+    content_hash = models.CharField(max_length=64)
+    # Resultado de `predict_tag` y el content_hash con el que se calculó
+    prediction = models.JSONField(null=True, blank=True)
+    predicted_hash = models.CharField(max_length=64, null=True, blank=True)
+
+    class Meta:
+        db_table = 'github_issue'
+        indexes = [models.Index(fields=['repository', 'updated_at'])]
+        constraints = [
+            models.UniqueConstraint(fields=['repository', 'git_id'], name='github_issue_repository_git_id_uniq'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+
+class RawPage(models.Model):
+    """Página cruda de GitHub guardada en el archivo; el contenido está en disco, comprimido y por hash."""
+    KIND_ISSUES_REST = 'issues_rest'
+    KIND_ISSUES_GRAPHQL = 'issues_graphql'
+
+    # Todas las páginas de una misma corrida de ingesta comparten `capture`
+    capture = models.UUIDField(db_index=True)
+    sequence = models.IntegerField()
+    kind = models.CharField(max_length=30)
+    owner = models.CharField(max_length=255)
+    name = models.CharField(max_length=255)
+    labels = ArrayField(models.CharField(max_length=100), blank=True, default=list)
+    label_mode = models.CharField(max_length=10, default=Repository.LABEL_MODE_ALL)
+    since = models.DateTimeField(null=True, blank=True)
+    digest = models.CharField(max_length=64, db_index=True)
+    size = models.IntegerField()
+    fetched_at = models.DateTimeField(default=timezone.now)
+    # Se marca al terminar la corrida: una que se cortó por un error de GitHub no se re-procesa por defecto
+    complete = models.BooleanField(default=False)
+
+    class Meta:
+        db_table = 'raw_page'
+        indexes = [models.Index(fields=['owner', 'name', 'fetched_at'])]
+
+    def __str__(self):
+        return f"{self.owner}/{self.name} {self.kind} #{self.sequence}"
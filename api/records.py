@@ -0,0 +1,66 @@
+import hashlib
+from dataclasses import dataclass
+
+import orjson
+
+
+@dataclass(slots=True, frozen=True)
+class IssueRecord:
+    """Proyección compacta de un issue de GitHub con solo los campos que persiste `Issue`."""
+    git_id: int
+    node_id: str | None
+    html_url: str
+    title: str
+    body: str | None
+    is_open: bool
+    labels: tuple[str, ...]
+    closed_at: str | None
+    updated_at: str | None
+    is_pull_request: bool = False
+
+    @classmethod
+    def from_rest(cls, data):
+        return cls(
+            git_id=data['id'],
+            node_id=data.get('node_id'),
+            html_url=data['html_url'],
+            title=data['title'],
+            body=data.get('body'),
+            is_open=data['state'] == 'open',
+            labels=tuple(label['name'] for label in data.get('labels') or ()),
+            closed_at=data.get('closed_at'),
+            updated_at=data.get('updated_at'),
+            is_pull_request='pull_request' in data,
+        )
+
+    @classmethod
+    def from_graphql(cls, node):
+        return cls(
+            git_id=node['databaseId'],
+            node_id=node['id'],
+            html_url=node['url'],
+            title=node['title'],
+            body=node.get('body'),
+            is_open=node['state'] == 'OPEN',
+            labels=tuple(label['name'] for label in (node.get('labels') or {}).get('nodes') or ()),
+            closed_at=node.get('closedAt'),
+            updated_at=node.get('updatedAt'),
+        )
+
+    @property
+    def labels_text(self):
+        return ', '.join(self.labels)
+
+    @property
+    def content_hash(self):
+        """Hash de los campos sincronizados; si no cambia, el issue no necesita reescribirse ni re-predecirse."""
+        content = orjson.dumps([
+            self.html_url, self.title, self.body, self.is_open,
+            sorted(self.labels), self.closed_at
+        ])
+        return hashlib.sha256(content).hexdigest()
+
+
+def parse_issue_page(content):
+    """Decodifica una página de `/issues` y la proyecta a `IssueRecord` sin conservar el JSON crudo."""
+    return [IssueRecord.from_rest(item) for item in orjson.loads(content)]
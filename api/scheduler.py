@@ -0,0 +1,283 @@
+import heapq
+import logging
+import math
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .ingestion import PROJECT_REPOSITORY_OWNER
+from .jobs import enqueue_job
+from .models import Repository, Project, ProjectIssue, Job
+from .services import GitService, GitHubError, CHANGES_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Cada cuánto se sincroniza un repositorio según cuándo tuvo actividad por última vez
+ACTIVITY_INTERVALS = [
+    (timedelta(days=1), timedelta(minutes=15)),
+    (timedelta(days=7), timedelta(hours=1)),
+]
+IDLE_INTERVAL = timedelta(hours=6)
+PROJECT_INTERVAL = timedelta(hours=1)
+# Variación aleatoria del intervalo, para que los repos sincronizados juntos se dispersen
+JITTER = 0.2
+
+# Fracción de la cuota horaria de cada token que puede usar el scheduler; el resto queda
+# para las acciones de los usuarios. Además siempre se dejan libres `RATE_RESERVE` requests.
+RATE_BUDGET_SHARE = 0.5
+RATE_RESERVE = 500
+# Tras un error, el target no se reintenta antes de este tiempo
+FAILURE_BACKOFF = timedelta(minutes=30)
+
+# Job que sincroniza cada tipo de target y el parámetro con su id
+JOB_KINDS = {
+    'repository': ('sync_repository', 'repositoryId'),
+    'project': ('refresh_project', 'projectId'),
+}
+
+
+@dataclass(order=True)
+class SyncTarget:
+    # heapq es un min-heap: la prioridad es el atraso negado
+    priority: float
+    kind: str = field(compare=False)
+    obj: object = field(compare=False)
+    resource: str = field(compare=False)
+    cost: int = field(compare=False)
+    # Total de issues visto por la detección de cambios; se guarda recién al sincronizar bien
+    remote_issue_count: int = field(default=None, compare=False)
+
+    @property
+    def key(self):
+        return (self.kind, self.obj.pk)
+
+
+def repository_interval(repo, now):
+    if repo.last_activity_at is None:
+        return IDLE_INTERVAL
+    idle = now - repo.last_activity_at
+    for threshold, interval in ACTIVITY_INTERVALS:
+        if idle <= threshold:
+            return interval
+    return IDLE_INTERVAL
+
+
+def repository_changed(repo, state):
+    """Si el repositorio cambió en GitHub desde su última sincronización, según `get_repository_changes`."""
+    if repo.last_synced_at is None:
+        return True
+    # Un cambio en el total también cuenta como cambio: los borrados y transferencias no
+    # actualizan `updatedAt`. La sincronización con `since` no quita esos issues locales
+    # (eso lo hace el webhook `issues`); solo trae lo modificado y deja el total al día.
+    if repo.remote_issue_count is not None and state["issueCount"] != repo.remote_issue_count:
+        return True
+    if state["updatedAt"] is None:
+        return False
+    # `updatedAt` tiene precisión de segundos: ante la duda se considera cambiado
+    updated_at = datetime.strptime(state["updatedAt"], '%Y-%m-%dT%H:%M:%SZ')
+    return updated_at >= repo.last_synced_at.replace(microsecond=0)
+
+
+def overdue_ratio(last_synced_at, interval, now):
+    """Cuántos intervalos pasaron desde la última sincronización (>= 1 significa que toca)."""
+    if last_synced_at is None:
+        return math.inf
+    interval = interval * random.uniform(1 - JITTER, 1 + JITTER)
+    return (now - last_synced_at) / interval
+
+
+class SyncScheduler:
+    """Mantiene frescos los repositorios y proyectos sin depender de los usuarios.
+
+    En cada pasada arma una cola de prioridad con los targets vencidos,
+    ordenados por atraso relativo a su intervalo (más corto cuanto más
+    activo es el repositorio), y los despacha mientras el presupuesto del
+    token del usuario lo permita. Lo que no entra queda para la pasada
+    siguiente con más atraso, así que sube en la cola.
+
+    Antes de despachar, los repositorios vencidos de cada token se consultan
+    juntos con una consulta GraphQL con alias (`get_repository_changes`): los
+    que no cambiaron desde su última sincronización no se encolan y se dan
+    por sincronizados.
+
+    Despachar un target es encolar su job; lo ejecutan los workers de
+    `run_jobs`. No se encola un target que ya tiene un job pendiente.
+    """
+
+    def __init__(self, pass_interval=60, backend=GitService.BACKEND_REST, dry_run=False):
+        self.pass_interval = pass_interval
+        self.backend = backend
+        self.dry_run = dry_run
+
+    def _targets(self, now):
+        repos = (
+            Repository.objects
+            .select_related('user__github_token')
+            .filter(user__github_token__isnull=False)
+            # Los repos solo registrados (sin issues descargados) no se sincronizan solos
+            .filter(Q(last_synced_at__isnull=False) | Q(issues__isnull=False))
+            .exclude(owner=PROJECT_REPOSITORY_OWNER)
+            .distinct()
+        )
+        for repo in repos:
+            ratio = overdue_ratio(repo.last_synced_at, repository_interval(repo, now), now)
+            if ratio >= 1:
+                # Incremental con `since`: una request por label en modo 'any', una en el resto
+                cost = len(repo.labels) if repo.label_mode == Repository.LABEL_MODE_ANY and len(repo.labels) > 1 else 1
+                yield SyncTarget(-ratio, 'repository', repo, 'core', cost)
+
+        projects = (
+            Project.objects
+            .select_related('user__github_token')
+            .filter(user__github_token__isnull=False)
+        )
+        item_counts = {}
+        for project_id in ProjectIssue.objects.filter(project__in=projects).values_list('project_id', flat=True):
+            item_counts[project_id] = item_counts.get(project_id, 0) + 1
+        for project in projects:
+            ratio = overdue_ratio(project.last_synced_at, PROJECT_INTERVAL, now)
+            if ratio >= 1:
+                cost = max(1, math.ceil(item_counts.get(project.pk, 0) / 100))
+                yield SyncTarget(-ratio, 'project', project, 'graphql', cost)
+
+    def _budgets(self, user):
+        """Requests que el scheduler puede usar en esta pasada, por recurso, para el token del usuario."""
+        limits = GitService(user).get_rate_limits()
+        budgets = {}
+        for resource, limit in limits.items():
+            # Ritmo sostenido: la porción de la cuota horaria que corresponde a una pasada
+            per_pass = limit["limit"] * RATE_BUDGET_SHARE * self.pass_interval / 3600
+            budgets[resource] = max(0, min(per_pass, limit["remaining"] - RATE_RESERVE))
+        return budgets
+
+    def _budget(self, user, budgets):
+        # Presupuesto por token: usuarios con el mismo token lo comparten
+        token = user.github_token.token
+        if self.dry_run:
+            # Sin consultar el rate limit: se muestra todo lo vencido
+            return budgets.setdefault(token, {'core': math.inf, 'graphql': math.inf})
+        if token not in budgets:
+            try:
+                budgets[token] = self._budgets(user)
+            except GitHubError as error:
+                logger.warning("No se pudo obtener el rate limit de %s: %s", user, error.message)
+                budgets[token] = {}
+        return budgets[token]
+
+    def _skip_unchanged(self, targets, budgets):
+        """
+        Consulta en lote el estado de los repositorios vencidos de cada token
+        y devuelve las claves de los que no cambiaron. Si falta presupuesto de
+        GraphQL o la consulta falla, se sincronizan todos como antes. En
+        `dry_run` no se consulta nada.
+        """
+        if self.dry_run:
+            return set()
+
+        by_token = {}
+        for target in targets:
+            if target.kind == 'repository' and target.obj.last_synced_at is not None:
+                by_token.setdefault(target.obj.user.github_token.token, []).append(target)
+
+        unchanged_keys = set()
+        for repo_targets in by_token.values():
+            user = repo_targets[0].obj.user
+            budget = self._budget(user, budgets)
+            batches = math.ceil(len(repo_targets) / CHANGES_BATCH_SIZE)
+            if budget.get('graphql', 0) < batches:
+                continue
+
+            checked_at = timezone.now()
+            try:
+                changes = GitService(user).get_repository_changes([target.obj for target in repo_targets])
+            except GitHubError as error:
+                logger.warning("No se pudieron consultar los cambios de %s: %s", user, error.message)
+                continue
+            budget['graphql'] -= batches
+
+            unchanged = []
+            for target in repo_targets:
+                repo = target.obj
+                state = changes.get(repo.pk)
+                if state is None:
+                    continue
+                if repository_changed(repo, state):
+                    # El total se guarda cuando la sincronización termina bien: si falla o se
+                    # posterga, la próxima pasada lo vuelve a ver como cambiado
+                    target.remote_issue_count = state["issueCount"]
+                else:
+                    # Nada cambió hasta la consulta: equivale a una sincronización sin novedades
+                    repo.last_synced_at = checked_at
+                    repo.remote_issue_count = state["issueCount"]
+                    unchanged.append(repo)
+                    unchanged_keys.add(target.key)
+
+            Repository.objects.bulk_update(unchanged, ['last_synced_at', 'remote_issue_count'])
+        return unchanged_keys
+
+    def run_pass(self):
+        now = timezone.now()
+        skip = self._pending_jobs() | self._failed_recently(now)
+        targets = [target for target in self._targets(now) if target.key not in skip]
+
+        budgets = {}
+        unchanged = self._skip_unchanged(targets, budgets)
+        queue = [target for target in targets if target.key not in unchanged]
+        heapq.heapify(queue)
+
+        dispatched = deferred = 0
+        while queue:
+            target = heapq.heappop(queue)
+            budget = self._budget(target.obj.user, budgets)
+            if budget.get(target.resource, 0) < target.cost:
+                deferred += 1
+                continue
+            budget[target.resource] -= target.cost
+
+            self._dispatch(target)
+            dispatched += 1
+
+        return {"dispatched": dispatched, "deferred": deferred, "unchanged": len(unchanged)}
+
+    def _pending_jobs(self):
+        """Targets que ya tienen un job sin terminar, para no encolarlos dos veces."""
+        pending = set()
+        jobs = Job.objects.filter(
+            kind__in=[kind for kind, _ in JOB_KINDS.values()],
+            status__in=[Job.STATUS_QUEUED, Job.STATUS_RUNNING]
+        )
+        for job in jobs.values('kind', 'params'):
+            for target_kind, (kind, param) in JOB_KINDS.items():
+                if job['kind'] == kind:
+                    pending.add((target_kind, job['params'].get(param)))
+        return pending
+
+    def _failed_recently(self, now):
+        """Targets cuyo último job falló hace menos de `FAILURE_BACKOFF`."""
+        failed = set()
+        jobs = Job.objects.filter(
+            kind__in=[kind for kind, _ in JOB_KINDS.values()],
+            status=Job.STATUS_FAILED,
+            finished_at__gte=now - FAILURE_BACKOFF
+        )
+        for job in jobs.values('kind', 'params'):
+            for target_kind, (kind, param) in JOB_KINDS.items():
+                if job['kind'] == kind:
+                    failed.add((target_kind, job['params'].get(param)))
+        return failed
+
+    def _dispatch(self, target):
+        logger.info("Encolando sincronización de %s %s", target.kind, target.obj)
+        if self.dry_run:
+            return
+
+        kind, param = JOB_KINDS[target.kind]
+        params = {param: target.obj.pk}
+        if target.kind == 'repository':
+            params["backend"] = self.backend
+            if target.remote_issue_count is not None:
+                params["remoteIssueCount"] = target.remote_issue_count
+        enqueue_job(target.obj.user, kind, params)
@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import IssueTagPredicted, Repository, Issue, Tag, IssueTag, GitHubToken, Project, ProjectIssue
+from .models import IssueTagPredicted, Repository, Issue, Tag, IssueTag, GitHubToken, Project, ProjectIssue, Job
 from django.contrib.auth.models import User
 
 class RepositoryCreateSerializer(serializers.ModelSerializer):
@@ -26,10 +26,11 @@ class RepositoryGetAllSerializer(serializers.ModelSerializer):
     labels = serializers.ListField(
         child=serializers.CharField(), required=False
     )
+    labelMode = serializers.CharField(source='label_mode')
 
     class Meta:
         model = Repository
-        fields = ['owner', 'name', 'gitId', 'htmlUrl', 'description', 'repositoryId', 'labels']
+        fields = ['owner', 'name', 'gitId', 'htmlUrl', 'description', 'repositoryId', 'labels', 'labelMode']
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -170,4 +171,30 @@ class IssueWithProjectsViewSerializer(GetIssueViewModelSerializer):
     )
 
     class Meta(GetIssueViewModelSerializer.Meta):
-        fields = GetIssueViewModelSerializer.Meta.fields + ['projects']
\ No newline at end of file
+        fields = GetIssueViewModelSerializer.Meta.fields + ['projects']
+
+
+class JobSerializer(serializers.ModelSerializer):
+    jobId = serializers.IntegerField(source='id')
+    createdAt = serializers.DateTimeField(source='created_at')
+    startedAt = serializers.DateTimeField(source='started_at')
+    finishedAt = serializers.DateTimeField(source='finished_at')
+    queuedSeconds = serializers.SerializerMethodField()
+    runSeconds = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = [
+            'jobId', 'kind', 'status', 'progress', 'result', 'error',
+            'createdAt', 'startedAt', 'finishedAt', 'queuedSeconds', 'runSeconds'
+        ]
+
+    def get_queuedSeconds(self, obj):
+        if obj.started_at is None:
+            return None
+        return (obj.started_at - obj.created_at).total_seconds()
+
+    def get_runSeconds(self, obj):
+        if obj.started_at is None or obj.finished_at is None:
+            return None
+        return (obj.finished_at - obj.started_at).total_seconds()
@@ -1,13 +1,263 @@
+import hashlib
+import logging
+from itertools import islice
+
+import orjson
 import requests
-from .models import Repository, Issue, GitHubToken, Tag, IssueTag, IssueTagPredicted
-from .predictor import predict_tag
-from urllib.parse import urlparse
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from .models import Repository, Project, GitHubToken, RepositoryLabelProvision, PendingIssueLabel, RawPage
+from .ingestion import IssueIngestor, ProjectItemIngestor, get_project_repository
+from .shared_issues import SharedIssueStore
+from .archive import RawPageArchive
+from .github_client import GitHubClientSession, run_with_client
+from .records import IssueRecord, parse_issue_page
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Labels que se crean en los repositorios de GitHub para las predicciones
+DEFAULT_LABELS = [
+    {
+        "name": "NEW/UPDATE FUNCTIONALITY",
+        "color": "1f6feb",
+        "description": "Fixes, updates or new functionality"
+    },
+    {
+        "name": "UX BUG",
+        "color": "d73a4a",
+        "description": "User experience bug"
+    },
+    {
+        "name": "UX ISSUE",
+        "color": "fbca04",
+        "description": "User experience smell or UX inconsistency"
+    },
+    {
+        "name": "UX FEATURE REQUEST",
+        "color": "0e8a16",
+        "description": "New UX feature request"
+    },
+    {
+        "name": "FEATURE REQUEST",
+        "color": "5319e7",
+        "description": "New feature request"
+    }
+]
+
+# Cada cuánto se vuelve a verificar que un repositorio tenga los labels por defecto
+LABELS_ENSURED_TTL = timedelta(days=7)
+
+# Tiempo que se recuerda si un login de GitHub es usuario u organización
+OWNER_TYPE_CACHE_TTL = 60 * 60 * 24
+
+# Listado de repositorios de un owner: se reutiliza mientras el usuario tipea en el buscador
+OWNER_REPOS_CACHE_TTL = 60 * 5
+OWNER_REPOS_PER_PAGE = 100
+# Campos de cada repositorio que se devuelven al front
+OWNER_REPO_FIELDS = ('id', 'name', 'html_url', 'description', 'open_issues_count')
+
+PROJECT_FIELDS_FRAGMENT = """
+fragment ProjectFields on ProjectV2 {
+  id
+  title
+  url
+  items(first: 100, after: $cursor) {
+    pageInfo {
+      hasNextPage
+      endCursor
+    }
+    nodes {
+      updatedAt
+      content {
+        ... on Issue {
+          id
+          title
+          url
+          body
+          state
+          updatedAt
+          labels(first: 20) {
+            nodes {
+              name
+            }
+          }
+        }
+      }
+      fieldValues(first: 20) {
+        nodes {
+          ... on ProjectV2ItemFieldSingleSelectValue {
+            name
+            field {
+              ... on ProjectV2SingleSelectField {
+                name
+              }
+            }
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+PROJECT_QUERY = """
+query ProjectItems($login: String!, $projectNumber: Int!, $cursor: String) {
+  %s
+}
+""" + PROJECT_FIELDS_FRAGMENT
+
+# Selección del dueño del proyecto según su tipo. Si el tipo no se conoce,
+# `repositoryOwner` resuelve usuario u organización en la misma consulta.
+PROJECT_OWNER_SELECTIONS = {
+    "organization": "organization(login: $login) { projectV2(number: $projectNumber) { ...ProjectFields } }",
+    "user": "user(login: $login) { projectV2(number: $projectNumber) { ...ProjectFields } }",
+    None: (
+        "repositoryOwner(login: $login) { __typename "
+        "... on ProjectV2Owner { projectV2(number: $projectNumber) { ...ProjectFields } } }"
+    ),
+}
+
+# Actualización de varios proyectos: la primera página de cada uno con un alias `pN`
+# por proyecto en la misma consulta. Cada proyecto trae hasta 100 items con sus
+# labels y campos, así que el lote es más chico que el de repositorios.
+PROJECTS_BATCH_SIZE = 10
+
+
+def projects_items_query(owner_types):
+    variables = ", ".join(f"$login{index}: String!, $projectNumber{index}: Int!" for index in range(len(owner_types)))
+    blocks = "".join(
+        f"\n  p{index}: "
+        + PROJECT_OWNER_SELECTIONS[owner_type]
+        .replace("$login", f"$login{index}")
+        .replace("$projectNumber", f"$projectNumber{index}")
+        for index, owner_type in enumerate(owner_types)
+    )
+    # `$cursor` queda nulo: el fragmento lo usa, pero en este lote siempre es la primera página
+    return f"query ProjectsItems({variables}, $cursor: String) {{{blocks}\n}}\n" + PROJECT_FIELDS_FRAGMENT
+
+
+ISSUES_QUERY = """
+query RepositoryIssues($owner: String!, $name: String!, $cursor: String, $labels: [String!], $since: DateTime) {
+  rateLimit {
+    cost
+    remaining
+  }
+  repository(owner: $owner, name: $name) {
+    issues(first: 100, after: $cursor, labels: $labels, filterBy: {since: $since}, orderBy: {field: CREATED_AT, direction: ASC}) {
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+      nodes {
+        id
+        databaseId
+        url
+        title
+        body
+        state
+        closedAt
+        updatedAt
+        labels(first: 20) {
+          nodes {
+            name
+          }
+        }
+      }
+    }
+  }
+}
+"""
+
+# Actualización puntual de issues por su `node_id`: un `nodes(ids:)` acepta hasta 100 ids
+ISSUE_NODES_QUERY = """
+query IssueNodes($ids: [ID!]!) {
+  rateLimit {
+    cost
+    remaining
+  }
+  nodes(ids: $ids) {
+    ... on Issue {
+      id
+      databaseId
+      url
+      title
+      body
+      state
+      closedAt
+      updatedAt
+      labels(first: 20) {
+        nodes {
+          name
+        }
+      }
+    }
+  }
+}
+"""
+NODES_BATCH_SIZE = 100
+
+# Detección de cambios: un bloque `repository` con alias por repositorio, que pide solo el
+# issue actualizado más recientemente y el total. Cada bloque trae un nodo, así que el costo
+# de la consulta es mínimo; lo que limita el lote es el tamaño de la consulta.
+REPOSITORY_CHANGES_BLOCK = """
+  r%(index)s: repository(owner: $owner%(index)s, name: $name%(index)s) {
+    issues(first: 1, orderBy: {field: UPDATED_AT, direction: DESC}) {
+      totalCount
+      nodes {
+        updatedAt
+      }
+    }
+  }"""
+CHANGES_BATCH_SIZE = 100
+
+
+def repository_changes_query(count):
+    variables = ", ".join(f"$owner{index}: String!, $name{index}: String!" for index in range(count))
+    blocks = "".join(REPOSITORY_CHANGES_BLOCK % {"index": index} for index in range(count))
+    return f"query RepositoryChanges({variables}) {{{blocks}\n  rateLimit {{\n    cost\n    remaining\n  }}\n}}\n"
+
+
+class GitHubError(Exception):
+    def __init__(self, response_code, message):
+        super().__init__(message)
+        self.response_code = response_code
+        self.message = message
+
+    def as_result(self):
+        return {
+            "is_success": False,
+            "response_code": self.response_code,
+            "message": self.message,
+            "data": None
+        }
+
 
 class GitService:
-    BASE_URL = 'https://api.github.com'
+    BASE_URL = settings.GITHUB_API_URL
+    GRAPHQL_URL = settings.GITHUB_GRAPHQL_URL
+    ISSUES_PER_PAGE = 100
+    # Requests simultáneas a GitHub en las operaciones en paralelo
+    MAX_CONCURRENCY = 8
+
+    # Backends de ingesta de issues, seleccionables por sincronización
+    BACKEND_REST = 'rest'
+    BACKEND_GRAPHQL = 'graphql'
+    BACKENDS = (BACKEND_REST, BACKEND_GRAPHQL)
 
-    def __init__(self, user):
+    def __init__(self, user, progress=None):
         self.user = user
+        # Reporte de avance opcional (un `JobProgress` cuando corre en un worker)
+        self.progress = progress
+        self._ensured_repos = set()
+        # Archivo de páginas crudas, si está habilitado (`GITHUB_ARCHIVE_DIR`)
+        self.archive = RawPageArchive.from_settings()
+
+    def _report(self, detail=None, **counts):
+        if self.progress is not None:
+            self.progress.add(detail, **counts)
 
     def _get_github_token(self):
         try:
@@ -15,115 +265,467 @@ class GitService:
         except GitHubToken.DoesNotExist:
             raise ValueError("El usuario no tiene token de GitHub configurado.")
 
-    def _create_github_label(self, owner, repo, name, color, description=""):
-        token = self._get_github_token()
-
-        url = f"{self.BASE_URL}/repos/{owner}/{repo}/labels"
-        headers = {
-            "Accept": "application/vnd.github+json",
-            "Authorization": f"Bearer {token}",
-            "X-GitHub-Api-Version": "2022-11-28"
-        }
+    def _run_fanout(self, fn):
+        """Ejecuta `await fn(client)` con un `AsyncGitHubClient` del token del usuario."""
+        return run_with_client(
+            self._get_github_token(),
+            fn,
+            base_url=self.BASE_URL,
+            max_concurrency=self.MAX_CONCURRENCY
+        )
 
-        payload = {
-            "name": name,
-            "color": color,
-            "description": description
-        }
+    def _client_session(self):
+        """Un cliente asíncrono reutilizable en varias tandas de requests (ver `GitHubClientSession`)."""
+        return GitHubClientSession(
+            self._get_github_token(),
+            base_url=self.BASE_URL,
+            max_concurrency=self.MAX_CONCURRENCY
+        )
 
-        response = requests.post(url, headers=headers, json=payload)
+    def _format_since(self, since):
+        # Las fechas se guardan naive en UTC (USE_TZ = False)
+        return since.strftime('%Y-%m-%dT%H:%M:%SZ') if since else None
 
-        return {
-            "status_code": response.status_code,
-            "response": response.json() if response.content else None
+    def _issue_page_params(self, page, labels=None, since=None):
+        params = {
+            "state": "all",
+            'page': page,
+            'per_page': self.ISSUES_PER_PAGE
         }
+        if labels:
+            params['labels'] = ",".join(labels)
+        if since:
+            params['since'] = self._format_since(since)
+        return params
 
-    def _fetch_all_issues(self, owner, repository, labels=None):
-        issues_data = []
-        page = 1
-        per_page = 30
-
+    def _iter_issue_pages(self, owner, repository, labels=None, since=None, capture=None):
+        """
+        Pide la primera página y, si GitHub informa la última en el header
+        `Link`, trae el resto en ventanas de `MAX_CONCURRENCY` páginas en
+        paralelo, entregándolas en orden. Con `capture` cada respuesta cruda
+        se guarda en el archivo.
+        """
         token = self._get_github_token()
         headers = {'Authorization': f'token {token}'}
+        issues_url = f'{self.BASE_URL}/repos/{owner}/{repository}/issues'
+
+        issues_response = requests.get(issues_url, headers=headers, params=self._issue_page_params(1, labels, since))
+        if issues_response.status_code != 200:
+            raise GitHubError(issues_response.status_code, "Error al obtener los issues")
+
+        if capture:
+            capture.add(issues_response.content)
+        page_issues = parse_issue_page(issues_response.content)
+        if not page_issues:
+            return
+        yield page_issues
+
+        last_url = issues_response.links.get('last', {}).get('url')
+        if not last_url:
+            return
+        last_page = int(parse_qs(urlparse(last_url).query)['page'][0])
+
+        # Un solo cliente para todas las ventanas: las conexiones se reutilizan
+        with self._client_session() as session:
+            for start in range(2, last_page + 1, self.MAX_CONCURRENCY):
+                pages = range(start, min(start + self.MAX_CONCURRENCY, last_page + 1))
+
+                async def fetch_window(client):
+                    return await client.gather(
+                        client.get(issues_url, params=self._issue_page_params(page, labels, since))
+                        for page in pages
+                    )
 
-        if not isinstance(labels, list):
-            labels = []
+                for response in session.run(fetch_window):
+                    if response.status_code != 200:
+                        raise GitHubError(response.status_code, "Error al obtener los issues")
+                    if capture:
+                        capture.add(response.content)
+                    page_issues = parse_issue_page(response.content)
+                    if page_issues:
+                        yield page_issues
+
+    def _iter_any_label_pages(self, owner, repository, labels, since=None, capture=None):
+        """
+        GitHub interpreta `labels=a,b` como AND. Para traer los issues con
+        cualquiera de los labels se pagina cada label en paralelo y se unen los
+        resultados por id, de modo que cada issue se procesa una sola vez.
+        """
+        issues_url = f'{self.BASE_URL}/repos/{owner}/{repository}/issues'
+
+        async def fetch_label(client, label):
+            records = []
+            contents = []
+            page = 1
+            while True:
+                response = await client.get(issues_url, params=self._issue_page_params(page, [label], since))
+                if response.status_code != 200:
+                    raise GitHubError(response.status_code, "Error al obtener los issues")
+                page_issues = parse_issue_page(response.content)
+                records.extend(page_issues)
+                if capture:
+                    # Sin archivo el JSON crudo no se guarda: solo los `IssueRecord`
+                    contents.append(response.content)
+                if len(page_issues) < self.ISSUES_PER_PAGE:
+                    return records, contents
+                page += 1
+
+        async def fetch_all(client):
+            return await client.gather(fetch_label(client, label) for label in labels)
+
+        seen = set()
+        pending = []
+        for label_records, contents in self._run_fanout(fetch_all):
+            if capture:
+                # Se archiva fuera del event loop: `add` escribe en la base
+                for content in contents:
+                    capture.add(content)
+            for record in label_records:
+                if record.git_id in seen:
+                    continue
+                seen.add(record.git_id)
+                pending.append(record)
+                if len(pending) == self.ISSUES_PER_PAGE:
+                    yield pending
+                    pending = []
+
+        if pending:
+            yield pending
+
+    def _iter_issue_pages_graphql(self, owner, repository, labels=None, label_mode=Repository.LABEL_MODE_ALL, since=None, capture=None):
+        """
+        Pagina `repository.issues` por cursor pidiendo solo los campos que se
+        persisten. A diferencia de REST no incluye pull requests. El filtro
+        `labels` de GraphQL es OR, así que en modo 'all' se filtra localmente.
+        """
+        cursor = None
+        required = set(labels or ())
 
         while True:
-            issues_url = f'{self.BASE_URL}/repos/{owner}/{repository}/issues'
-            params = {
-                "state": "all",
-                'page': page,
-                'per_page': per_page
-            }
-            
-            if labels:
-                params['labels'] = ",".join(labels)
-                print("Labels enviados a GitHub:", params['labels'])
-            else:
-                print("Labels enviados a GitHub: ninguno")
+            content = self._post_graphql(ISSUES_QUERY, {
+                "owner": owner,
+                "name": repository,
+                "cursor": cursor,
+                "labels": labels or None,
+                "since": self._format_since(since)
+            })
+            if capture:
+                capture.add(content)
+            try:
+                payload = orjson.loads(content)
+            except orjson.JSONDecodeError:
+                payload = {}
 
-            issues_response = requests.get(issues_url, headers=headers, params=params)
+            repository_data = (payload.get("data") or {}).get("repository")
+            if payload.get("errors") or not repository_data:
+                raise GitHubError(502, "Error al obtener los issues")
 
-            if issues_response.status_code != 200:
-                return {
-                    "is_success": False,
-                    "response_code": issues_response.status_code,
-                    "message": "Error al obtener los issues",
-                    "data": None
-                }
+            issues = repository_data["issues"]
+            page_issues = [IssueRecord.from_graphql(node) for node in issues["nodes"]]
+            if label_mode == Repository.LABEL_MODE_ALL and len(required) > 1:
+                page_issues = [record for record in page_issues if required.issubset(record.labels)]
+
+            if page_issues:
+                yield page_issues
 
-            page_issues_data = issues_response.json()
-            if not page_issues_data:
+            if not issues["pageInfo"]["hasNextPage"]:
                 break
+            cursor = issues["pageInfo"]["endCursor"]
 
-            issues_data.extend(page_issues_data)
-            page += 1
+    def _ingest_issues(self, repo, labels=None, backend=BACKEND_REST, since=None, use_shared=False):
+        """
+        Trae e ingiere los issues del repositorio. Con `since` solo se piden los
+        issues actualizados desde esa fecha (sincronización incremental).
 
+        Con `use_shared`, si otro usuario sincronizó hace poco el mismo
+        repositorio de GitHub, los issues se leen de la copia compartida
+        (`SharedIssueStore`) sin pedir nada a GitHub ni correr el modelo. Lo
+        usan la primera descarga y el scheduler; las actualizaciones que pide
+        el usuario siempre van a GitHub, porque puede haber editado un issue
+        recién.
+        """
+        shared = SharedIssueStore.for_repository(repo)
+        from_shared = use_shared and shared is not None and shared.is_fresh(since)
+        capture = None
+        if self.archive and not from_shared:
+            kind = RawPage.KIND_ISSUES_GRAPHQL if backend == self.BACKEND_GRAPHQL else RawPage.KIND_ISSUES_REST
+            capture = self.archive.capture(kind, repo.owner, repo.name, labels, repo.label_mode, since)
+
+        if from_shared:
+            pages = shared.iter_pages(labels, repo.label_mode, since)
+        elif backend == self.BACKEND_GRAPHQL:
+            pages = self._iter_issue_pages_graphql(repo.owner, repo.name, labels, repo.label_mode, since, capture)
+        elif repo.label_mode == Repository.LABEL_MODE_ANY and labels and len(labels) > 1:
+            pages = self._iter_any_label_pages(repo.owner, repo.name, labels, since, capture)
+        else:
+            pages = self._iter_issue_pages(repo.owner, repo.name, labels, since, capture)
+
+        # Leyendo la copia compartida, la marca es hasta donde ella está al día
+        started_at = shared.synced_at if from_shared else timezone.now()
+        ingestor = IssueIngestor(repo, shared=shared, store_shared=not from_shared)
+        latest_update = self._ingest_pages(repo, ingestor, pages)
+        if capture:
+            # Se llegó al final sin errores de GitHub: la corrida tiene todas las páginas
+            capture.finish()
+
+        # La marca vale para todo el filtro del repositorio: una sincronización de un solo
+        # label (AddLabel) no trajo los cambios de los demás y no puede avanzarla
+        covers_filter = not labels or sorted(labels) == sorted(repo.labels or [])
+        if ingestor.stats["failed_pages"]:
+            # Sin avanzar la marca, la próxima sincronización incremental vuelve a pedir esas páginas
+            logger.warning("%s páginas de %s no se guardaron", ingestor.stats["failed_pages"], repo)
+        elif covers_filter:
+            self._mark_synced(repo, started_at, latest_update)
+            if shared is not None and not from_shared and not labels:
+                shared.mark_synced(started_at, since)
+        if capture:
+            self.archive.prune()
+        ingestor.stats["shared"] = from_shared
+        return ingestor.stats
+
+    def _ingest_pages(self, repo, ingestor, pages):
+        """Ingiere las páginas de `IssueRecord` reportando el avance; devuelve el último `updated_at`."""
+        latest_update = None
+        for page_issues in pages:
+            failed_pages = ingestor.stats["failed_pages"]
+            written = ingestor.ingest_page(page_issues)
+            self._report(
+                {"repositoryId": repo.pk, "issueIds": [issue.issue_id for issue, _ in written]},
+                pages=1,
+                issues=len(page_issues),
+                predictions=len(written) if ingestor.predict else 0,
+                failed_pages=ingestor.stats["failed_pages"] - failed_pages
+            )
+            for record in page_issues:
+                if record.updated_at and (latest_update is None or record.updated_at > latest_update):
+                    latest_update = record.updated_at
+        return latest_update
+
+    def refresh_issues(self, issues):
+        """
+        Actualiza solo los issues indicados (p. ej. los visibles en un filtro),
+        con una consulta GraphQL `nodes(ids:)` por cada `NODES_BATCH_SIZE`, sin
+        re-sincronizar sus repositorios. Pasan por el `IssueIngestor` de su
+        repositorio: los que no cambiaron no se escriben y los que cambiaron se
+        vuelven a predecir. Los issues sin `node_id` (cargados a mano o desde
+        un proyecto) se saltean; los que GitHub ya no devuelve (borrados o sin
+        acceso) se cuentan en `missing`.
+
+        Si falla una consulta se corta ahí y se devuelve el error con lo que
+        se llegó a guardar; los issues que quedaron sin actualizar se cuentan
+        en `failed`.
+        """
+        by_node = {issue.node_id: issue for issue in issues if issue.node_id and issue.repository_id}
+        stats = {"new": 0, "changed": 0, "unchanged": 0, "failed_pages": 0, "missing": 0, "failed": 0}
+        stats["skipped"] = len({issue.pk for issue in issues}) - len(by_node)
+
+        node_ids = list(by_node)
+        ingestors = {}
+        error = None
+        for start in range(0, len(node_ids), NODES_BATCH_SIZE):
+            batch = node_ids[start:start + NODES_BATCH_SIZE]
+            payload = self._run_graphql(ISSUE_NODES_QUERY, {"ids": batch})
+            data = payload.get("data")
+            if not data:
+                error = GitHubError(502, "Error al obtener los issues")
+                stats["failed"] = len(node_ids) - start
+                break
+
+            pages = {}
+            for node_id, node in zip(batch, data["nodes"]):
+                if not node:
+                    stats["missing"] += 1
+                    continue
+                repo = by_node[node_id].repository
+                pages.setdefault(repo.pk, (repo, []))[1].append(IssueRecord.from_graphql(node))
+
+            for repo, records in pages.values():
+                if repo.pk not in ingestors:
+                    ingestors[repo.pk] = IssueIngestor(repo, shared=SharedIssueStore.for_repository(repo))
+                self._ingest_pages(repo, ingestors[repo.pk], [records])
+
+        for ingestor in ingestors.values():
+            for key in ("new", "changed", "unchanged", "failed_pages"):
+                stats[key] += ingestor.stats[key]
+        if error:
+            return {**error.as_result(), "stats": stats}
         return {
             "is_success": True,
-            "data": issues_data
+            "response_code": 200,
+            "message": "Issues refreshed successfully",
+            "data": None,
+            "stats": stats
         }
-    
-    def _fetch_issues_for_label(self, owner, repository, label):
-        issues_data = []
-        page = 1
-        per_page = 30
 
-        token = self._get_github_token()
-        headers = {'Authorization': f'token {token}'}
+    def replay_repository(self, repo, capture=None):
+        """
+        Re-ingiere el repositorio desde una corrida del archivo crudo (por
+        defecto la última completa), con el parser y el clasificador actuales
+        y sin pedir nada a GitHub.
 
-        while True:
-            issues_url = f'{self.BASE_URL}/repos/{owner}/{repository}/issues'
-            params = {
-                'page': page,
-                'per_page': per_page,
-                'labels': label,
-                "state": "all"
-            }
-            
-            issues_response = requests.get(issues_url, headers=headers, params=params)
-
-            if issues_response.status_code != 200:
-                return {
-                    "is_success": False,
-                    "response_code": issues_response.status_code,
-                    "message": "Error al obtener los issues",
-                    "data": None
-                }
+        Los datos de la corrida pueden ser más viejos que los guardados, así
+        que la marca de sincronización vuelve a cuando se trajo la corrida: la
+        próxima sincronización incremental pide de nuevo lo que cambió después.
+        """
+        if self.archive is None:
+            return {"is_success": False, "response_code": 400, "message": "El archivo de GitHub no está habilitado (GITHUB_ARCHIVE_DIR)", "data": None}
 
-            page_issues_data = issues_response.json()
-            if not page_issues_data:
-                break
+        capture = capture or self.archive.latest_capture(repo.owner, repo.name)
+        fetched_at = self.archive.capture_fetched_at(capture) if capture else None
+        if fetched_at is None:
+            return {"is_success": False, "response_code": 404, "message": "No hay páginas archivadas del repositorio", "data": None}
 
-            issues_data.extend(page_issues_data)
-            page += 1
+        ingestor = IssueIngestor(repo)
+        self._ingest_pages(repo, ingestor, self.archive.iter_records(capture))
+        if repo.last_synced_at is None or fetched_at < repo.last_synced_at:
+            repo.last_synced_at = fetched_at
+            repo.save(update_fields=['last_synced_at'])
+        return {
+            "is_success": True,
+            "response_code": 200,
+            "message": "Repository replayed from archive",
+            "data": None,
+            "capture": str(capture),
+            "stats": ingestor.stats
+        }
+
+    def _mark_synced(self, repo, started_at, latest_update=None):
+        # `started_at` es la marca para el próximo `since`: lo que cambie durante la sincronización se vuelve a pedir
+        repo.last_synced_at = started_at
+        update_fields = ['last_synced_at']
+        if latest_update:
+            activity = datetime.strptime(latest_update, '%Y-%m-%dT%H:%M:%SZ')
+            if repo.last_activity_at is None or activity > repo.last_activity_at:
+                repo.last_activity_at = activity
+                update_fields.append('last_activity_at')
+        repo.save(update_fields=update_fields)
+
+    def sync_repository(self, repo, backend=BACKEND_REST, remote_issue_count=None):
+        """
+        Sincronización incremental de un repositorio ya descargado, con su
+        filtro de labels actual: solo pide los issues modificados desde
+        `last_synced_at`. La usa el scheduler de sincronización, que pasa el
+        total de issues que vio en GitHub (`remote_issue_count`) para guardarlo
+        si la sincronización termina sin páginas fallidas.
+        """
+        try:
+            stats = self._ingest_issues(repo, repo.labels or None, backend, since=repo.last_synced_at, use_shared=True)
+        except GitHubError as error:
+            return error.as_result()
+
+        if remote_issue_count is not None and not stats["failed_pages"]:
+            repo.remote_issue_count = remote_issue_count
+            repo.save(update_fields=['remote_issue_count'])
 
         return {
             "is_success": True,
-            "data": issues_data
+            "response_code": 200,
+            "message": "Repository synced successfully",
+            "data": None,
+            "stats": stats
         }
-    
+
+    def get_rate_limits(self):
+        """
+        Cuota restante del token por recurso ('core', 'graphql'), como
+        `{recurso: {"limit", "remaining", "reset"}}`. Consultar
+        `/rate_limit` no consume cuota.
+        """
+        token = self._get_github_token()
+        response = requests.get(f'{self.BASE_URL}/rate_limit', headers={'Authorization': f'token {token}'})
+        if response.status_code != 200:
+            raise GitHubError(response.status_code, "Error al obtener el rate limit")
+
+        resources = orjson.loads(response.content)["resources"]
+        return {
+            name: {
+                "limit": resources[name]["limit"],
+                "remaining": resources[name]["remaining"],
+                "reset": datetime.utcfromtimestamp(resources[name]["reset"])
+            }
+            for name in ('core', 'graphql') if name in resources
+        }
+
+    def get_repository_changes(self, repos):
+        """
+        Estado actual en GitHub de varios repositorios con una consulta GraphQL
+        por cada `CHANGES_BATCH_SIZE`: `{repository_id: {"updatedAt", "issueCount"}}`,
+        donde `updatedAt` es el del issue modificado más recientemente. Los
+        repositorios que GitHub no resuelve quedan en None.
+        """
+        changes = {}
+        for start in range(0, len(repos), CHANGES_BATCH_SIZE):
+            batch = repos[start:start + CHANGES_BATCH_SIZE]
+            variables = {}
+            for index, repo in enumerate(batch):
+                variables[f"owner{index}"] = repo.owner
+                variables[f"name{index}"] = repo.name
+
+            payload = self._run_graphql(repository_changes_query(len(batch)), variables)
+            data = payload.get("data")
+            if not data:
+                raise GitHubError(502, "Error al consultar los cambios de los repositorios")
+
+            for index, repo in enumerate(batch):
+                repository_data = data.get(f"r{index}")
+                if not repository_data:
+                    changes[repo.pk] = None
+                    continue
+                issues = repository_data["issues"]
+                changes[repo.pk] = {
+                    "updatedAt": issues["nodes"][0]["updatedAt"] if issues["nodes"] else None,
+                    "issueCount": issues["totalCount"],
+                }
+        return changes
+
+    def _owner_repos_cache_key(self, owner, token):
+        # El listado depende del token (repos privados visibles); la clave no guarda el token en claro
+        token_digest = hashlib.sha256(token.encode()).hexdigest()[:16]
+        return f"github_owner_repos:{owner.lower()}:{token_digest}"
+
+    def list_owner_repositories(self, owner):
+        """
+        Todos los repositorios de un usuario u organización de GitHub, vistos
+        con el token del usuario y reducidos a `OWNER_REPO_FIELDS`. Pide la
+        primera página y el resto en paralelo según el header `Link`; el
+        resultado se cachea `OWNER_REPOS_CACHE_TTL` segundos por owner y token.
+        """
+        token = self._get_github_token()
+        cache_key = self._owner_repos_cache_key(owner, token)
+        repos = cache.get(cache_key)
+        if repos is not None:
+            return repos
+
+        repos_url = f'{self.BASE_URL}/users/{owner}/repos'
+        params = {'type': 'all', 'per_page': OWNER_REPOS_PER_PAGE}
+        response = requests.get(repos_url, headers={'Authorization': f'token {token}'}, params={**params, 'page': 1})
+        if response.status_code != 200:
+            raise GitHubError(response.status_code, "Error al obtener los repositorios desde GitHub")
+
+        pages = [response.content]
+        last_url = response.links.get('last', {}).get('url')
+        if last_url:
+            last_page = int(parse_qs(urlparse(last_url).query)['page'][0])
+
+            async def fetch_rest(client):
+                return await client.gather(
+                    client.get(repos_url, params={**params, 'page': page})
+                    for page in range(2, last_page + 1)
+                )
+
+            for page_response in self._run_fanout(fetch_rest):
+                if page_response.status_code != 200:
+                    raise GitHubError(page_response.status_code, "Error al obtener los repositorios desde GitHub")
+                pages.append(page_response.content)
+
+        repos = [
+            {field: repo.get(field) for field in OWNER_REPO_FIELDS}
+            for content in pages
+            for repo in orjson.loads(content)
+        ]
+        cache.set(cache_key, repos, OWNER_REPOS_CACHE_TTL)
+        return repos
+
     def extract_repo_from_issue_url(self, issue_url):
         try:
             path = urlparse(issue_url).path.strip("/").split("/")
@@ -135,86 +737,109 @@ class GitService:
 
         return None, None
 
-    def create_default_labels(self, owner, repo):
-        labels = [
-            {
-                "name": "NEW/UPDATE FUNCTIONALITY",
-                "color": "1f6feb",
-                "description": "Fixes, updates or new functionality"
-            },
-            {
-                "name": "UX BUG",
-                "color": "d73a4a",
-                "description": "User experience bug"
-            },
-            {
-                "name": "UX ISSUE",
-                "color": "fbca04",
-                "description": "User experience smell or UX inconsistency"
-            },
-            {
-                "name": "UX FEATURE REQUEST",
-                "color": "0e8a16",
-                "description": "New UX feature request"
-            },
-            {
-                "name": "FEATURE REQUEST",
-                "color": "5319e7",
-                "description": "New feature request"
-            }
-        ]
-
-        results = []
-        for label in labels:
-            result = self._create_github_label(
-                owner=owner,
-                repo=repo,
-                name=label["name"],
-                color=label["color"],
-                description=label["description"]
-            )
-            results.append({
-                "label": label["name"],
-                "status_code": result["status_code"]
-            })
-
-        return results
-    
-    def ensure_repo_labels(self, owner, repo):
-        return self.create_default_labels(owner, repo)
-    
-    def extract_issue_number(self, issue_url):
-        try:
-            return int(issue_url.rstrip("/").split("/")[-1])
-        except Exception:
-            return None
-
-    def apply_label_to_issue(self, owner, repo, issue_number, label_name):
+    def _list_github_labels(self, owner, repo):
         token = self._get_github_token()
         headers = {
-            "Authorization": f"Bearer {token}",
             "Accept": "application/vnd.github+json",
+            "Authorization": f"Bearer {token}",
             "X-GitHub-Api-Version": "2022-11-28"
         }
 
-        url = f"{self.BASE_URL}/repos/{owner}/{repo}/issues/{issue_number}/labels"
+        names = []
+        page = 1
+        while True:
+            response = requests.get(
+                f"{self.BASE_URL}/repos/{owner}/{repo}/labels",
+                headers=headers,
+                params={"per_page": 100, "page": page}
+            )
+            if response.status_code != 200:
+                return None
 
-        payload = {
-            "labels": [label_name]
-        }
+            page_labels = orjson.loads(response.content)
+            names.extend(label["name"] for label in page_labels)
+            if len(page_labels) < 100:
+                return names
+            page += 1
 
-        response = requests.post(url, json=payload, headers=headers)
+    def create_default_labels(self, owner, repo, labels=None):
+        if labels is None:
+            labels = DEFAULT_LABELS
+        if not labels:
+            return []
 
-        # 200 = ok, 201 = created
-        if response.status_code not in (200, 201):
-            print(
-                f"[GitHub] Error asignando label '{label_name}' "
-                f"a {owner}/{repo}#{issue_number}: {response.text}"
+        async def create_all(client):
+            responses = await client.gather(
+                client.post(f"/repos/{owner}/{repo}/labels", json=label)
+                for label in labels
             )
+            return [
+                {"label": label["name"], "status_code": response.status_code}
+                for label, response in zip(labels, responses)
+            ]
+
+        return self._run_fanout(create_all)
+
+    def ensure_repo_labels(self, owner, repo):
+        """
+        Crea en el repositorio de GitHub los labels por defecto que falten.
+        Se hace una sola vez por repositorio y ejecución (memo en la instancia)
+        y se persiste una marca con fecha para no repetirlo hasta que venza.
+        """
+        key = (owner.lower(), repo.lower())
+        if key in self._ensured_repos:
+            return []
 
-        return response.status_code in (200, 201)
+        ensured_since = timezone.now() - LABELS_ENSURED_TTL
+        if RepositoryLabelProvision.objects.filter(
+            owner__iexact=owner,
+            name__iexact=repo,
+            labels_ensured_at__gte=ensured_since
+        ).exists():
+            self._ensured_repos.add(key)
+            return []
+
+        existing = self._list_github_labels(owner, repo)
+        if existing is None:
+            # Sin acceso para listar labels: intento crearlos todos como antes
+            missing = DEFAULT_LABELS
+        else:
+            existing = {name.lower() for name in existing}
+            missing = [label for label in DEFAULT_LABELS if label["name"].lower() not in existing]
 
-    def download_new_repository(self, owner, repository, labels):
+        results = self.create_default_labels(owner, repo, missing)
+        self._ensured_repos.add(key)
+
+        # 201 = creado, 422 = ya existía
+        if all(result["status_code"] in (201, 422) for result in results):
+            RepositoryLabelProvision.objects.update_or_create(
+                owner=owner.lower(),
+                name=repo.lower(),
+                defaults={"labels_ensured_at": timezone.now()}
+            )
+
+        return results
+    
+    def extract_issue_number(self, issue_url):
+        try:
+            return int(issue_url.rstrip("/").split("/")[-1])
+        except Exception:
+            return None
+
+    def enqueue_label_for_issue(self, owner, repo, issue_number, label_name):
+        """
+        Encola el label para que lo aplique el worker `flush_issue_labels`
+        en lugar de hacer el POST a GitHub dentro del request.
+        """
+        PendingIssueLabel.objects.get_or_create(
+            user=self.user,
+            owner=owner,
+            repo=repo,
+            issue_number=issue_number,
+            label=label_name
+        )
+
+    def download_new_repository(self, owner, repository, labels, label_mode=Repository.LABEL_MODE_ALL, backend=BACKEND_REST):
         repo_url = f'{self.BASE_URL}/repos/{owner}/{repository}?state=all' #por defecto, trae issues en estado open (en caso de querer cambiarlo, se debe modificar el request a github, con state=all)
 
         token = self._get_github_token()
@@ -237,6 +862,7 @@ class GitService:
             existing_repo.html_url = repo_data['html_url']
             existing_repo.description = repo_data.get('description', '')
             existing_repo.labels = labels or []
+            existing_repo.label_mode = label_mode
             existing_repo.save()
             new_repo = existing_repo
         else:
@@ -247,72 +873,23 @@ class GitService:
                 html_url=repo_data['html_url'],
                 description=repo_data.get('description', ''),
                 labels=labels or [],
+                label_mode=label_mode,
                 user=self.user
             )
             new_repo.save()
 
-        issues_result = self._fetch_all_issues(owner, repository, labels)
-        if not issues_result['is_success']:
-            return issues_result
-        
-        new_issues_count = 0
-        for issue_data in issues_result['data']:
-            existing_issue = Issue.objects.filter(git_id=issue_data['id']).first()
-            status = issue_data['state'] == 'open'
-
-            if existing_issue:
-                existing_issue.title = issue_data['title']
-                existing_issue.html_url = issue_data['html_url']
-                existing_issue.body= issue_data['body']
-                existing_issue.status = status
-                existing_issue.labels = ', '.join([label['name'] for label in issue_data.get('labels', [])])
-                existing_issue.closed_at = issue_data.get('closed_at')
-                existing_issue.save()
-            else:
-                new_issue = Issue(
-                    git_id=issue_data['id'],
-                    html_url=issue_data['html_url'],
-                    title=issue_data['title'],
-                    status=status,
-                    labels=', '.join([label['name'] for label in issue_data.get('labels', [])]),
-                    repository=new_repo,
-                    body=issue_data['body']
-                )
-                new_issue.save()
-                new_issues_count += 1
-            #predicción de tags
-            preds = predict_tag(f"{issue_data['title']}. {issue_data['body'] or ''}")
-            if preds:
-                # Primera predicción
-                tag1, _ = Tag.objects.get_or_create(name=preds["primary_label"])
-                IssueTagPredicted.objects.update_or_create(
-                    issue=existing_issue if existing_issue else new_issue,
-                    tag=tag1,
-                    defaults={
-                        "confidence": preds["primary_score"],
-                        "rank": 1
-                    }
-                )
-                # Segunda predicción
-                tag2, _ = Tag.objects.get_or_create(name=preds["secondary_label"])
-                IssueTagPredicted.objects.update_or_create(
-                    issue=existing_issue if existing_issue else new_issue,
-                    tag=tag2,
-                    defaults={
-                        "confidence": preds["secondary_score"],
-                        "rank": 2
-                    }
-                )
-                IssueTag.objects.update_or_create(
-                    issue= existing_issue if existing_issue else new_issue,
-                    tag= tag1
-                )
+        try:
+            stats = self._ingest_issues(new_repo, labels, backend, use_shared=existing_repo is None)
+        except GitHubError as error:
+            return error.as_result()
+
         return {
             "is_success": True,
             "response_code": 200,
             "message": "Repository and issues downloaded successfully",
-            "data": issues_result['data'],
-            "new_issues": new_issues_count
+            "data": None,
+            "new_issues": stats["new"],
+            "stats": stats
         }
     
     def register_new_repository(self, owner, repository):
@@ -359,73 +936,20 @@ class GitService:
             "data": repository
         }
 
-    def update_repository(self, repository_id, label=None):
+    def update_repository(self, repository_id, label=None, backend=BACKEND_REST):
         try:
             repo = Repository.objects.get(repository_id=repository_id, user=self.user)
-            if label is None:
-                issues_result = self._fetch_all_issues(repo.owner, repo.name)
-            else:
-                issues_result = self._fetch_issues_for_label(repo.owner, repo.name, label)
-                
-            if not issues_result['is_success']:
-                return issues_result
-
-            new_issues_count = 0
-            for issue_data in issues_result['data']:
-                existing_issue = Issue.objects.filter(git_id=issue_data['id']).first()
-                status = issue_data['state'] == 'open'
-
-                if existing_issue:
-                    existing_issue.title = issue_data['title']
-                    existing_issue.html_url = issue_data['html_url']
-                    existing_issue.status = status
-                    existing_issue.body= issue_data['body']
-                    existing_issue.labels = ', '.join([label['name'] for label in issue_data.get('labels', [])])
-                    existing_issue.closed_at = issue_data.get('closed_at')
-                    existing_issue.save()
-                else:
-                    new_issue = Issue(
-                        git_id=issue_data['id'],
-                        html_url=issue_data['html_url'],
-                        title=issue_data['title'],
-                        status=status,
-                        labels=', '.join([label['name'] for label in issue_data.get('labels', [])]),
-                        repository=repo,
-                        body=issue_data['body']
-                    )
-                    new_issue.save()
-                    new_issues_count += 1
-                #predicción de tags
-                preds = predict_tag(f"{issue_data['title']}. {issue_data['body'] or ''}")
-                if preds:
-                    # Primera predicción
-                    tag1, _ = Tag.objects.get_or_create(name=preds["primary_label"])
-                    IssueTagPredicted.objects.update_or_create(
-                        issue=existing_issue if existing_issue else new_issue,
-                        tag=tag1,
-                        defaults={
-                            "confidence": preds["primary_score"],
-                            "rank": 1
-                        }
-                    )
-                    # Segunda predicción
-                    tag2, _ = Tag.objects.get_or_create(name=preds["secondary_label"])
-                    IssueTagPredicted.objects.update_or_create(
-                        issue=existing_issue if existing_issue else new_issue,
-                        tag=tag2,
-                        defaults={
-                            "confidence": preds["secondary_score"],
-                            "rank": 2
-                        }
-                    )
-                    IssueTag.objects.update_or_create(
-                        issue= existing_issue if existing_issue else new_issue,
-                        tag= tag1
-                    )
+            try:
+                stats = self._ingest_issues(repo, [label] if label is not None else None, backend)
+            except GitHubError as error:
+                return error.as_result()
 
             if label is not None:
-                repo.labels.append(label)
-                repo.save()
+                # Cada label agregado trae sus propios issues: el filtro acumulado es una unión
+                if label not in repo.labels:
+                    repo.labels.append(label)
+                repo.label_mode = Repository.LABEL_MODE_ANY
+                repo.save(update_fields=['labels', 'label_mode'])
             else:
                 # Si no se pasa label, limpio la lista de labels, porque significa que no hay filtro de labels
                 repo.labels = []
@@ -435,8 +959,9 @@ class GitService:
                 "is_success": True,
                 "response_code": 200,
                 "message": "Repository and issues updated successfully",
-                "data": issues_result['data'],
-                "new_issues": new_issues_count
+                "data": None,
+                "new_issues": stats["new"],
+                "stats": stats
             }
 
         except Repository.DoesNotExist:
@@ -447,119 +972,312 @@ class GitService:
                 "data": None
             }
         
-    def _run_graphql(self, query, variables):
+    def _post_graphql(self, query, variables):
+        """Cuerpo crudo de la respuesta de GraphQL."""
         token = self._get_github_token()
         headers = {
             "Authorization": f"Bearer {token}"
         }
 
         response = requests.post(
-            "https://api.github.com/graphql",
+            self.GRAPHQL_URL,
             json={"query": query, "variables": variables},
             headers=headers
         )
+        return response.content
 
+    def _run_graphql(self, query, variables):
         try:
-            return response.json()
+            return orjson.loads(self._post_graphql(query, variables))
         except Exception:
             return {}
     
-    def fetch_project_with_issues(self, owner, project_number):
-        variables = {
+    def _fetch_project_page(self, owner_type, owner, project_number, cursor=None):
+        payload = self._run_graphql(PROJECT_QUERY % PROJECT_OWNER_SELECTIONS[owner_type], {
             "login": owner,
-            "projectNumber": project_number
-        }
-        PROJECT_QUERY = """
-        query($login: String!, $projectNumber: Int!) {
-        %s(login: $login) {
-            projectV2(number: $projectNumber) {
-            id
-            title
-            url
-            items(first: 100) {
-                nodes {
-                content {
-                    ... on Issue {
-                    id
-                    title
-                    url
-                    body
-                    state
-                    labels(first: 20) {
-                        nodes {
-                            name
-                        }
-                    }
-                    }
-                }
-                fieldValues(first: 20) {
-                    nodes {
-                    ... on ProjectV2ItemFieldSingleSelectValue {
-                        name
-                        field {
-                        ... on ProjectV2SingleSelectField {
-                            name
-                        }
-                        }
-                    }
-                    }
-                }
-                }
-            }
-            }
-        }
-        }
+            "projectNumber": project_number,
+            "cursor": cursor
+        })
+        data = payload.get("data") or {}
+        project, owner_type = self._project_from_owner(data.get(owner_type or "repositoryOwner"), owner_type)
+        return project, owner_type, payload
+
+    def _project_from_owner(self, owner_data, owner_type):
+        # Con el tipo desconocido (`repositoryOwner`) se resuelve por `__typename`
+        owner_data = owner_data or {}
+        if owner_type is None:
+            typename = owner_data.get("__typename")
+            owner_type = {"Organization": "organization", "User": "user"}.get(typename)
+        return owner_data.get("projectV2"), owner_type
+
+    def _fetch_projects_first_pages(self, projects):
+        """
+        Primera página de items de varios proyectos en una sola consulta, con
+        un alias por proyecto: `{project_id: (projectV2, owner_type)}`. Si el
+        tipo guardado de un proyecto quedó desactualizado, ese se resuelve
+        aparte; el que no se encuentra queda con `projectV2` en None.
         """
-        org_query = PROJECT_QUERY % "organization"
-        org_payload = self._run_graphql(org_query, variables)
+        owner_types = [
+            project.owner_type or cache.get(self._owner_type_cache_key(project.owner))
+            for project in projects
+        ]
+        variables = {}
+        for index, project in enumerate(projects):
+            variables[f"login{index}"] = project.owner
+            variables[f"projectNumber{index}"] = project.project_number
+
+        payload = self._run_graphql(projects_items_query(owner_types), variables)
+        data = payload.get("data")
+        if not data:
+            raise GitHubError(502, "Error al obtener los items de los proyectos")
+
+        pages = {}
+        for index, (project, owner_type) in enumerate(zip(projects, owner_types)):
+            project_data, resolved_type = self._project_from_owner(data.get(f"p{index}"), owner_type)
+            if not project_data and owner_type is not None:
+                project_data, resolved_type, _ = self._fetch_project_page(None, project.owner, project.project_number)
+            pages[project.pk] = (project_data, resolved_type)
+        return pages
+
+    def _iter_project_item_pages(self, owner_type, owner, project_number, first_page):
+        items = first_page
+        while True:
+            yield items["nodes"]
+
+            if not items["pageInfo"]["hasNextPage"]:
+                break
 
-        print("ORG PAYLOAD:", org_payload)
+            project, _, _ = self._fetch_project_page(
+                owner_type, owner, project_number, items["pageInfo"]["endCursor"]
+            )
+            if not project:
+                raise GitHubError(502, "Error al obtener los items del proyecto")
+            items = project["items"]
 
-        project = (
-            org_payload
-            .get("data", {})
-            .get("organization")
+    def _ingest_project_page(self, ingest, ingestor, items, detail=None):
+        """Guarda una página con `ingest`, reporta el avance y devuelve si la página falló."""
+        predicted = ingestor.predicted
+        failed_pages = ingestor.failed_pages
+        unchanged = ingestor.unchanged
+        ingest(items)
+        self._report(
+            detail or {"projectId": ingestor.project.pk},
+            pages=1,
+            issues=len(items) - (ingestor.unchanged - unchanged),
+            unchanged=ingestor.unchanged - unchanged,
+            predictions=ingestor.predicted - predicted,
+            failed_pages=ingestor.failed_pages - failed_pages
         )
+        return ingestor.failed_pages > failed_pages
+
+    def _mark_project_synced(self, project, started_at, latest_update=None):
+        # `latest_update` es el `updatedAt` más reciente visto: el próximo refresh saltea los items
+        # anteriores. No pasa de `started_at`: un item editado mientras se paginaba pudo quedar
+        # en una página ya leída con su versión vieja, y tiene que volver a procesarse.
+        project.last_synced_at = started_at
+        if latest_update:
+            items_updated_at = min(datetime.strptime(latest_update, '%Y-%m-%dT%H:%M:%SZ'), started_at)
+            if project.items_updated_at is None or items_updated_at > project.items_updated_at:
+                project.items_updated_at = items_updated_at
 
-        if project and project.get("projectV2"):
+    def import_project(self, owner, project_number):
+        """Importa un GitHub Project con todos sus items, página por página."""
+        started_at = timezone.now()
+        result = self.fetch_project_with_issues(owner=owner, project_number=int(project_number))
+        if not result.get("is_success"):
             return {
-                "is_success": True,
-                "data": {
-                    "data": {
-                        "user": {
-                            "projectV2": project["projectV2"]
-                        }
-                    }
-                }
+                "is_success": False,
+                "response_code": 400,
+                "message": result.get("error", "Error al obtener el proyecto"),
+                "data": result.get("debug")
             }
-        
-        user_query = PROJECT_QUERY % "user"
-        user_payload = self._run_graphql(user_query, variables)
 
-        print("USER PAYLOAD:", user_payload)
-
-        project = (
-            user_payload
-            .get("data", {})
-            .get("user")
+        project_data = result["data"]
+        project, _ = Project.objects.get_or_create(
+            git_id=project_data["id"],
+            user=self.user,
+            owner=owner,
+            project_number=project_number,
+            defaults={
+                "name": project_data["title"],
+                "html_url": project_data["url"],
+                "owner_type": result["owner_type"],
+                "last_synced_at": timezone.now(),
+            }
         )
 
-        if project and project.get("projectV2"):
+        ingestor = ProjectItemIngestor(self, project, get_project_repository(self.user))
+        try:
+            for items in result["items"]:
+                self._ingest_project_page(ingestor.import_page, ingestor, items)
+        except GitHubError as error:
+            return error.as_result()
+
+        if not ingestor.failed_pages:
+            self._mark_project_synced(project, started_at, ingestor.latest_updates.get(project.pk))
+            project.save(update_fields=["last_synced_at", "items_updated_at"])
+
+        return {
+            "is_success": True,
+            "response_code": 201,
+            "message": "Project imported successfully",
+            "data": project,
+            "failed_pages": ingestor.failed_pages
+        }
+
+    def refresh_project(self, project):
+        """
+        Actualiza un proyecto ya importado página por página. Los items se
+        siguen pidiendo todos (GitHub no filtra los items de un proyecto por
+        fecha), pero solo se escriben los modificados desde `items_updated_at`.
+        La usan la vista `project/{id}/refresh` y el scheduler de sincronización.
+        """
+        # Antes de pedir la primera página: un item editado después de leerla tiene que volver a procesarse
+        started_at = timezone.now()
+        result = self.fetch_project_with_issues(
+            owner=project.owner,
+            project_number=project.project_number,
+            owner_type=project.owner_type
+        )
+        if not result.get("is_success"):
             return {
-                "is_success": True,
-                "data": {
-                    "data": {
-                        "user": {
-                            "projectV2": project["projectV2"]
-                        }
-                    }
-                }
+                "is_success": False,
+                "response_code": 400,
+                "message": "Error al actualizar el proyecto",
+                "data": None
             }
+
+        ingestor = ProjectItemIngestor(self, project, get_project_repository(self.user))
+        try:
+            for items in result["items"]:
+                self._ingest_project_page(ingestor.refresh_page, ingestor, items)
+        except GitHubError as error:
+            return error.as_result()
+
+        project.owner_type = result["owner_type"]
+        update_fields = ["owner_type"]
+        if not ingestor.failed_pages:
+            self._mark_project_synced(project, started_at, ingestor.latest_updates.get(project.pk))
+            update_fields += ["last_synced_at", "items_updated_at"]
+        project.save(update_fields=update_fields)
+
         return {
-            "is_success": False,
-            "error": "Proyecto no encontrado ni como usuario ni como organización",
-            "debug": {
-                "user": user_payload,
-                "organization": org_payload
+            "is_success": True,
+            "response_code": 200,
+            "message": "Project refreshed successfully",
+            "data": project,
+            "failed_pages": ingestor.failed_pages,
+            "unchanged": ingestor.unchanged
+        }
+
+    def refresh_projects(self, projects):
+        """
+        Actualiza varios proyectos ya importados. La primera página de items
+        de cada uno se pide en lotes de `PROJECTS_BATCH_SIZE` proyectos, con
+        una consulta GraphQL por lote, y se guarda en una sola pasada
+        (`ProjectItemIngestor.refresh_entries`); solo los proyectos con más de
+        una página siguen con su propio cursor. La usa la vista
+        `project/refresh-all`.
+        """
+        ingestor = ProjectItemIngestor(self, None, get_project_repository(self.user))
+        refreshed = []
+        not_found = []
+        for start in range(0, len(projects), PROJECTS_BATCH_SIZE):
+            batch = projects[start:start + PROJECTS_BATCH_SIZE]
+            started_at = timezone.now()
+            try:
+                pages = self._fetch_projects_first_pages(batch)
+            except GitHubError as error:
+                return error.as_result()
+
+            found = []
+            for project in batch:
+                if pages[project.pk][0]:
+                    found.append(project)
+                else:
+                    logger.warning("No se encontró en GitHub el proyecto %s", project)
+                    not_found.append(project.pk)
+
+            failed = set()
+            entries = [(project, item) for project in found for item in pages[project.pk][0]["items"]["nodes"]]
+            if entries and self._ingest_project_page(
+                ingestor.refresh_entries, ingestor, entries, {"projectIds": [project.pk for project in found]}
+            ):
+                failed.update(project.pk for project in found)
+
+            for project in found:
+                project_data, owner_type = pages[project.pk]
+                next_pages = islice(
+                    self._iter_project_item_pages(owner_type, project.owner, project.project_number, project_data["items"]),
+                    1, None
+                )
+                try:
+                    for items in next_pages:
+                        if self._ingest_project_page(
+                            ingestor.refresh_entries, ingestor, [(project, item) for item in items],
+                            {"projectId": project.pk}
+                        ):
+                            failed.add(project.pk)
+                except GitHubError:
+                    logger.exception("Error al obtener los items del proyecto %s", project)
+                    failed.add(project.pk)
+
+                project.owner_type = owner_type
+                if project.pk not in failed:
+                    self._mark_project_synced(project, started_at, ingestor.latest_updates.get(project.pk))
+                cache.set(self._owner_type_cache_key(project.owner), owner_type, OWNER_TYPE_CACHE_TTL)
+
+            Project.objects.bulk_update(found, ["owner_type", "last_synced_at", "items_updated_at"])
+            refreshed.extend(found)
+
+        return {
+            "is_success": True,
+            "response_code": 200,
+            "message": "Projects refreshed successfully",
+            "data": refreshed,
+            "failed_pages": ingestor.failed_pages,
+            "unchanged": ingestor.unchanged,
+            "not_found": not_found
+        }
+
+    def _owner_type_cache_key(self, owner):
+        return f"github-owner-type:{owner.lower()}"
+
+    def fetch_project_with_issues(self, owner, project_number, owner_type=None):
+        """
+        Devuelve los datos del proyecto y un generador `items` que recorre los
+        items página por página siguiendo `endCursor`, para no truncar en 100
+        ni mantener el proyecto completo en memoria.
+
+        `owner_type` ('organization' o 'user') es el guardado en el `Project`;
+        si no se pasa se busca en cache y, si tampoco está, se resuelve con
+        `repositoryOwner` en la misma consulta. Así cada página cuesta una sola
+        consulta GraphQL.
+        """
+        owner_type = owner_type or cache.get(self._owner_type_cache_key(owner))
+
+        project, resolved_type, payload = self._fetch_project_page(owner_type, owner, project_number)
+        if not project and owner_type is not None:
+            # El tipo guardado quedó desactualizado: resuelvo de nuevo
+            project, resolved_type, payload = self._fetch_project_page(None, owner, project_number)
+
+        if not project:
+            return {
+                "is_success": False,
+                "error": "Proyecto no encontrado ni como usuario ni como organización",
+                "debug": payload.get("errors")
             }
-        }
\ No newline at end of file
+
+        cache.set(self._owner_type_cache_key(owner), resolved_type, OWNER_TYPE_CACHE_TTL)
+        return {
+            "is_success": True,
+            "owner_type": resolved_type,
+            "data": {
+                "id": project["id"],
+                "title": project["title"],
+                "url": project["url"]
+            },
+            "items": self._iter_project_item_pages(
+                resolved_type, owner, project_number, project["items"]
+            )
+        }
@@ -0,0 +1,194 @@
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from .models import GitHubRepository, GitHubIssue, Repository
+from .records import IssueRecord
+
+# Una copia completa sincronizada hace menos que esto se usa en lugar de pedir los issues a GitHub
+SHARED_FRESHNESS = timedelta(minutes=10)
+PAGE_SIZE = 100
+# Campos de contenido que se reescriben al cambiar el issue en GitHub
+CONTENT_FIELDS = [
+    'node_id', 'html_url', 'title', 'body', 'is_open', 'is_pull_request',
+    'labels', 'closed_at', 'updated_at', 'content_hash'
+]
+
+
+def _parse_date(value):
+    # Las fechas se guardan naive en UTC (USE_TZ = False)
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%SZ') if value else None
+
+
+def _format_date(value):
+    return value.strftime('%Y-%m-%dT%H:%M:%SZ') if value else None
+
+
+def matches_labels(record, labels, label_mode):
+    if not labels:
+        return True
+    if label_mode == Repository.LABEL_MODE_ANY:
+        return any(label in record.labels for label in labels)
+    return all(label in record.labels for label in labels)
+
+
+class SharedIssueStore:
+    """Copia compartida de los issues de un repositorio de GitHub.
+
+    Cuando varios usuarios siguen el mismo repositorio, el contenido traído
+    de GitHub y su predicción se guardan una vez en `GitHubIssue`. Los
+    `Issue` de cada usuario siguen teniendo su copia (la usan las vistas, los
+    filtros y los serializers) más el estado propio: descartado,
+    observación y tags manuales.
+
+    Al ingerir, una predicción de la copia compartida con el mismo
+    `content_hash` se reutiliza en lugar de correr el modelo; y si la copia
+    está completa y es reciente (`SHARED_FRESHNESS`) la primera descarga y
+    las sincronizaciones del scheduler la leen directamente, sin pedir nada a
+    GitHub.
+    """
+
+    def __init__(self, github_repository):
+        self.github_repository = github_repository
+
+    @classmethod
+    def for_repository(cls, repo):
+        # El repositorio contenedor de GitHub Projects no corresponde a uno de GitHub
+        if repo.git_id is None or repo.git_id <= 0:
+            return None
+        github_repository, _ = GitHubRepository.objects.get_or_create(
+            git_id=repo.git_id,
+            defaults={"owner": repo.owner, "name": repo.name}
+        )
+        return cls(github_repository)
+
+    @classmethod
+    def for_github_id(cls, git_id):
+        """Copia compartida de un repositorio que ya se sincronizó alguna vez, o None."""
+        github_repository = GitHubRepository.objects.filter(git_id=git_id).first()
+        return cls(github_repository) if github_repository else None
+
+    @property
+    def synced_at(self):
+        return self.github_repository.synced_at
+
+    def is_fresh(self, since=None):
+        """Si la copia está completa, es reciente y tiene algo posterior a `since`."""
+        synced_at = self.synced_at
+        if synced_at is None or synced_at < timezone.now() - SHARED_FRESHNESS:
+            return False
+        return since is None or synced_at > since
+
+    def mark_synced(self, started_at, since=None):
+        """
+        Registra una sincronización sin filtro de labels que empezó en
+        `started_at`. Si fue incremental, la copia solo queda completa si ya lo
+        estaba en `since`.
+        """
+        if since is not None and (self.synced_at is None or since > self.synced_at):
+            return
+        self.github_repository.synced_at = started_at
+        self.github_repository.save(update_fields=['synced_at'])
+
+    def invalidate(self):
+        """La copia deja de considerarse completa, p. ej. tras renombrar un label en GitHub."""
+        GitHubRepository.objects.filter(pk=self.github_repository.pk).update(synced_at=None)
+        self.github_repository.synced_at = None
+
+    def iter_pages(self, labels=None, label_mode=Repository.LABEL_MODE_ALL, since=None):
+        """Páginas de `IssueRecord` de la copia compartida, con el filtro de labels aplicado en la base."""
+        issues = GitHubIssue.objects.filter(repository=self.github_repository).order_by('git_id')
+        if since:
+            # Igual que el `since` de GitHub, con precisión de segundos
+            issues = issues.filter(updated_at__gte=since.replace(microsecond=0))
+        if labels:
+            if label_mode == Repository.LABEL_MODE_ANY:
+                issues = issues.filter(labels__overlap=labels)
+            else:
+                issues = issues.filter(labels__contains=labels)
+
+        page = []
+        for issue in issues.iterator(chunk_size=PAGE_SIZE):
+            page.append(self._record(issue))
+            if len(page) == PAGE_SIZE:
+                yield page
+                page = []
+        if page:
+            yield page
+
+    def _record(self, issue):
+        return IssueRecord(
+            git_id=issue.git_id,
+            node_id=issue.node_id,
+            html_url=issue.html_url,
+            title=issue.title,
+            body=issue.body,
+            is_open=issue.is_open,
+            labels=tuple(issue.labels),
+            closed_at=_format_date(issue.closed_at),
+            updated_at=_format_date(issue.updated_at),
+            is_pull_request=issue.is_pull_request,
+        )
+
+    def load(self, records):
+        """`{git_id: (content_hash, prediction, predicted_hash)}` de los issues de la página ya guardados."""
+        return {
+            git_id: (content_hash, prediction, predicted_hash)
+            for git_id, content_hash, prediction, predicted_hash in GitHubIssue.objects.filter(
+                repository=self.github_repository,
+                git_id__in=[record.git_id for record in records]
+            ).values_list('git_id', 'content_hash', 'prediction', 'predicted_hash')
+        }
+
+    def store(self, records, known, predictions=None):
+        """
+        Guarda los issues de la página cuyo contenido cambió respecto de
+        `known` (el resultado de `load`) y las predicciones nuevas
+        (`{git_id: prediction}`).
+        """
+        predictions = predictions or {}
+        content_only = []
+        with_prediction = []
+        for record in records:
+            content_hash = record.content_hash
+            stored_hash, _, predicted_hash = known.get(record.git_id, (None, None, None))
+            prediction = predictions.get(record.git_id)
+            new_prediction = prediction is not None and predicted_hash != content_hash
+            if stored_hash == content_hash and not new_prediction:
+                continue
+
+            issue = GitHubIssue(
+                repository=self.github_repository,
+                git_id=record.git_id,
+                node_id=record.node_id,
+                html_url=record.html_url,
+                title=record.title,
+                body=record.body,
+                is_open=record.is_open,
+                is_pull_request=record.is_pull_request,
+                labels=list(record.labels),
+                closed_at=_parse_date(record.closed_at),
+                updated_at=_parse_date(record.updated_at),
+                content_hash=content_hash,
+            )
+            if new_prediction:
+                issue.prediction = prediction
+                issue.predicted_hash = content_hash
+                with_prediction.append(issue)
+            else:
+                content_only.append(issue)
+
+        for issues, fields in (
+            (content_only, CONTENT_FIELDS),
+            (with_prediction, CONTENT_FIELDS + ['prediction', 'predicted_hash']),
+        ):
+            if issues:
+                GitHubIssue.objects.bulk_create(
+                    issues,
+                    update_conflicts=True,
+                    unique_fields=['repository', 'git_id'],
+                    update_fields=fields
+                )
+
+    def remove(self, git_id):
+        GitHubIssue.objects.filter(repository=self.github_repository, git_id=git_id).delete()
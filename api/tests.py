@@ -1,3 +1,785 @@
-from django.test import TestCase
+import re
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import orjson
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .fake_github import FakeGitHub, FakeGitHubConfig
+from .ingestion import IssueIngestor, predict_pending_issues
+from .jobs import enqueue_job, run_job
+from .label_queue import MAX_ATTEMPTS, flush_pending_labels
+from .locks import advisory_lock, project_sync_key, repository_sync_key
+from .models import GitHubRepository, GitHubToken, Issue, Job, PendingIssueLabel, Project, ProjectIssue, Repository, SyncEvent
+from .records import IssueRecord
+from .scheduler import SyncScheduler
+from .services import GitService
+from .webhooks import sign_payload, verify_signature
+
+WEBHOOK_FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'webhooks'
+
+
+def fake_predict_tag(text):
+    # Predicción fija: los tests no cargan el modelo
+    return {
+        "primary_label": "UX ISSUE",
+        "primary_score": 0.9,
+        "secondary_label": "UX BUG",
+        "secondary_score": 0.1
+    }
+
+
+def create_user(username, token=True):
+    user = User.objects.create_user(username=username, password='secreta')
+    if token:
+        GitHubToken.objects.create(user=user, token=f'token-{username}')
+    return user
+
+
+class FakeGitHubTestCase(TestCase):
+    """Apunta `GitService` a un `FakeGitHub` local y reemplaza el modelo de predicción."""
+
+    fake_config = FakeGitHubConfig(repos={"octo/app": 250, "octo/small": 30})
+
+    def setUp(self):
+        super().setUp()
+        self.fake = FakeGitHub(self.fake_config)
+        base_url = self.fake.start()
+        self.addCleanup(self.fake.stop)
+
+        for patcher in (
+            mock.patch.object(GitService, 'BASE_URL', base_url),
+            mock.patch.object(GitService, 'GRAPHQL_URL', f'{base_url}/graphql'),
+            mock.patch('api.ingestion.predict_tag', side_effect=fake_predict_tag),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        # Los ids del repositorio falso se repiten entre instancias
+        GitHubRepository.objects.all().delete()
+        self.user = create_user('alice')
+
+    def calls(self):
+        return sum(self.fake.stats()["calls"].values())
+
+    def record_requests(self):
+        """Registra `(método, url, cuerpo)` de cada request que recibe el servidor falso."""
+        received = []
+        handle = self.fake.handle
+
+        def record(method, url, headers, body=b''):
+            received.append((method, url, body))
+            return handle(method, url, headers, body)
+
+        patcher = mock.patch.object(self.fake, 'handle', side_effect=record)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return received
+
+
+def make_record(number, title=None, labels=('UX ISSUE',)):
+    return IssueRecord(
+        git_id=900000 + number,
+        node_id=f'I_test{number}',
+        html_url=f'https://github.com/octo/app/issues/{number}',
+        title=title or f'Issue {number}',
+        body='Descripción',
+        is_open=True,
+        labels=tuple(labels),
+        closed_at=None,
+        updated_at='2024-01-01T00:00:00Z',
+    )
+
+
+class IssueIngestorTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch('api.ingestion.predict_tag', side_effect=fake_predict_tag)
+        self.predict = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.repo = Repository.objects.create(
+            owner='octo', name='app', git_id=1, html_url='https://github.com/octo/app',
+            user=create_user('alice')
+        )
+
+    def test_new_issues_are_created_and_predicted(self):
+        ingestor = IssueIngestor(self.repo)
+        ingestor.ingest_page([make_record(number) for number in range(1, 6)])
+
+        self.assertEqual(ingestor.stats["new"], 5)
+        self.assertEqual(Issue.objects.filter(repository=self.repo).count(), 5)
+        self.assertFalse(Issue.objects.filter(repository=self.repo, predicted_tags__isnull=True).exists())
+
+    def test_unchanged_issues_are_not_rewritten(self):
+        records = [make_record(number) for number in range(1, 6)]
+        IssueIngestor(self.repo).ingest_page(records)
+        self.predict.reset_mock()
+
+        ingestor = IssueIngestor(self.repo)
+        written = ingestor.ingest_page(records)
+
+        self.assertEqual(written, [])
+        self.assertEqual(ingestor.stats, {"new": 0, "changed": 0, "unchanged": 5, "failed_pages": 0})
+        self.predict.assert_not_called()
+
+    def test_only_changed_issues_are_predicted_again(self):
+        records = [make_record(number) for number in range(1, 6)]
+        IssueIngestor(self.repo).ingest_page(records)
+        self.predict.reset_mock()
+
+        records[2] = make_record(3, title='Título nuevo')
+        ingestor = IssueIngestor(self.repo)
+        written = ingestor.ingest_page(records)
+
+        self.assertEqual(ingestor.stats["changed"], 1)
+        self.assertEqual(ingestor.stats["unchanged"], 4)
+        self.assertEqual([issue.git_id for issue, _ in written], [900003])
+        self.assertEqual(self.predict.call_count, 1)
+        self.assertEqual(Issue.objects.get(git_id=900003).title, 'Título nuevo')
+
+    def test_without_prediction_the_issue_stays_pending(self):
+        IssueIngestor(self.repo, predict=False).ingest_page([make_record(1)])
+
+        issue = Issue.objects.get(git_id=900001)
+        self.assertNotEqual(issue.predicted_hash, issue.content_hash)
+        self.predict.assert_not_called()
+
+    def test_pending_predictions_can_be_limited_to_a_repository(self):
+        other = Repository.objects.create(
+            owner='octo', name='otro', git_id=2, html_url='https://github.com/octo/otro', user=self.repo.user
+        )
+        IssueIngestor(self.repo, predict=False).ingest_page([make_record(1), make_record(2)])
+        IssueIngestor(other, predict=False).ingest_page([make_record(3)])
+
+        self.assertEqual(predict_pending_issues(repository=self.repo), 2)
+        self.assertEqual(predict_pending_issues(repository=self.repo), 0)
+        pending = Issue.objects.get(repository=other)
+        self.assertNotEqual(pending.predicted_hash, pending.content_hash)
+
+
+class BackendTests(FakeGitHubTestCase):
+    def download(self, backend, user=None, name='app'):
+        return GitService(user or self.user).download_new_repository('octo', name, [], backend=backend)
+
+    def test_rest_backend_downloads_every_issue(self):
+        result = self.download(GitService.BACKEND_REST)
+
+        self.assertTrue(result["is_success"])
+        self.assertEqual(result["stats"]["new"], 250)
+        self.assertEqual(Issue.objects.filter(repository__user=self.user).count(), 250)
+
+    def test_graphql_backend_matches_rest(self):
+        self.download(GitService.BACKEND_REST)
+        # Sin esto la segunda descarga se leería de la copia compartida y no llamaría a GraphQL
+        GitHubRepository.objects.update(synced_at=None)
+        self.fake.reset_stats()
+        other = create_user('bob')
+        result = self.download(GitService.BACKEND_GRAPHQL, user=other)
+
+        self.assertTrue(result["is_success"])
+        self.assertFalse(result["stats"]["shared"])
+        calls = self.fake.stats()["calls"]
+        self.assertEqual(calls.get('POST /graphql'), 3)
+        self.assertNotIn('GET /repos/{owner}/{name}/issues', calls)
+        rest_issues = set(Issue.objects.filter(repository__user=self.user).values_list('git_id', 'content_hash'))
+        graphql_issues = set(Issue.objects.filter(repository__user=other).values_list('git_id', 'content_hash'))
+        self.assertEqual(len(graphql_issues), 250)
+        self.assertEqual(rest_issues, graphql_issues)
+
+    def issues_with(self, labels, mode):
+        match = all if mode == Repository.LABEL_MODE_ALL else any
+        return {
+            issue["id"] for issue in self.fake.repo('octo', 'app').issues
+            if match(label in [item["name"] for item in issue["labels"]] for label in labels)
+        }
+
+    def test_label_filter(self):
+        label = self.fake.repo('octo', 'app').issues[0]["labels"][0]["name"]
+        expected = self.issues_with([label], Repository.LABEL_MODE_ALL)
+        self.assertLess(len(expected), 250)
+
+        for backend in GitService.BACKENDS:
+            received = self.record_requests()
+            user = create_user(f'filtro-{backend}')
+            result = GitService(user).download_new_repository('octo', 'app', [label], backend=backend)
+
+            self.assertFalse(result["stats"]["shared"], backend)
+            self.assertEqual(set(Issue.objects.filter(repository__user=user).values_list('git_id', flat=True)), expected, backend)
+            if backend == GitService.BACKEND_GRAPHQL:
+                bodies = [orjson.loads(body) for method, url, body in received if url.endswith('/graphql')]
+                self.assertTrue(bodies)
+                self.assertTrue(all(body["variables"]["labels"] == [label] for body in bodies))
+            else:
+                urls = [url for method, url, body in received if '/issues?' in url]
+                self.assertTrue(urls)
+                self.assertTrue(all(parse_qs(urlparse(url).query)["labels"] == [label] for url in urls))
+
+    def test_any_label_mode(self):
+        issues = self.fake.repo('octo', 'app').issues
+        labels = sorted({issues[0]["labels"][0]["name"], issues[1]["labels"][0]["name"]})
+        expected = self.issues_with(labels, Repository.LABEL_MODE_ANY)
+        self.assertGreater(len(expected), len(self.issues_with(labels, Repository.LABEL_MODE_ALL)))
+
+        for backend in GitService.BACKENDS:
+            received = self.record_requests()
+            user = create_user(f'cualquiera-{backend}')
+            result = GitService(user).download_new_repository(
+                'octo', 'app', labels, label_mode=Repository.LABEL_MODE_ANY, backend=backend
+            )
+
+            self.assertFalse(result["stats"]["shared"], backend)
+            self.assertEqual(set(Issue.objects.filter(repository__user=user).values_list('git_id', flat=True)), expected, backend)
+            if backend == GitService.BACKEND_REST:
+                # En REST `labels=a,b` es AND: se pide cada label por separado
+                requested = {parse_qs(urlparse(url).query)["labels"][0] for method, url, body in received if '/issues?' in url}
+                self.assertEqual(requested, set(labels))
+
+    def test_sync_fetches_only_modified_issues(self):
+        self.download(GitService.BACKEND_REST)
+        repo = Repository.objects.get(user=self.user, name='app')
+        fake_repo = self.fake.repo('octo', 'app')
+        issue = fake_repo.issues[10]
+        issue["title"] = 'Título editado'
+        fake_repo.touch(issue)
+        self.fake.reset_stats()
+
+        result = GitService(self.user).sync_repository(repo)
+
+        self.assertEqual(result["stats"]["changed"], 1)
+        self.assertEqual(result["stats"]["new"], 0)
+        self.assertEqual(Issue.objects.get(repository=repo, git_id=issue["id"]).title, 'Título editado')
+        self.assertLessEqual(self.calls(), 2)
+
+
+class ArchiveTests(FakeGitHubTestCase):
+    def setUp(self):
+        super().setUp()
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        settings_override = self.settings(GITHUB_ARCHIVE_DIR=archive_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.service = GitService(self.user)
+
+    def test_replayed_issues_are_fetched_again_by_the_next_sync(self):
+        self.service.download_new_repository('octo', 'small', [])
+        repo = Repository.objects.get(user=self.user, name='small')
+        full_capture = self.service.archive.latest_capture('octo', 'small')
+
+        fake_repo = self.fake.repo('octo', 'small')
+        issue = fake_repo.issues[4]
+        issue["title"] = 'Título editado'
+        fake_repo.touch(issue)
+        repo.refresh_from_db()
+        self.service.sync_repository(repo)
+        self.assertEqual(self.service.archive.latest_capture('octo', 'small'), full_capture)
+
+        result = self.service.replay_repository(repo)
+
+        self.assertEqual(result["stats"]["changed"], 1)
+        self.assertNotEqual(Issue.objects.get(repository=repo, git_id=issue["id"]).title, 'Título editado')
+        repo.refresh_from_db()
+        self.assertEqual(repo.last_synced_at, self.service.archive.capture_fetched_at(full_capture))
+
+        self.service.sync_repository(repo)
+
+        self.assertEqual(Issue.objects.get(repository=repo, git_id=issue["id"]).title, 'Título editado')
+
+    def test_interrupted_capture_is_not_replayed(self):
+        handle = self.fake.handle
+        failing = True
+
+        def fail_second_page(method, url, headers, body=b''):
+            if failing and '/issues?' in url and 'page=2&' in url + '&':
+                return 502, {}, b'{"message": "Server Error"}'
+            return handle(method, url, headers, body)
+
+        patcher = mock.patch.object(self.fake, 'handle', side_effect=fail_second_page)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        result = self.service.download_new_repository('octo', 'app', [])
+        repo = Repository.objects.get(user=self.user, name='app')
+
+        self.assertFalse(result["is_success"])
+        self.assertEqual(self.service.archive.captures('octo', 'app')[0]["complete"], False)
+        self.assertIsNone(self.service.archive.latest_capture('octo', 'app'))
+        self.assertEqual(self.service.replay_repository(repo)["response_code"], 404)
+
+        failing = False
+        self.service.download_new_repository('octo', 'app', [])
+
+        latest = self.service.archive.captures('octo', 'app')[0]
+        self.assertTrue(latest["complete"])
+        self.assertEqual(self.service.archive.latest_capture('octo', 'app'), latest["capture"])
+
+
+class IssueRefreshTests(FakeGitHubTestCase):
+    def setUp(self):
+        super().setUp()
+        GitService(self.user).download_new_repository('octo', 'small', [])
+        self.repo = Repository.objects.get(user=self.user, name='small')
+        self.fake_repo = self.fake.repo('octo', 'small')
+
+    def issues(self, numbers):
+        urls = [self.fake_repo.issues[number - 1]["html_url"] for number in numbers]
+        return list(Issue.objects.filter(repository=self.repo, html_url__in=urls).select_related('repository'))
+
+    def test_refresh_by_node_ids(self):
+        issues = self.issues(range(1, 6))
+        for number in (1, 2):
+            issue = self.fake_repo.issues[number - 1]
+            issue["title"] = f'Editado {number}'
+            self.fake_repo.touch(issue)
+        # Borrado en GitHub: el nodo vuelve nulo
+        del self.fake_repo.issues[4]
+        manual = Issue.objects.create(repository=self.repo, title='Cargado a mano', html_url='https://example.com/1')
+        self.fake.reset_stats()
+
+        result = GitService(self.user).refresh_issues(issues + [manual])
+
+        self.assertTrue(result["is_success"])
+        self.assertEqual(
+            result["stats"],
+            {"new": 0, "changed": 2, "unchanged": 2, "failed_pages": 0, "missing": 1, "failed": 0, "skipped": 1}
+        )
+        self.assertEqual(self.fake.stats()["calls"], {'POST /graphql': 1})
+        self.assertEqual(
+            sorted(Issue.objects.filter(repository=self.repo, title__startswith='Editado').values_list('title', flat=True)),
+            ['Editado 1', 'Editado 2']
+        )
+
+    def test_one_graphql_call_per_batch(self):
+        self.fake.reset_stats()
+
+        with mock.patch('api.services.NODES_BATCH_SIZE', 10):
+            result = GitService(self.user).refresh_issues(self.issues(range(1, 31)))
+
+        self.assertEqual(result["stats"]["unchanged"], 30)
+        self.assertEqual(self.fake.stats()["calls"], {'POST /graphql': 3})
+
+    def test_failed_batch_keeps_the_partial_stats(self):
+        for issue in self.fake_repo.issues:
+            issue["title"] = f'Editado {issue["number"]}'
+            self.fake_repo.touch(issue)
+        handle = self.fake.handle
+        graphql_calls = []
+
+        def fail_second_batch(method, url, headers, body=b''):
+            if url.endswith('/graphql'):
+                graphql_calls.append(url)
+                if len(graphql_calls) == 2:
+                    return 502, {}, b'{"message": "Server Error"}'
+            return handle(method, url, headers, body)
+
+        job = enqueue_job(self.user, 'refresh_issues', {"issueIds": [issue.pk for issue in self.issues(range(1, 31))]})
+        with mock.patch('api.services.NODES_BATCH_SIZE', 10), \
+                mock.patch.object(self.fake, 'handle', side_effect=fail_second_batch):
+            job = run_job(job)
+
+        self.assertEqual(len(graphql_calls), 2)
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(job.result["response_code"], 502)
+        # Se guardó el primer lote; los otros dos quedaron sin actualizar
+        stats = job.result["stats"]
+        self.assertEqual((stats["changed"], stats["unchanged"], stats["failed"]), (10, 0, 20))
+        self.assertEqual(Issue.objects.filter(repository=self.repo, title__startswith='Editado').count(), 10)
+
+
+class WebhookSignatureTests(TestCase):
+    def test_valid_signature_is_accepted(self):
+        body = b'{"action": "opened"}'
+        self.assertTrue(verify_signature('secreto', body, sign_payload('secreto', body)))
+
+    def test_invalid_signature_is_rejected(self):
+        body = b'{"action": "opened"}'
+        self.assertFalse(verify_signature('secreto', body, sign_payload('otro', body)))
+        self.assertFalse(verify_signature('secreto', body + b' ', sign_payload('secreto', body)))
+        self.assertFalse(verify_signature('secreto', body, None))
+        self.assertFalse(verify_signature('', body, sign_payload('', body)))
+
+
+@override_settings(GITHUB_WEBHOOK_SECRET='secreto')
+class WebhookEndpointTests(TestCase):
+    def setUp(self):
+        self.repo = Repository.objects.create(
+            owner='octo-org', name='octo-app', git_id=700000001,
+            html_url='https://github.com/octo-org/octo-app', user=create_user('alice')
+        )
+
+    def post(self, fixture, event='issues', secret='secreto'):
+        body = (WEBHOOK_FIXTURES / fixture).read_bytes()
+        return self.client.post(
+            '/api/Git/Webhook/',
+            data=body,
+            content_type='application/json',
+            HTTP_X_GITHUB_EVENT=event,
+            HTTP_X_HUB_SIGNATURE_256=sign_payload(secret, body)
+        )
+
+    def test_signed_event_upserts_the_issue_with_pending_prediction(self):
+        response = self.post('issues_opened.json')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["new"], 1)
+        issue = Issue.objects.get(repository=self.repo, git_id=2100000001)
+        self.assertEqual(issue.html_url, 'https://github.com/octo-org/octo-app/issues/42')
+        self.assertNotEqual(issue.predicted_hash, issue.content_hash)
+        self.assertFalse(issue.predicted_tags.exists())
+        event = SyncEvent.objects.get(user=self.repo.user, kind='issues_upserted')
+        self.assertEqual(event.data["issueIds"], [issue.issue_id])
+
+    def test_bad_signature_is_rejected(self):
+        response = self.post('issues_opened.json', secret='otro')
+
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Issue.objects.exists())
+        self.assertFalse(SyncEvent.objects.exists())
+
+    def test_closed_event_updates_the_stored_issue(self):
+        self.post('issues_opened.json')
+        response = self.post('issues_closed.json')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()["changed"], 1)
+        self.assertFalse(Issue.objects.get(git_id=2100000001).status)
+
+    def test_ping(self):
+        response = self.post('issues_opened.json', event='ping')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Issue.objects.exists())
+
+
+class JobTests(FakeGitHubTestCase):
+    def params(self, **overrides):
+        params = {"owner": "octo", "name": "small", "labels": [], "labelMode": "all", "backend": "rest"}
+        params.update(overrides)
+        return params
+
+    def test_same_job_is_attached(self):
+        first = enqueue_job(self.user, 'download_repository', self.params())
+        second = enqueue_job(self.user, 'download_repository', self.params(owner='OCTO', name='Small'))
+
+        self.assertFalse(first.attached)
+        self.assertTrue(second.attached)
+        self.assertEqual(first.pk, second.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_different_params_or_users_get_their_own_job(self):
+        first = enqueue_job(self.user, 'download_repository', self.params())
+        by_label = enqueue_job(self.user, 'download_repository', self.params(labels=['UX ISSUE']))
+        by_user = enqueue_job(create_user('bob'), 'download_repository', self.params())
+
+        self.assertEqual(len({first.pk, by_label.pk, by_user.pk}), 3)
+
+    def test_finished_job_is_not_reused(self):
+        first = enqueue_job(self.user, 'download_repository', self.params())
+        run_job(first)
+        second = enqueue_job(self.user, 'download_repository', self.params())
+
+        first.refresh_from_db()
+        self.assertEqual(first.status, Job.STATUS_SUCCEEDED)
+        self.assertFalse(second.attached)
+        self.assertNotEqual(first.pk, second.pk)
+        self.assertEqual(Issue.objects.filter(repository__user=self.user).count(), 30)
+
+    def test_repository_lock_is_shared_between_users(self):
+        key = repository_sync_key('octo', 'small')
+        acquired_elsewhere = []
+
+        def try_lock():
+            try:
+                with advisory_lock(repository_sync_key('OCTO', 'Small'), wait=False) as acquired:
+                    acquired_elsewhere.append(acquired)
+            finally:
+                connection.close()
+
+        with advisory_lock(key) as acquired:
+            self.assertTrue(acquired)
+            thread = threading.Thread(target=try_lock)
+            thread.start()
+            thread.join()
+
+        self.assertEqual(acquired_elsewhere, [False])
+
+
+class SchedulerTests(FakeGitHubTestCase):
+    def setUp(self):
+        super().setUp()
+        self.repos = {}
+        for name in ('app', 'small'):
+            GitService(self.user).download_new_repository('octo', name, [])
+            repo = Repository.objects.get(user=self.user, name=name)
+            # Vencido y sin cambios en GitHub desde la última sincronización
+            repo.last_synced_at = timezone.now() - timedelta(days=1)
+            repo.remote_issue_count = len(self.fake.repo('octo', name).issues)
+            repo.save()
+            self.repos[name] = repo
+
+    def test_unchanged_repos_are_bulk_marked_synced(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = SyncScheduler().run_pass()
+
+        self.assertEqual(result, {"dispatched": 0, "deferred": 0, "unchanged": 2})
+        self.assertFalse(Job.objects.exists())
+        updates = [query for query in queries if query['sql'].startswith('UPDATE "repository"')]
+        self.assertEqual(len(updates), 1)
+        for repo in self.repos.values():
+            repo.refresh_from_db()
+            self.assertGreater(repo.last_synced_at, timezone.now() - timedelta(minutes=1))
+
+    def test_changed_issue_count_forces_a_sync(self):
+        small = self.repos['small']
+        small.remote_issue_count -= 1
+        small.save()
+
+        result = SyncScheduler().run_pass()
+
+        self.assertEqual(result["dispatched"], 1)
+        self.assertEqual(result["unchanged"], 1)
+        job = Job.objects.get()
+        self.assertEqual(job.params["repositoryId"], small.pk)
+        self.assertEqual(job.params["remoteIssueCount"], 30)
+        # Todavía no se sincronizó: el total viejo se conserva
+        small.refresh_from_db()
+        self.assertEqual(small.remote_issue_count, 29)
+
+    def test_issue_count_is_stored_only_after_a_successful_job(self):
+        small = self.repos['small']
+        small.remote_issue_count = 29
+        small.save()
+        SyncScheduler().run_pass()
+        job = Job.objects.get()
+
+        # Sin copia compartida fresca la sincronización va a GitHub, que falla
+        GitHubRepository.objects.update(synced_at=None)
+        handle = self.fake.handle
+
+        def fail_issues(method, url, headers, body=b''):
+            if '/issues?' in url:
+                return 502, {}, b'{"message": "Server Error"}'
+            return handle(method, url, headers, body)
+
+        with mock.patch.object(self.fake, 'handle', side_effect=fail_issues):
+            run_job(job)
+
+        job.refresh_from_db()
+        small.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_FAILED)
+        self.assertEqual(small.remote_issue_count, 29)
+
+        job = enqueue_job(self.user, job.kind, job.params)
+        run_job(job)
+
+        job.refresh_from_db()
+        small.refresh_from_db()
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(small.remote_issue_count, 30)
+
+
+class ProjectRefreshTests(FakeGitHubTestCase):
+    # Una sola página de items por proyecto
+    fake_config = FakeGitHubConfig(project_items=60)
+
+    def setUp(self):
+        super().setUp()
+        for number in (1, 2):
+            GitService(self.user).import_project('octo', number)
+        self.projects = list(Project.objects.filter(user=self.user).order_by('project_id'))
+
+    def edit_item(self, project_number, index, title):
+        fake_repo = self.fake._project('octo', project_number)
+        issue = fake_repo.issues[index]
+        issue["title"] = title
+        fake_repo.touch(issue)
+        return issue
+
+    def graphql_operations(self, received):
+        return [
+            re.match(r'\s*query (\w+)', orjson.loads(body)["query"]).group(1)
+            for method, url, body in received if url.endswith('/graphql')
+        ]
+
+    def test_refresh_projects_job(self):
+        edited = [self.edit_item(number, 3, f'Editado en el proyecto {number}') for number in (1, 2)]
+        before = {project.pk: (project.last_synced_at, project.items_updated_at) for project in self.projects}
+        received = self.record_requests()
+        refresh_projects = GitService.refresh_projects
+        locked_elsewhere = []
+
+        def check_locks(service, projects):
+            # Mientras corre el refresh, otra conexión no puede tomar el lock de ningún proyecto
+            def try_locks():
+                try:
+                    for project in projects:
+                        key = project_sync_key(self.user.pk, project.owner, project.project_number)
+                        with advisory_lock(key, wait=False) as acquired:
+                            locked_elsewhere.append(not acquired)
+                finally:
+                    connection.close()
+
+            thread = threading.Thread(target=try_locks)
+            thread.start()
+            thread.join()
+            return refresh_projects(service, projects)
+
+        with mock.patch.object(GitService, 'refresh_projects', autospec=True, side_effect=check_locks):
+            job = run_job(enqueue_job(self.user, 'refresh_projects'))
+
+        self.assertEqual(job.status, Job.STATUS_SUCCEEDED)
+        self.assertEqual(locked_elsewhere, [True, True])
+        self.assertEqual(self.graphql_operations(received), ['ProjectsItems'])
+        for issue in edited:
+            self.assertEqual(Issue.objects.get(html_url=issue["html_url"], repository__user=self.user).title, issue["title"])
+        for project in self.projects:
+            project.refresh_from_db()
+            last_synced_at, items_updated_at = before[project.pk]
+            self.assertGreater(project.last_synced_at, last_synced_at)
+            self.assertGreater(project.items_updated_at, items_updated_at)
+
+    def test_one_graphql_call_per_batch(self):
+        received = self.record_requests()
+
+        with mock.patch('api.services.PROJECTS_BATCH_SIZE', 1):
+            result = GitService(self.user).refresh_projects(self.projects)
+
+        self.assertTrue(result["is_success"])
+        # El item más reciente de cada proyecto cae en el mismo segundo que la marca y se vuelve a procesar
+        self.assertEqual(result["unchanged"], 118)
+        self.assertEqual(self.graphql_operations(received), ['ProjectsItems', 'ProjectsItems'])
+
+
+class ProjectWatermarkTests(FakeGitHubTestCase):
+    # Dos páginas de items
+    fake_config = FakeGitHubConfig(project_items=150)
+
+    def setUp(self):
+        super().setUp()
+        self.service = GitService(self.user)
+        self.service.import_project('octo', 1)
+        self.project = Project.objects.get(user=self.user)
+        self.fake_repo = self.fake._project('octo', 1)
+
+    def stored_title(self, issue):
+        return Issue.objects.get(html_url=issue["html_url"], repository__user=self.user).title
+
+    def test_item_edited_during_a_refresh_is_fetched_again(self):
+        edited = self.fake_repo.issues[5]
+        later = self.fake_repo.issues[120]
+        handle = self.fake.handle
+
+        def edit_while_paginating(method, url, headers, body=b''):
+            if not url.endswith('/graphql'):
+                return handle(method, url, headers, body)
+            first_page = orjson.loads(body)["variables"].get("cursor") is None
+            if not first_page:
+                # Un item de la segunda página cambia después de todo lo anterior
+                self.fake_repo.touch(later)
+            response = handle(method, url, headers, body)
+            if first_page and edited["title"] != 'Editado durante el refresh':
+                # La primera página ya salió con la versión vieja; el segundo de diferencia
+                # hace que la marca no pueda taparlo por la precisión de `updatedAt`
+                edited["title"] = 'Editado durante el refresh'
+                self.fake_repo.touch(edited)
+                time.sleep(1.1)
+            return response
+
+        with mock.patch.object(self.fake, 'handle', side_effect=edit_while_paginating):
+            self.service.refresh_project(self.project)
+        self.assertNotEqual(self.stored_title(edited), 'Editado durante el refresh')
+
+        self.project.refresh_from_db()
+        self.service.refresh_project(self.project)
+
+        self.assertEqual(self.stored_title(edited), 'Editado durante el refresh')
+
+    def test_new_item_older_than_the_watermark_is_imported(self):
+        # Un issue viejo que recién se agrega al proyecto
+        added = self.fake_repo._make_issue(999)
+        added["updated_at"] = self.fake_repo.issues[0]["updated_at"]
+        self.fake_repo.issues.insert(0, added)
+        self.assertLess(added["updated_at"], self.project.items_updated_at.strftime('%Y-%m-%dT%H:%M:%SZ'))
+
+        self.service.refresh_project(self.project)
+
+        self.assertTrue(ProjectIssue.objects.filter(project=self.project, issue__html_url=added["html_url"]).exists())
+
+    def test_deleted_project_issue_is_created_again(self):
+        issue = self.fake_repo.issues[10]
+        ProjectIssue.objects.filter(project=self.project, issue__html_url=issue["html_url"]).delete()
+
+        self.service.refresh_project(self.project)
+
+        self.assertTrue(ProjectIssue.objects.filter(project=self.project, issue__html_url=issue["html_url"]).exists())
+
+    def test_unchanged_stored_items_are_skipped(self):
+        watermark = self.project.items_updated_at.strftime('%Y-%m-%dT%H:%M:%SZ')
+        older = [issue for issue in self.fake_repo.issues[:150] if issue["updated_at"] < watermark]
+        # Si el item se procesara, el título local se pisaría con el de GitHub
+        Issue.objects.filter(html_url=older[0]["html_url"], repository__user=self.user).update(title='Título local')
+
+        result = self.service.refresh_project(self.project)
+
+        self.assertEqual(result["unchanged"], len(older))
+        self.assertGreater(len(older), 140)
+        self.assertEqual(self.stored_title(older[0]), 'Título local')
+
+
+class LabelQueueTests(FakeGitHubTestCase):
+    def enqueue(self, user, number, label):
+        return PendingIssueLabel.objects.create(user=user, owner='octo', repo='small', issue_number=number, label=label)
+
+    def issue_labels(self, number):
+        issue = self.fake.repo('octo', 'small').issues[number - 1]
+        return {label["name"] for label in issue["labels"]}
+
+    def test_labels_of_an_issue_are_sent_together(self):
+        self.enqueue(self.user, 1, 'UX BUG')
+        self.enqueue(self.user, 1, 'UX FEATURE REQUEST')
+        self.enqueue(self.user, 2, 'UX BUG')
+        self.fake.reset_stats()
+
+        result = flush_pending_labels()
+
+        self.assertEqual(result, {"applied": 2, "failed": 0})
+        self.assertEqual(self.calls(), 2)
+        self.assertTrue({'UX BUG', 'UX FEATURE REQUEST'} <= self.issue_labels(1))
+        self.assertIn('UX BUG', self.issue_labels(2))
+        self.assertFalse(PendingIssueLabel.objects.exists())
+
+    def test_user_without_token_does_not_block_the_rest(self):
+        self.enqueue(create_user('sin-token', token=False), 3, 'UX BUG')
+        self.enqueue(self.user, 4, 'UX BUG')
+
+        result = flush_pending_labels()
+
+        self.assertEqual(result, {"applied": 1, "failed": 1})
+        self.assertIn('UX BUG', self.issue_labels(4))
+        pending = PendingIssueLabel.objects.get()
+        self.assertEqual(pending.attempts, MAX_ATTEMPTS)
+        self.assertTrue(pending.last_error)
+
+    def test_missing_issue_is_not_retried(self):
+        self.enqueue(self.user, 9999, 'UX BUG')
+
+        result = flush_pending_labels()
+
+        self.assertEqual(result, {"applied": 0, "failed": 1})
+        self.assertEqual(PendingIssueLabel.objects.get().attempts, MAX_ATTEMPTS)
+
+    def test_rows_waiting_for_retry_are_not_claimed(self):
+        row = self.enqueue(self.user, 5, 'UX BUG')
+        row.next_attempt_at = timezone.now() + timedelta(minutes=10)
+        row.save()
+
+        self.assertEqual(flush_pending_labels(), {"applied": 0, "failed": 0})
@@ -1,6 +1,7 @@
 from rest_framework.routers import DefaultRouter
-from .views import RepositoryViewSet, IssueViewSet, TagViewSet, IssueTagViewSet, GitViewSet, GitConfigViewSet, RegisterView, LogoutView, ProjectViewSet
+from .views import RepositoryViewSet, IssueViewSet, TagViewSet, IssueTagViewSet, GitViewSet, GitConfigViewSet, RegisterView, LogoutView, ProjectViewSet, JobViewSet
 from django.urls import path
+from .events import sync_events
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
 router = DefaultRouter()
@@ -11,12 +12,14 @@ router.register(r'issue-tag', IssueTagViewSet)
 router.register(r'Git', GitViewSet, basename='git')
 router.register(r'GitHubToken', GitConfigViewSet, basename='github-token')
 router.register(r'project', ProjectViewSet, basename='project')
+router.register(r'Jobs', JobViewSet, basename='jobs')
 
 urlpatterns = [
     path('auth/register/', RegisterView.as_view()),
     path('auth/login/', TokenObtainPairView.as_view()),
     path('auth/refresh/', TokenRefreshView.as_view()),
     path('auth/logout/', LogoutView.as_view()),
+    path('Events/stream/', sync_events),
 ]
 
 urlpatterns += router.urls
@@ -1,4 +1,4 @@
-import io
+import orjson
 from rest_framework import viewsets, status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -10,10 +10,13 @@ from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
 
 from api.predictor import predict_tag
-from .models import IssueTagPredicted, Repository, Issue, Tag, IssueTag, GitHubToken, Project, ProjectIssue
-from .serializers import IssueWithProjectsViewSerializer, RepositoryGetAllSerializer, IssueSerializer, TagSerializer, IssueTagSerializer, GetIssueViewModelSerializer, GitConfigSerializer, RegisterSerializer, ProjectSerializer, ProjectListSerializer, IssueProjectSerializer, IssueWithProjectsSerializer
+from .models import IssueTagPredicted, Repository, Issue, Tag, IssueTag, GitHubToken, Project, Job
+from .serializers import IssueWithProjectsViewSerializer, RepositoryGetAllSerializer, IssueSerializer, TagSerializer, IssueTagSerializer, GetIssueViewModelSerializer, GitConfigSerializer, RegisterSerializer, ProjectSerializer, ProjectListSerializer, IssueProjectSerializer, IssueWithProjectsSerializer, JobSerializer
 from .filters import IssueFilter
-from .services import GitService
+from .services import GitService, GitHubError
+from .ingestion import get_project_repository
+from .jobs import enqueue_job
+from .webhooks import EVENT_HANDLERS, verify_signature
 from django.http import HttpResponse
 from django.conf import settings
 import requests
@@ -53,6 +56,15 @@ class RepositoryViewSet(viewsets.ModelViewSet):
 
         if not owner or not name:
             return Response({'error': 'Propietario y Repositorio son campos requeridos.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 'all': issues con todos los labels (AND de GitHub), 'any': issues con cualquiera de ellos
+        label_mode = request.data.get('labelMode', Repository.LABEL_MODE_ALL)
+        if label_mode not in dict(Repository.LABEL_MODE_CHOICES):
+            return Response({'error': 'labelMode debe ser "all" o "any".'}, status=status.HTTP_400_BAD_REQUEST)
+
+        backend = request.data.get('backend', GitService.BACKEND_REST)
+        if backend not in GitService.BACKENDS:
+            return Response({'error': 'backend debe ser "rest" o "graphql".'}, status=status.HTTP_400_BAD_REQUEST)
         
         if Repository.objects.filter(name=name, owner=owner, user=request.user).exists(): #ver despues el caso en el que se edita el label
             return Response(
@@ -60,21 +72,14 @@ class RepositoryViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        git_service = GitService(request.user)
-
-        try:
-            issues = git_service.download_new_repository(owner, name, labels)
-
-            if not issues['is_success']:
-                return Response(
-                    {"error": issues['message']},
-                    status=issues['response_code']
-                )
-
-            return Response(issues, status=status.HTTP_200_OK)
-        
-        except Exception as ex:
-            return Response({"error": str(ex)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        job = enqueue_job(request.user, 'download_repository', {
+            "owner": owner,
+            "name": name,
+            "labels": labels,
+            "labelMode": label_mode,
+            "backend": backend
+        })
+        return job_accepted(job)
     
     @action(detail=False, methods=['get'], url_path='GetAll')
     def GetAll(self, request, *args, **kwargs):
@@ -86,29 +91,28 @@ class RepositoryViewSet(viewsets.ModelViewSet):
     def add_label_in_repo(self, request, *args, **kwargs):
         id_repo = request.data.get('id')
         label = request.data.get("newLabel")
+        backend = request.data.get('backend', GitService.BACKEND_REST)
         print("Label recibido:", label, ", id del repo:", id_repo)
 
-        git_service = GitService(request.user)
+        if backend not in GitService.BACKENDS:
+            return Response({'error': 'backend debe ser "rest" o "graphql".'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            issues = git_service.update_repository(id_repo, label)
+        if not Repository.objects.filter(repository_id=id_repo, user=request.user).exists():
+            return Response({"error": "Repository not found"}, status=status.HTTP_404_NOT_FOUND)
 
-            if not issues['is_success']:
-                return Response(
-                    {"error": issues['message']},
-                    status=issues['response_code']
-                )
-            return Response(issues, status=status.HTTP_200_OK)
-        
-        except Exception as ex:
-            return Response({"error": str(ex)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        job = enqueue_job(request.user, 'update_repository', {
+            "repositoryId": id_repo,
+            "label": label,
+            "backend": backend
+        })
+        return job_accepted(job)
 
     @action(detail=True, methods=['post'], url_path='UpdateRepository')
     def update_repository(self, request, pk=None):
         try:
             repo = self.get_object()
 
-            api_url = f'https://api.github.com/repos/{repo.owner}/{repo.name}'
+            api_url = f'{settings.GITHUB_API_URL}/repos/{repo.owner}/{repo.name}'
             response = requests.get(api_url)
 
             if response.status_code != 200:
@@ -122,7 +126,7 @@ class RepositoryViewSet(viewsets.ModelViewSet):
             repo.labels = []
             repo.save()
 
-            issues_url = f'https://api.github.com/repos/{repo.owner}/{repo.name}/issues?state=all'
+            issues_url = f'{settings.GITHUB_API_URL}/repos/{repo.owner}/{repo.name}/issues?state=all'
             issues_response = requests.get(issues_url)
 
             if issues_response.status_code != 200:
@@ -140,21 +144,17 @@ class RepositoryViewSet(viewsets.ModelViewSet):
         if not owner:
             return Response({'error': 'El propietario es requerido'}, status=status.HTTP_400_BAD_REQUEST)
 
-        github_url = f'https://api.github.com/users/{owner}/repos?state=all'
-        headers = {'Authorization': f'Bearer {settings.GITHUB_TOKEN}'}
-
         try:
-            response = requests.get(github_url, headers=headers)
-            
-            if response.status_code != 200:
-                return Response({'error': 'Error al obtener los repositorios desde GitHub'}, status=status.HTTP_404_NOT_FOUND)
-
-            repos = response.json()
-            return Response({'repos': repos}, status=status.HTTP_200_OK)
-        
+            repos = GitService(request.user).list_owner_repositories(owner)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except GitHubError:
+            return Response({'error': 'Error al obtener los repositorios desde GitHub'}, status=status.HTTP_404_NOT_FOUND)
         except requests.exceptions.RequestException as e:
             return Response({'error': f'Error al obtener la información desde GitHub: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
+
+        return Response({'repos': repos}, status=status.HTTP_200_OK)
+
 class IssueViewSet(viewsets.ModelViewSet):
     serializer_class = IssueSerializer
     permission_classes = [IsAuthenticated]
@@ -265,6 +265,15 @@ class IssueViewSet(viewsets.ModelViewSet):
             'previous': page_obj.has_previous(),
         })
     
+    @action(detail=False, methods=['post'], url_path='Refresh')
+    def Refresh(self, request, *args, **kwargs):
+        issue_ids = request.data.get('issueIds')
+        if not isinstance(issue_ids, list) or not issue_ids or not all(isinstance(issue_id, int) for issue_id in issue_ids):
+            return Response({'error': 'issueIds debe ser una lista de ids de issues'}, status=status.HTTP_400_BAD_REQUEST)
+
+        job = enqueue_job(request.user, 'refresh_issues', {"issueIds": sorted(set(issue_ids))})
+        return job_accepted(job)
+
     @action(detail=False, methods=['post'], url_path='GetFile')
     def GetFile(self, request, *args, **kwargs):
         filter_data = request.data
@@ -422,99 +431,17 @@ class IssueViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'], url_path='ImportIssues')
     def ImportIssue(self, request, *args, **kwargs):
         file = request.FILES.get('file')
-        print(f"Archivo recibido: {file.name}")
-        errores= 0
         if not file:
             return Response({"error": "No file uploaded."}, status=400)
 
         try:
-            # Leemos el contenido del archivo CSV
-            file_data = file.read().decode('utf-8')  # Decodificamos a texto, VER SI ME SIRVE ESTA DECODIFICACION (hay caracteres especiales)
-            csv_reader = csv.reader(io.StringIO(file_data))
-            for idx, row in enumerate(csv_reader):
-                try:
-                    if (row[1]) == "title":
-                        continue
-                    title= row[1]
-                    htmlUrl= row[11]
-                    issue = Issue.objects.filter(html_url=htmlUrl, repository__user=request.user).first()
-                    if issue: #actualizar datos del issue que ya existe
-                        print(f"Issue {title} - existe")
-                        issue.status = row[2] == 'True'
-                        issue.discarded = row[3] == 'True'
-                        issue.observation = row[4]
-                        issue.labels = row[8]
-                        issue.body = row[12]
-                        issue.save()
-                    else: 
-                        #Mirar si existe el repo en la bd. Si existe entonces actualizo su repo. Si no existe entonces traerlo. En ambos casos luego actualizar el issue.
-                        print(f"Issue {title} - NO existe")
-                        owner_name= htmlUrl.split('/')[3]
-                        repo_name= htmlUrl.split('/')[4]
-                        repo = Repository.objects.filter(owner=owner_name, name= repo_name,user=request.user).first()
-                        git_service = GitService(request.user)
-                        if repo:
-                            print(f"repositorio {repo_name} de {owner_name} existe: actualizo repositorio")
-                            #actualizo repo (actualmente no se usa, pero puede servir en un futuro)
-                            #git_service.update_repository(repo.repository_id)
-                            #issue = Issue.objects.filter(html_url=htmlUrl).first()
-                            #issue.discarded = row[3] == 'True'
-                            #issue.observation = row[4]
-                            #issue.save()
-                            issue = Issue.objects.create(
-                                title=title,
-                                status=row[2] == 'True',
-                                discarded=row[3] == 'True',
-                                observation=row[4],
-                                labels=row[8],
-                                body=row[12],
-                                html_url=htmlUrl,
-                                repository= repo
-                            )
-                        else:
-                            #analizo si es un issue manual o si tiene repo pero no esta en el sistema (entonces lo traigo)
-                            if htmlUrl:
-                                print(f"repositorio {repo_name} de {owner_name} no existe: agregando nuevo repositorio")
-                                #traer el nuevo
-                                git_service.register_new_repository(owner_name, repo_name)
-                                repo = Repository.objects.filter(owner=owner_name, name= repo_name,user=request.user).first()
-                                issue = Issue.objects.create(
-                                    title=title,
-                                    status=row[2] == 'True',
-                                    discarded=row[3] == 'True',
-                                    observation=row[4],
-                                    labels=row[8],
-                                    body=row[12],
-                                    html_url=htmlUrl,
-                                    repository=repo
-                                )
-                            else:
-                                issue = Issue.objects.create(
-                                    title=title,
-                                    discarded=row[3] == 'True',
-                                    observation=row[4],
-                                    body=row[12]
-                                )
-                    #Analisis del tag del issue: Existe en la base de datos local, no existe (crearlo entonces)
-                    tag = Tag.objects.filter(name__iexact=row[10]).first()
-                    if not tag:
-                        tag = Tag.objects.create(name=row[10])
-                        print("TAG NUEVO")
-                    else:
-                        print("EXISTE EL TAG")
-                    IssueTag.objects.get_or_create(issue=issue, tag=tag)
-
-                except Exception as e:
-                    print(f"Error en linea {idx}: {e}")
-                    errores= errores + 1
-                    continue
-
-            if(errores == 0):
-                return Response({"message": "Archivo recibido y leído correctamente."})
-            else:
-                return Response({"message": "Hubo errores durante la importación de issues"}, status=500)
-        except Exception as e:
-            return Response({"error": str(e)}, status=500)
+            # Leemos el contenido del archivo CSV; el procesamiento lo hace un worker
+            file_data = file.read().decode('utf-8')
+        except UnicodeDecodeError as e:
+            return Response({"error": str(e)}, status=400)
+
+        job = enqueue_job(request.user, 'import_issues', {"csv": file_data})
+        return job_accepted(job)
     
     @action(detail=False, methods=['put'], url_path='Update/(?P<id>\d+)')
     def Update(self, request, id=None):
@@ -628,22 +555,62 @@ class GitViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=['post'], url_path='UpdateRepository/(?P<repository_id>[^/.]+)')
     def update_repository(self, request, repository_id):
-        git_service = GitService(request.user)
+        backend = request.data.get('backend', GitService.BACKEND_REST)
+        if backend not in GitService.BACKENDS:
+            return Response({'error': 'backend debe ser "rest" o "graphql".'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if not Repository.objects.filter(repository_id=repository_id, user=request.user).exists():
+            return Response({"error": "Repository not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        job = enqueue_job(request.user, 'update_repository', {
+            "repositoryId": repository_id,
+            "label": None,
+            "backend": backend
+        })
+        return job_accepted(job)
+
+    @action(
+        detail=False,
+        methods=['post'],
+        url_path='Webhook',
+        permission_classes=[permissions.AllowAny],
+        authentication_classes=[]
+    )
+    def webhook(self, request):
+        # La firma se calcula sobre el cuerpo crudo, antes de parsearlo
+        body = request.body
+        signature = request.headers.get('X-Hub-Signature-256')
+        if not verify_signature(settings.GITHUB_WEBHOOK_SECRET, body, signature):
+            return Response({'error': 'Firma del webhook inválida'}, status=status.HTTP_401_UNAUTHORIZED)
+
+        event = request.headers.get('X-GitHub-Event')
+        if event == 'ping':
+            return Response({'status': 'pong'}, status=status.HTTP_200_OK)
+
+        handler = EVENT_HANDLERS.get(event)
+        if handler is None:
+            return Response({'status': f'Evento {event} ignorado'}, status=status.HTTP_200_OK)
 
         try:
-            issues = git_service.update_repository(repository_id)
-            if not issues['is_success']:
-                return Response(
-                    {"error": issues['message']},
-                    status=issues['response_code']
-                )
-            return Response(issues, status=status.HTTP_200_OK)
+            payload = orjson.loads(body)
+        except orjson.JSONDecodeError:
+            return Response({'error': 'El webhook debe enviarse como application/json'}, status=status.HTTP_400_BAD_REQUEST)
 
-        except Exception as ex:
-            return Response(
-                {"error": f"Internal Server Error: {str(ex)}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
+        return Response(handler(payload), status=status.HTTP_202_ACCEPTED)
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    permission_classes = [IsAuthenticated]
+    serializer_class = JobSerializer
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user).order_by('-created_at')
+
+def job_accepted(job):
+    # `attached`: el pedido se unió a un job igual que ya estaba en curso
+    return Response(
+        {"jobId": job.id, "status": job.status, "attached": job.attached},
+        status=status.HTTP_202_ACCEPTED
+    )
 
 def home(request):
     return HttpResponse("Bienvenido a la API de UxDebt. Usa /api/ para acceder a los endpoints.")
@@ -737,18 +704,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
             
     def get_or_create_project_repository(self, user):
-        repo, _ = Repository.objects.get_or_create(
-            user=user,
-            owner="__project__",
-            name="github-projects",
-            defaults={
-                "git_id": -1000 - user.id,
-                "html_url": "",
-                "description": "Issues importados desde GitHub Projects",
-                "labels": []
-            }
-        )
-        return repo
+        return get_project_repository(user)
 
     @action(detail=False, methods=['post'], url_path='import')
     def import_project(self, request):
@@ -769,239 +725,20 @@ class ProjectViewSet(viewsets.ModelViewSet):
                 {"error": "Este proyecto ya fue importado"},
                 status=status.HTTP_409_CONFLICT
             )
-        git_service = GitService(request.user)
-        result = git_service.fetch_project_with_issues(
-            owner=owner,
-            project_number=int(project_number)
-        )
-        print("RESULTADO GITHUB:", result)
-        if not result.get("is_success"):
-            return Response(
-                {
-                    "error": result.get("error", "Error al obtener el proyecto"),
-                    "details": result.get("data"),
-                },
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        github_data = result.get("data")
-
-        if not github_data or "data" not in github_data:
-            return Response(
-                {"error": "Respuesta inválida de GitHub"},
-                status=status.HTTP_502_BAD_GATEWAY
-            )
-
-        project_data = github_data["data"]["user"]["projectV2"]
-
-        if not project_data:
-            return Response(
-                {"error": "Proyecto no encontrado en GitHub"},
-                status=status.HTTP_404_NOT_FOUND
-            )
-
-        project, _ = Project.objects.get_or_create(
-            git_id=project_data["id"],
-            user=request.user,
-            owner=owner,
-            project_number=project_number,
-            defaults={
-                "name": project_data["title"],
-                "html_url": project_data["url"],
-            }
-        )
-        project_repo = self.get_or_create_project_repository(request.user)
-        for item in project_data["items"]["nodes"]:
-            content = item.get("content")
-            if not content:
-                continue
-
-            issue = Issue.objects.filter(
-                html_url=content["url"],
-                repository__user=request.user
-            ).first()
-
-            if not issue:
-                github_labels = ", ".join(
-                    l["name"] for l in content.get("labels", {}).get("nodes", [])
-                )
-                issue = Issue.objects.create(
-                    title=content["title"],
-                    body=content.get("body"),
-                    html_url=content["url"],
-                    labels= github_labels,
-                    status=content["state"] == "OPEN",
-                    repository=project_repo
-                )
-
-
-            repo_owner, repo_name = git_service.extract_repo_from_issue_url(content["url"])
-            print("ISSUE URL:", content["url"])
-            print("EXTRACTED:", repo_owner, repo_name)
-            if repo_owner and repo_name:
-                git_service.ensure_repo_labels(repo_owner, repo_name)
-
-            preds = predict_tag(f"{content['title']}. {content.get('body') or ''}")
-
-            if preds:
-                predicted_label = preds["primary_label"]
-                if issue.labels:
-                    issue.labels = f"{issue.labels}, {predicted_label}"
-                else:
-                    issue.labels = predicted_label
-
-                issue.save(update_fields=["labels"])
-
-                tag1, _ = Tag.objects.get_or_create(name=preds["primary_label"])
-                IssueTagPredicted.objects.update_or_create(
-                    issue=issue,
-                    tag=tag1,
-                    defaults={"confidence": preds["primary_score"], "rank": 1}
-                )
-                tag2, _ = Tag.objects.get_or_create(name=preds["secondary_label"])
-                IssueTagPredicted.objects.update_or_create(
-                    issue=issue,
-                    tag=tag2,
-                    defaults={"confidence": preds["secondary_score"], "rank": 2}
-                )
-                IssueTag.objects.update_or_create(
-                    issue= issue,
-                    tag= tag1
-                )
-                if repo_owner and repo_name:
-                    issue_number = git_service.extract_issue_number(content["url"])
-                    if issue_number:
-                        git_service.apply_label_to_issue(
-                            owner=repo_owner,
-                            repo=repo_name,
-                            issue_number=issue_number,
-                            label_name=tag1.name
-                        )
-
-            status_value = "TODO"
-            for field in item["fieldValues"]["nodes"]:
-                if field.get("field", {}).get("name") == "Status":
-                    status_value = field["name"].upper()
-
-            ProjectIssue.objects.get_or_create(
-                project=project,
-                issue=issue,
-                defaults={"status": status_value}
-            )
-
-        serializer = ProjectSerializer(project)
-        return Response(serializer.data, status=201)
+        job = enqueue_job(request.user, 'import_project', {
+            "owner": owner,
+            "projectNumber": int(project_number)
+        })
+        return job_accepted(job)
     
     @action(detail=True, methods=['post'], url_path='refresh')
     def refresh_project(self, request, pk=None):
         project = get_object_or_404(Project, pk=pk, user=request.user)
-        project_repo = self.get_or_create_project_repository(request.user)
-
-        git_service = GitService(request.user)
-        result = git_service.fetch_project_with_issues(
-            owner=project.owner,
-            project_number=project.project_number
-        )
-
-        if not result.get("is_success"):
-            return Response(
-                {"error": "Error al actualizar el proyecto"},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        project_data = result["data"]["data"]["user"]["projectV2"]
 
-        for item in project_data["items"]["nodes"]:
-            content = item.get("content")
-            if not content:
-                continue
-
-            repo_owner, repo_name = git_service.extract_repo_from_issue_url(content["url"])
-            if not repo_owner or not repo_name:
-                continue
-
-            issue = (
-                Issue.objects
-                .filter(html_url=content["url"], repository__user=request.user)
-                .select_related("repository")
-                .first()
-            )
-
-            created = False
-            github_labels = ", ".join(
-                l["name"] for l in content.get("labels", {}).get("nodes", [])
-            )
-
-            if not issue:
-                issue = Issue.objects.create(
-                    html_url=content["url"],
-                    title=content["title"],
-                    body=content.get("body"),
-                    status=content["state"] == "OPEN",
-                    labels= github_labels,
-                    repository=project_repo 
-                )
-                created = True
-            else:
-                issue.title = content["title"]
-                issue.body = content.get("body")
-                issue.status = content["state"] == "OPEN"
-                issue.labels = github_labels
-
-                # si ya tiene repo real, NO se toca
-                if issue.repository is None:
-                    issue.repository = project_repo
-
-                issue.save()
-
-            status_value = "TODO"
-            for field in item["fieldValues"]["nodes"]:
-                if field.get("field", {}).get("name") == "Status":
-                    status_value = field["name"].upper()
-
-            ProjectIssue.objects.update_or_create(
-                project=project,
-                issue=issue,
-                defaults={"status": status_value}
-            )
+        job = enqueue_job(request.user, 'refresh_project', {"projectId": project.pk})
+        return job_accepted(job)
 
-            if created:
-                git_service.ensure_repo_labels(repo_owner, repo_name)
-
-                preds = predict_tag(f"{content['title']}. {content.get('body') or ''}")
-                if preds:
-
-                    predicted_label = preds["primary_label"]
-                    if issue.labels:
-                        issue.labels = f"{issue.labels}, {predicted_label}"
-                    else:
-                        issue.labels = predicted_label
-                    issue.save(update_fields=["labels"])
-
-                    tag1, _ = Tag.objects.get_or_create(name=preds["primary_label"])
-                    tag2, _ = Tag.objects.get_or_create(name=preds["secondary_label"])
-
-                    IssueTagPredicted.objects.update_or_create(
-                        issue=issue,
-                        tag=tag1,
-                        defaults={"confidence": preds["primary_score"], "rank": 1}
-                    )
-
-                    IssueTagPredicted.objects.update_or_create(
-                        issue=issue,
-                        tag=tag2,
-                        defaults={"confidence": preds["secondary_score"], "rank": 2}
-                    )
-
-                    IssueTag.objects.update_or_create(issue=issue, tag=tag1)
-
-                    issue_number = git_service.extract_issue_number(content["url"])
-                    if issue_number:
-                        git_service.apply_label_to_issue(
-                            owner=repo_owner,
-                            repo=repo_name,
-                            issue_number=issue_number,
-                            label_name=tag1.name
-                        )
-
-        return Response({"message": "Proyecto actualizado correctamente"})
\ No newline at end of file
+    @action(detail=False, methods=['post'], url_path='refresh-all')
+    def refresh_all_projects(self, request):
+        job = enqueue_job(request.user, 'refresh_projects')
+        return job_accepted(job)
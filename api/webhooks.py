@@ -0,0 +1,111 @@
+import hashlib
+import hmac
+
+from .ingestion import IssueIngestor
+from .models import Issue, Repository, SyncEvent
+from .records import IssueRecord
+from .shared_issues import SharedIssueStore, matches_labels
+
+# Acciones del evento `issues` que implican que el issue ya no está en el repositorio
+REMOVED_ACTIONS = ('deleted', 'transferred')
+
+
+def sign_payload(secret, body):
+    return 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(secret, body, signature):
+    """Verifica el header `X-Hub-Signature-256` que GitHub calcula con el secreto del webhook."""
+    if not secret or not signature:
+        return False
+    return hmac.compare_digest(sign_payload(secret, body), signature)
+
+
+def handle_issues_event(payload):
+    """
+    Actualiza el issue del evento en cada `Repository` que sigue al repositorio
+    de GitHub. La predicción queda pendiente para `predict_pending_issues`.
+    """
+    action = payload.get('action')
+    issue_data = payload['issue']
+    repos = Repository.objects.filter(git_id=payload['repository']['id'])
+    shared = SharedIssueStore.for_github_id(payload['repository']['id'])
+
+    if action in REMOVED_ACTIONS:
+        deleted, _ = Issue.objects.filter(repository__in=repos, git_id=issue_data['id']).delete()
+        if shared:
+            shared.remove(issue_data['id'])
+        return {"removed": deleted}
+
+    record = IssueRecord.from_rest(issue_data)
+    if shared:
+        shared.store([record], shared.load([record]))
+    tracked = set(
+        Issue.objects
+        .filter(repository__in=repos, git_id=record.git_id)
+        .values_list('repository_id', flat=True)
+    )
+
+    stats = {"new": 0, "changed": 0, "unchanged": 0, "failed_pages": 0}
+    for repo in repos:
+        # Un issue que ya se sigue se actualiza aunque haya dejado de cumplir el filtro de labels
+        if repo.repository_id not in tracked and not matches_labels(record, repo.labels, repo.label_mode):
+            continue
+        ingestor = IssueIngestor(repo, predict=False)
+        written = ingestor.ingest_page([record])
+        if written:
+            SyncEvent.objects.create(user_id=repo.user_id, kind='issues_upserted', data={
+                "repositoryId": repo.pk,
+                "issueIds": [issue.issue_id for issue, _ in written],
+                "count": len(written),
+                "source": "webhook"
+            })
+        for key, value in ingestor.stats.items():
+            stats[key] += value
+    return stats
+
+
+def handle_label_event(payload):
+    """Refleja renombres y borrados de labels en los filtros y en los issues guardados."""
+    action = payload.get('action')
+    name = payload['label']['name']
+    old_name = payload.get('changes', {}).get('name', {}).get('from')
+
+    if action == 'edited' and old_name:
+        removed, added = old_name, name
+    elif action == 'deleted':
+        removed, added = name, None
+    else:
+        return {"repositories": 0, "issues": 0}
+
+    repos = list(Repository.objects.filter(git_id=payload['repository']['id']))
+    shared = SharedIssueStore.for_github_id(payload['repository']['id'])
+    if shared:
+        # Los labels de la copia compartida quedan desactualizados hasta la próxima descarga completa
+        shared.invalidate()
+    updated_repos = 0
+    for repo in repos:
+        if removed in repo.labels:
+            repo.labels = [added if label == removed else label for label in repo.labels if added or label != removed]
+            repo.save(update_fields=['labels'])
+            updated_repos += 1
+
+    issues = list(Issue.objects.filter(repository__in=repos, labels__contains=removed))
+    changed = []
+    for issue in issues:
+        labels = [label.strip() for label in issue.labels.split(',') if label.strip()]
+        if removed not in labels:
+            continue
+        issue.labels = ', '.join(added if label == removed else label for label in labels if added or label != removed)
+        # El hash guardado ya no corresponde: la próxima sincronización reescribe el issue
+        issue.content_hash = None
+        changed.append(issue)
+    Issue.objects.bulk_update(changed, ['labels', 'content_hash'])
+
+    return {"repositories": updated_repos, "issues": len(changed)}
+
+
+EVENT_HANDLERS = {
+    'issues': handle_issues_event,
+    'label': handle_label_event,
+}
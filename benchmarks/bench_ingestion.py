@@ -0,0 +1,325 @@
+"""Benchmark end-to-end de la ingesta contra el GitHub falso local.
+
+Para cada tamaño levanta `api.fake_github` en proceso, apunta `GitService` a
+él y mide por etapa:
+
+    download      descarga inicial del repositorio (`download_new_repository`)
+    shared        descarga del mismo repositorio por otro usuario (copia compartida)
+    resync        re-sincronización completa sin cambios, contra GitHub (`update_repository`)
+    incremental   sincronización con `since` tras modificar el 1% de los issues
+    project       importación de un GitHub Project del mismo tamaño
+
+Se reporta tiempo total, sentencias SQL, commits con escrituras, llamadas a
+GitHub, fracción del tiempo en inferencia y pico de RSS. El resultado se escribe en JSON para
+compararlo con una corrida anterior (`--baseline`).
+
+Corre sobre una base aparte (`--database`), que tiene que existir y estar
+migrada (`DB_NAME=uxdebt_bench python manage.py migrate`); se niega a usar la
+base configurada de la aplicación. Los datos de sus usuarios y del owner
+`bench` (incluidos los labels encolados para GitHub) se borran al empezar y
+al terminar. Con `--stub-predictor` se reemplaza el modelo por una función
+trivial, para medir solo el costo de red y base.
+
+Uso:
+    python benchmarks/bench_ingestion.py --database uxdebt_bench --sizes 1000,10000,50000
+        [--backend graphql] [--output results.json] [--baseline anterior.json]
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'uxdebt.settings')
+
+BENCH_USER = 'bench-ingestion'
+BENCH_OTHER_USER = 'bench-ingestion-2'
+OWNER = 'bench'
+
+
+def _stub_predict_tag(text):
+    return {
+        "primary_label": "UX ISSUE",
+        "primary_score": 0.9,
+        "secondary_label": "UX BUG",
+        "secondary_score": 0.1,
+    }
+
+
+def _rss_kb():
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class RssSampler:
+    """Muestrea el RSS en un thread para obtener el pico de cada etapa."""
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        self.peak = _rss_kb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, _rss_kb())
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_kb())
+
+
+class Stage:
+    """Mide una etapa: tiempo, SQL, commits, llamadas al GitHub falso, inferencia y RSS."""
+
+    def __init__(self, fake, inference):
+        self.fake = fake
+        self.inference = inference
+        self.queries = 0
+        self.commits = 0
+
+    def _count_query(self, execute, sql, params, many, context):
+        from django.db import transaction
+
+        self.queries += 1
+        connection = context["connection"]
+        if not sql.lstrip().upper().startswith('SELECT'):
+            if not connection.in_atomic_block:
+                # En autocommit cada escritura es su propia transacción
+                self.commits += 1
+            else:
+                block = connection.atomic_blocks[0]
+                if not getattr(block, 'bench_counted', False):
+                    block.bench_counted = True
+                    transaction.on_commit(self._count_commit)
+        return execute(sql, params, many, context)
+
+    def _count_commit(self):
+        self.commits += 1
+
+    def run(self, fn):
+        from django.db import connection
+
+        self.fake.reset_stats()
+        self.inference["seconds"] = 0.0
+        self.inference["calls"] = 0
+        with RssSampler() as rss, connection.execute_wrapper(self._count_query):
+            started = time.perf_counter()
+            result = fn()
+            wall = time.perf_counter() - started
+
+        github = self.fake.stats()
+        return {
+            "wall_seconds": round(wall, 3),
+            "sql_statements": self.queries,
+            "commits": self.commits,
+            "github_calls": github["total"],
+            "github_calls_by_route": github["calls"],
+            "inference_seconds": round(self.inference["seconds"], 3),
+            "inference_calls": self.inference["calls"],
+            "inference_share": round(self.inference["seconds"] / wall, 3) if wall else 0,
+            "peak_rss_mb": round(rss.peak / 1024, 1),
+            "result": result,
+        }
+
+
+def _cleanup(users, github_id):
+    from api.models import Repository, Project, GitHubRepository, PendingIssueLabel, RepositoryLabelProvision
+
+    Project.objects.filter(user__in=users).delete()
+    Repository.objects.filter(user__in=users).delete()
+    GitHubRepository.objects.filter(git_id=github_id).delete()
+    # La etapa project encola labels: un worker de `flush_pending_labels` los mandaría a GitHub
+    PendingIssueLabel.objects.filter(user__in=users).delete()
+    RepositoryLabelProvision.objects.filter(owner__iexact=OWNER).delete()
+
+
+def run_size(size, args, user, other_user):
+    from api import ingestion
+    from api.fake_github import FakeGitHub, FakeGitHubConfig
+    from api.models import Repository
+    from api.services import GitService
+
+    repo_name = f"repo-{size}"
+    fake = FakeGitHub(FakeGitHubConfig(
+        repos={f"{OWNER}/{repo_name}": size},
+        project_items=size,
+        latency=args.latency,
+        rate_limit=10 ** 9,
+    ))
+    base_url = fake.start()
+    GitService.BASE_URL = base_url
+    GitService.GRAPHQL_URL = f"{base_url}/graphql"
+
+    inference = {"seconds": 0.0, "calls": 0}
+    predict = _stub_predict_tag if args.stub_predictor else ingestion.predict_tag
+
+    def timed_predict(text):
+        started = time.perf_counter()
+        try:
+            return predict(text)
+        finally:
+            inference["seconds"] += time.perf_counter() - started
+            inference["calls"] += 1
+
+    original_predict = ingestion.predict_tag
+    ingestion.predict_tag = timed_predict
+    service = GitService(user)
+    stages = {}
+    try:
+        _cleanup([user, other_user], fake.repo(OWNER, repo_name).id)
+
+        def download():
+            result = service.download_new_repository(OWNER, repo_name, [], Repository.LABEL_MODE_ALL, args.backend)
+            return result.get("stats") or result.get("message")
+
+        stages["download"] = Stage(fake, inference).run(download)
+
+        def shared():
+            result = GitService(other_user).download_new_repository(
+                OWNER, repo_name, [], Repository.LABEL_MODE_ALL, args.backend
+            )
+            return result.get("stats") or result.get("message")
+
+        stages["shared"] = Stage(fake, inference).run(shared)
+        repo = Repository.objects.get(user=user, owner=OWNER, name=repo_name)
+
+        def resync():
+            return service.update_repository(repo.repository_id, backend=args.backend).get("stats")
+
+        stages["resync"] = Stage(fake, inference).run(resync)
+
+        # Cambia el 1% de los issues en el GitHub falso
+        fake_repo = fake.repo(OWNER, repo_name)
+        for issue in fake_repo.issues[::100]:
+            issue["title"] += " (editado)"
+            fake_repo.touch(issue)
+        repo.refresh_from_db()
+
+        def incremental():
+            return service.sync_repository(repo, backend=args.backend).get("stats")
+
+        stages["incremental"] = Stage(fake, inference).run(incremental)
+
+        if not args.skip_projects:
+            def project():
+                result = service.import_project(OWNER, 1)
+                return {"is_success": result["is_success"], "message": result["message"]}
+
+            stages["project"] = Stage(fake, inference).run(project)
+    finally:
+        ingestion.predict_tag = original_predict
+        fake.stop()
+        _cleanup([user, other_user], fake.repo(OWNER, repo_name).id)
+
+    return stages
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline):
+    """Imprime la variación de cada métrica respecto de la corrida base."""
+    metrics = ("wall_seconds", "sql_statements", "commits", "github_calls", "peak_rss_mb")
+    for size, stages in results["sizes"].items():
+        base_stages = baseline.get("sizes", {}).get(size)
+        if not base_stages:
+            continue
+        for stage, values in stages.items():
+            base = base_stages.get(stage)
+            if not base:
+                continue
+            changes = []
+            for metric in metrics:
+                if base.get(metric):
+                    changes.append(f"{metric} {values[metric] / base[metric]:.2f}x")
+            print(f"{size:>7} {stage:<12} " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', required=True, help='Base aparte para el benchmark, distinta de la de la aplicación.')
+    parser.add_argument('--sizes', default='1000,10000,50000')
+    parser.add_argument('--backend', choices=('rest', 'graphql'), default='rest')
+    parser.add_argument('--latency', type=float, default=0.0, help='Demora por request del GitHub falso, en segundos.')
+    parser.add_argument('--skip-projects', action='store_true')
+    parser.add_argument('--stub-predictor', action='store_true', help='Reemplaza el modelo por una función trivial.')
+    parser.add_argument('--output', default=None, help='Archivo JSON de salida.')
+    parser.add_argument('--baseline', default=None, help='JSON de una corrida anterior para comparar.')
+    args = parser.parse_args()
+
+    import django
+    from django.conf import settings
+
+    database = settings.DATABASES['default']
+    if args.database == database['NAME']:
+        parser.error(f"--database tiene que ser una base distinta de la configurada ({database['NAME']})")
+    database['NAME'] = args.database
+    django.setup()
+
+    from django.contrib.auth.models import User
+    from api.models import GitHubToken
+
+    user, _ = User.objects.get_or_create(username=BENCH_USER)
+    GitHubToken.objects.update_or_create(user=user, defaults={"token": "bench-token"})
+    other_user, _ = User.objects.get_or_create(username=BENCH_OTHER_USER)
+    GitHubToken.objects.update_or_create(user=other_user, defaults={"token": "bench-token-2"})
+
+    results = {
+        "commit": _git_commit(),
+        "date": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "latency": args.latency,
+        "stub_predictor": args.stub_predictor,
+        "sizes": {},
+    }
+    for size in (int(value) for value in args.sizes.split(',')):
+        print(f"Ingesta de {size} issues...", flush=True)
+        stages = run_size(size, args, user, other_user)
+        results["sizes"][str(size)] = stages
+        for stage, values in stages.items():
+            print(
+                f"{size:>7} {stage:<12} {values['wall_seconds']:>9.2f}s "
+                f"sql={values['sql_statements']:<7} commits={values['commits']:<6} github={values['github_calls']:<5} "
+                f"inferencia={values['inference_share']:.0%} rss={values['peak_rss_mb']}MB"
+            )
+
+    output = args.output or os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), 'results',
+        f"ingestion-{datetime.now():%Y%m%d-%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as out:
+        json.dump(results, out, indent=2, default=str)
+    print(f"Resultados en {output}")
+
+    if args.baseline:
+        with open(args.baseline) as base:
+            compare(results, json.load(base))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""Benchmark: descarga de issues de un repositorio por REST vs. GraphQL.
+
+Recorre todas las páginas de issues con ambos backends de `GitService` (sin
+escribir en la base) y reporta requests, bytes recibidos, tiempo y costo de
+rate limit.
+
+Uso:
+    GITHUB_TOKEN=... python benchmarks/bench_issue_backends.py owner repo [--labels a,b]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'uxdebt.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from api import services  # noqa: E402
+from api.services import GitService  # noqa: E402
+
+
+class BenchGitService(GitService):
+    def __init__(self, token):
+        super().__init__(user=None)
+        self.token = token
+
+    def _get_github_token(self):
+        return self.token
+
+
+class Meter:
+    """Envuelve `requests.get`/`requests.post` del módulo de servicios para contar tráfico."""
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.rest_cost = 0
+        self.graphql_cost = 0
+
+    def wrap(self, fn, kind):
+        def wrapper(*args, **kwargs):
+            response = fn(*args, **kwargs)
+            self.requests += 1
+            self.bytes += len(response.content)
+            if kind == 'rest':
+                self.rest_cost += 1
+            else:
+                cost = (response.json().get('data') or {}).get('rateLimit', {}).get('cost', 1)
+                self.graphql_cost += cost
+            return response
+        return wrapper
+
+
+def run(git_service, backend, owner, repo, labels):
+    meter = Meter()
+    original_get, original_post = services.requests.get, services.requests.post
+    services.requests.get = meter.wrap(original_get, 'rest')
+    services.requests.post = meter.wrap(original_post, 'graphql')
+    try:
+        start = time.perf_counter()
+        if backend == GitService.BACKEND_GRAPHQL:
+            pages = git_service._iter_issue_pages_graphql(owner, repo, labels)
+        else:
+            pages = git_service._iter_issue_pages(owner, repo, labels)
+        issues = sum(len(page) for page in pages)
+        elapsed = time.perf_counter() - start
+    finally:
+        services.requests.get, services.requests.post = original_get, original_post
+    return issues, elapsed, meter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('owner')
+    parser.add_argument('repo')
+    parser.add_argument('--labels', default='')
+    args = parser.parse_args()
+
+    token = os.environ.get('GITHUB_TOKEN')
+    if not token:
+        parser.error('Falta la variable de entorno GITHUB_TOKEN')
+
+    labels = [label for label in args.labels.split(',') if label] or None
+    git_service = BenchGitService(token)
+
+    for backend in GitService.BACKENDS:
+        issues, elapsed, meter = run(git_service, backend, args.owner, args.repo, labels)
+        cost = meter.rest_cost + meter.graphql_cost
+        print(
+            f"{backend:<8} {issues:6d} issues  {meter.requests:4d} requests  "
+            f"{meter.bytes / 1e6:8.2f} MB  {elapsed:7.2f} s  rate limit: {cost} puntos"
+        )
+
+
+if __name__ == '__main__':
+    main()
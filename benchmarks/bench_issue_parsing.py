@@ -0,0 +1,152 @@
+"""Micro-benchmark: decodificación de páginas de `/issues` como dicts (json) vs. `IssueRecord` (orjson).
+
+Uso:
+    python benchmarks/bench_issue_parsing.py --pages 100 --per-page 100
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.records import parse_issue_page  # noqa: E402
+
+
+def _user(n):
+    login = f"user{n}"
+    return {
+        "login": login,
+        "id": 1000 + n,
+        "node_id": f"MDQ6VXNlcj{n}",
+        "avatar_url": f"https://avatars.githubusercontent.com/u/{1000 + n}?v=4",
+        "gravatar_id": "",
+        "url": f"https://api.github.com/users/{login}",
+        "html_url": f"https://github.com/{login}",
+        "followers_url": f"https://api.github.com/users/{login}/followers",
+        "following_url": f"https://api.github.com/users/{login}/following{{/other_user}}",
+        "gists_url": f"https://api.github.com/users/{login}/gists{{/gist_id}}",
+        "starred_url": f"https://api.github.com/users/{login}/starred{{/owner}}{{/repo}}",
+        "subscriptions_url": f"https://api.github.com/users/{login}/subscriptions",
+        "organizations_url": f"https://api.github.com/users/{login}/orgs",
+        "repos_url": f"https://api.github.com/users/{login}/repos",
+        "events_url": f"https://api.github.com/users/{login}/events{{/privacy}}",
+        "received_events_url": f"https://api.github.com/users/{login}/received_events",
+        "type": "User",
+        "site_admin": False,
+    }
+
+
+def make_issue(number):
+    base = f"https://api.github.com/repos/acme/widgets/issues/{number}"
+    return {
+        "url": base,
+        "repository_url": "https://api.github.com/repos/acme/widgets",
+        "labels_url": f"{base}/labels{{/name}}",
+        "comments_url": f"{base}/comments",
+        "events_url": f"{base}/events",
+        "html_url": f"https://github.com/acme/widgets/issues/{number}",
+        "id": 2000000 + number,
+        "node_id": f"I_kwDOA{number:08d}",
+        "number": number,
+        "title": f"El botón de guardar no responde en la vista #{number}",
+        "user": _user(number % 50),
+        "labels": [
+            {
+                "id": 300 + i,
+                "node_id": f"LA_kwDO{i}",
+                "url": f"https://api.github.com/repos/acme/widgets/labels/label{i}",
+                "name": f"label{i}",
+                "color": "d73a4a",
+                "default": False,
+                "description": "Etiqueta de prueba",
+            }
+            for i in range(number % 4)
+        ],
+        "state": "open" if number % 3 else "closed",
+        "locked": False,
+        "assignee": _user(number % 7),
+        "assignees": [_user(number % 7), _user(number % 11)],
+        "milestone": None,
+        "comments": number % 13,
+        "created_at": "2024-03-01T10:00:00Z",
+        "updated_at": "2024-03-02T10:00:00Z",
+        "closed_at": None if number % 3 else "2024-03-03T10:00:00Z",
+        "author_association": "CONTRIBUTOR",
+        "active_lock_reason": None,
+        "body": "Pasos para reproducir:\n1. Abrir la vista\n2. Hacer click en guardar\n" * 8,
+        "reactions": {
+            "url": f"{base}/reactions",
+            "total_count": 0,
+            "+1": 0, "-1": 0, "laugh": 0, "hooray": 0,
+            "confused": 0, "heart": 0, "rocket": 0, "eyes": 0,
+        },
+        "timeline_url": f"{base}/timeline",
+        "performed_via_github_app": None,
+        "state_reason": None,
+    }
+
+
+def dict_path(pages):
+    issues_data = []
+    for content in pages:
+        issues_data.extend(json.loads(content))
+    for issue in issues_data:
+        (issue['id'], issue['html_url'], issue['title'], issue['body'], issue['state'] == 'open',
+         ', '.join(label['name'] for label in issue.get('labels', [])), issue.get('closed_at'))
+    return issues_data
+
+
+def record_path(pages):
+    records = []
+    for content in pages:
+        records.extend(parse_issue_page(content))
+    for record in records:
+        (record.git_id, record.html_url, record.title, record.body, record.is_open,
+         record.labels_text, record.closed_at)
+    return records
+
+
+def measure(fn, pages, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(pages)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    retained = fn(pages)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+    return best, current
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pages', type=int, default=100)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pages = [
+        json.dumps([make_issue(p * args.per_page + i) for i in range(args.per_page)]).encode()
+        for p in range(args.pages)
+    ]
+    total = args.pages * args.per_page
+    payload_mb = sum(len(p) for p in pages) / 1e6
+    print(f"{total} issues, {payload_mb:.1f} MB de JSON")
+
+    for name, fn in (('dict (json)', dict_path), ('IssueRecord (orjson)', record_path)):
+        seconds, retained = measure(fn, pages, args.repeat)
+        print(
+            f"{name:<22} {seconds * 1000:8.1f} ms  "
+            f"{seconds / total * 1e6:6.2f} us/issue  "
+            f"{retained / total:8.0f} B/issue retenidos"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,5 @@
 #!/bin/sh
 
 python manage.py migrate
-python manage.py runserver 0.0.0.0:8000
\ No newline at end of file
+# ASGI: las conexiones SSE (api/Events/stream/) no ocupan un worker cada una
+uvicorn uxdebt.asgi:application --host 0.0.0.0 --port 8000
\ No newline at end of file
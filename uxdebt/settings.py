@@ -156,6 +156,21 @@ CORS_ALLOW_ALL_ORIGINS = True
 # APPEND_SLASH = False
 USE_TZ = False
 
+# API de GitHub. Se puede apuntar al servidor falso de `manage.py fake_github`
+# para probar y medir la ingesta sin red.
+GITHUB_API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+GITHUB_GRAPHQL_URL = os.environ.get('GITHUB_GRAPHQL_URL', f'{GITHUB_API_URL}/graphql')
+
+# Secreto compartido con GitHub para firmar los webhooks (X-Hub-Signature-256)
+GITHUB_WEBHOOK_SECRET = os.environ.get('GITHUB_WEBHOOK_SECRET', '')
+
+# Archivo opcional de las páginas crudas que devuelve GitHub (zstd, direccionado por
+# contenido), para re-procesarlas con `manage.py github_archive replay` sin red.
+# Vacío = deshabilitado. Límite de tamaño en bytes: 0 = sin límite.
+GITHUB_ARCHIVE_DIR = os.environ.get('GITHUB_ARCHIVE_DIR', '')
+GITHUB_ARCHIVE_RETENTION_DAYS = int(os.environ.get('GITHUB_ARCHIVE_RETENTION_DAYS', '30'))
+GITHUB_ARCHIVE_MAX_BYTES = int(os.environ.get('GITHUB_ARCHIVE_MAX_BYTES', '0'))
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=1),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),